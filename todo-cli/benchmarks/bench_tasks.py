@@ -0,0 +1,169 @@
+# bench_tasks.py
+"""Times the TaskManager / Storage hot paths against synthetic databases.
+
+    python benchmarks/bench_tasks.py --sizes 1000 100000 1000000 --output baseline.json
+    python benchmarks/bench_tasks.py --compare baseline.json --threshold 0.2
+
+Every size gets a fresh database file filled through the bulk insert path.
+Each operation is repeated and the best time kept. With --compare, any
+operation slower than the baseline by more than the threshold is reported
+and the script exits non-zero. GUI refreshes are timed when a display (or
+an Xvfb stand-in) is available and skipped otherwise.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Storage
+from tasks import TaskManager
+
+DEFAULT_SIZES = [1000, 100000, 1000000]
+# Single-row operations timed per size; the result is the mean per call
+SINGLE_OPS = 200
+PRIORITIES = ["Low", "Medium", "High"]
+
+
+def synthetic_tasks(count, seed=42):
+    """Yields count reproducible (title, priority, done) rows"""
+    rng = random.Random(seed)
+    for i in range(count):
+        yield (f"Task {i} " + "x" * rng.randint(0, 40), rng.choice(PRIORITIES), rng.random() < 0.3)
+
+
+def best_of(func, repeat):
+    """Runs func repeat times and returns the fastest wall time in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_core(manager, size, repeat):
+    results = {}
+    sample = list(range(1, size + 1, max(1, size // SINGLE_OPS)))[:SINGLE_OPS]
+
+    results["add_task"] = best_of(lambda: [manager.add_task("bench", "Low") for _ in range(SINGLE_OPS)],
+                                  repeat) / SINGLE_OPS
+    results["get_tasks_all"] = best_of(manager.get_tasks, repeat)
+    results["get_tasks_page"] = best_of(lambda: manager.get_tasks(status="pending", limit=50), repeat)
+    results["list_tasks"] = best_of(lambda: manager.list_tasks(out=io.StringIO()), repeat)
+    results["mark_task"] = best_of(lambda: [manager.mark_task(i) for i in sample], repeat) / len(sample)
+    results["mark_tasks_batch"] = best_of(lambda: manager.mark_tasks(sample), repeat)
+    # Deleting is destructive, so it runs once over distinct ids
+    results["delete_task"] = best_of(lambda: [manager.delete_task(i) for i in sample], 1) / len(sample)
+    return results
+
+
+def bench_gui(manager, repeat):
+    """Times a full and an incremental Treeview refresh; returns {} when there is no display"""
+    try:
+        import tkinter as tk
+        from main_gui import TodoGUI
+    except ImportError:
+        return {}
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return {}
+    results = {}
+    try:
+        root.withdraw()
+        gui = TodoGUI(root, manager.db)
+        tasks = manager.get_tasks()
+
+        def full():
+            gui.apply_task_rows([])
+            gui.apply_task_rows(tasks)
+            root.update_idletasks()
+
+        results["gui_refresh_full"] = best_of(full, repeat)
+        changed = [task._replace(done=not task.done) if i % 100 == 0 else task for i, task in enumerate(tasks)]
+        results["gui_refresh_incremental"] = best_of(
+            lambda: (gui.apply_task_rows(changed), gui.apply_task_rows(tasks), root.update_idletasks()), repeat)
+        gui.worker.shutdown()
+    finally:
+        root.destroy()
+    return results
+
+
+def run(sizes, repeat, gui):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for size in sizes:
+            db_file = os.path.join(tmpdir, f"bench_{size}.db")
+            with contextlib.redirect_stdout(io.StringIO()):
+                manager = TaskManager(Storage(db_file, pool_size=2 if gui else 0))
+                start = time.perf_counter()
+                manager.add_tasks(synthetic_tasks(size), chunk_size=10000)
+                timings = {"bulk_insert": time.perf_counter() - start}
+                timings.update(bench_core(manager, size, repeat))
+                if gui:
+                    timings.update(bench_gui(manager, repeat))
+                manager.db.close()
+            results[str(size)] = timings
+            print(f"{size:>9} tasks: " + ", ".join(f"{k}={v * 1000:.3f}ms" for k, v in timings.items()))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns a list of (size, operation, baseline, current) entries that regressed"""
+    regressions = []
+    for size, timings in results.items():
+        for op, current in timings.items():
+            previous = baseline.get("results", {}).get(size, {}).get(op)
+            if previous and current > previous * (1 + threshold):
+                regressions.append((size, op, previous, current))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark TaskManager/Storage hot paths")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per operation; the best is kept")
+    parser.add_argument("--no-gui", dest="gui", action="store_false", help="skip the Tk refresh timings")
+    parser.add_argument("--output", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="BASELINE", help="flag regressions against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown ratio (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeat, args.gui)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for size, op, previous, current in regressions:
+            print(f"REGRESSION {size} {op}: {previous * 1000:.3f}ms -> {current * 1000:.3f}ms "
+                  f"(+{(current / previous - 1) * 100:.0f}%)")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
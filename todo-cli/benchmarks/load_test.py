@@ -0,0 +1,152 @@
+# load_test.py
+"""Measures requests/sec and latency percentiles of the `main.py serve` API.
+
+    python benchmarks/load_test.py --clients 16 --duration 10 --write-ratio 0.2
+    python benchmarks/load_test.py --url http://127.0.0.1:8765 --clients 32
+
+Without --url a server is started in a subprocess on a throwaway database
+seeded with --seed tasks, so the clients and the server don't share a GIL.
+Each client thread keeps one HTTP/1.1 connection open. Reads page through
+GET /tasks and revalidate with If-None-Match; writes add tasks or toggle them.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from io import StringIO
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MAIN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(tmpdir, seed, port):
+    """Starts `main.py serve` in tmpdir on a database seeded with seed tasks"""
+    from database import init_database
+    from tasks import TaskManager
+    storage = init_database(os.path.join(tmpdir, "todo.db"))
+    with redirect_stdout(StringIO()):
+        TaskManager(storage).add_tasks((f"Seed task {i}", "Low") for i in range(seed))
+    storage.close()
+    process = subprocess.Popen([sys.executable, MAIN, "serve", "--port", str(port)], cwd=tmpdir,
+                               stdout=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("server did not start")
+
+
+def client(host, port, stop_at, write_ratio, seed, latencies, statuses, lock):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    etags = {}
+    local_latencies, local_statuses = [], Counter()
+    while time.perf_counter() < stop_at:
+        headers = {}
+        if rng.random() < write_ratio:
+            if rng.random() < 0.5:
+                method, path, body = "POST", "/tasks", json.dumps({"title": f"Load {rng.random()}", "priority": "Low"})
+            else:
+                method, path = "PATCH", f"/tasks/{rng.randint(1, 1000)}"
+                body = json.dumps({"done": rng.random() < 0.5})
+        else:
+            method, body = "GET", None
+            path = f"/tasks?limit=50&after={rng.randint(0, 20) * 50}"
+            if path in etags:
+                headers["If-None-Match"] = etags[path]
+        start = time.perf_counter()
+        conn.request(method, path, body, headers)
+        response = conn.getresponse()
+        response.read()
+        local_latencies.append(time.perf_counter() - start)
+        local_statuses[response.status] += 1
+        if method == "GET" and response.getheader("ETag"):
+            etags[path] = response.getheader("ETag")
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        statuses.update(local_statuses)
+
+
+def run(host, port, clients, duration, write_ratio):
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(host, port, start + duration, write_ratio, i,
+                                                     latencies, statuses, lock))
+               for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "req_per_sec": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the todo HTTP API")
+    parser.add_argument("--url", help="server to test (default: start one on a temporary database)")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent connections (default: 16)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run (default: 10)")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="share of writes (default: 0.2)")
+    parser.add_argument("--seed", type=int, default=10000, help="tasks in the spawned server's database")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        process = None
+        if args.url:
+            url = urlparse(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            host, port = "127.0.0.1", free_port()
+            process = spawn_server(tmpdir, args.seed, port)
+        try:
+            result = run(host, port, args.clients, args.duration, args.write_ratio)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    print(f"{result['requests']} requests from {args.clients} clients in {args.duration:.0f}s: "
+          f"{result['req_per_sec']:.0f} req/s, p50 {result['p50_ms']:.2f}ms, "
+          f"p99 {result['p99_ms']:.2f}ms, max {result['max_ms']:.2f}ms")
+    print("statuses: " + ", ".join(f"{status}={count}" for status, count in result["statuses"].items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
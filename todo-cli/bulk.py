@@ -0,0 +1,474 @@
+# bulk.py
+import codecs
+import csv
+import gzip
+import io
+import json
+import os
+import struct
+import zlib
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Field order used when writing tasks out
+FIELDS = ("id", "title", "priority", "done")
+
+# Columnar snapshot format: a magic header followed by independent blocks of
+# COLUMNAR_BLOCK_ROWS rows. Each block is "<II" (row count, payload size) and a
+# zlib-compressed payload holding the columns one after another:
+#   "<H" + JSON list of the block's distinct priorities
+#   ids as int64, done flags as bytes, priority codes as bytes,
+#   title byte lengths as uint32, then all titles as one UTF-8 blob.
+COLUMNAR_MAGIC = b"TODOCOL1"
+COLUMNAR_BLOCK_ROWS = 65536
+COLUMNAR_EXT = ".todocol"
+
+FORMATS = ("jsonl", "csv", "columnar")
+
+# Input handed to a parse worker at a time (about 10,000 JSONL rows); each
+# parsed chunk is committed in one transaction
+PARSE_CHUNK_BYTES = 1 << 20
+# Rows a format worker turns into output at a time during a parallel export
+FORMAT_CHUNK_ROWS = 20000
+# Chunks in flight per worker process. The reader waits once this many are
+# queued ahead of the writer, which bounds memory when the writer is slower.
+QUEUE_CHUNKS_PER_JOB = 2
+# Malformed rows an import lists by line number; any further ones are only counted
+MAX_ROW_ERRORS = 10
+
+JSON_TYPES = {dict: "object", list: "array", str: "string", int: "number", float: "number", bool: "boolean",
+              type(None): "null"}
+
+
+def default_jobs():
+    """Worker processes to parse or format with: one core is left to the writer"""
+    return max((os.cpu_count() or 1) - 1, 0)
+
+
+def detect_format(path):
+    """Returns (format, gzipped) guessed from a file name such as tasks.jsonl.gz"""
+    name = path.lower()
+    gzipped = name.endswith(".gz")
+    if gzipped:
+        name = name[:-3]
+    ext = os.path.splitext(name)[1]
+    if ext == ".csv":
+        return "csv", gzipped
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl", gzipped
+    if ext == COLUMNAR_EXT:
+        return "columnar", gzipped
+    return None, gzipped
+
+
+class RowErrors:
+    """Malformed rows skipped by an import: how many, and the first MAX_ROW_ERRORS as (line, reason)"""
+
+    def __init__(self):
+        self.count = 0
+        self.first = []
+
+    def add(self, line, reason):
+        self.count += 1
+        if len(self.first) < MAX_ROW_ERRORS:
+            self.first.append((line, reason))
+
+    def extend(self, other):
+        for line, reason in other.first:
+            self.add(line, reason)
+        self.count += other.count - len(other.first)
+
+
+def _skip_row(errors, line, reason):
+    """Records a malformed row in errors, or raises ValueError for it when errors is None"""
+    if errors is None:
+        raise ValueError(f"line {line}: {reason}")
+    errors.add(line, reason)
+
+
+def _json_row(line):
+    """Decodes one JSONL row, raising ValueError if it can't describe a task"""
+    try:
+        item = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON ({e.msg})") from None
+    if isinstance(item, dict):
+        title, priority = item.get("title"), item.get("priority")
+    elif isinstance(item, list):
+        title, priority = (item + [None, None])[:2]
+    else:
+        raise ValueError(f"expected a JSON object, got {JSON_TYPES.get(type(item), 'number')}")
+    if not isinstance(title, (str, type(None))):
+        raise ValueError(f"title must be a string, got {JSON_TYPES.get(type(title), 'number')}")
+    if isinstance(priority, (dict, list)):
+        raise ValueError(f"priority must be a string, got {JSON_TYPES[type(priority)]}")
+    return item
+
+
+def _json_rows(lines, errors, first_line=1):
+    """Yields the decoded rows of JSONL lines, skipping blank and malformed ones"""
+    for number, line in enumerate(lines, first_line):
+        if not line.strip():
+            continue
+        try:
+            yield _json_row(line)
+        except ValueError as e:
+            _skip_row(errors, number, str(e))
+
+
+def _csv_rows(f, errors, fieldnames=None, first_line=1):
+    """Yields the rows of a CSV file as dicts, skipping rows the csv module can't parse"""
+    reader = csv.DictReader(f, fieldnames=fieldnames)
+    while True:
+        try:
+            yield next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            # DictReader.line_num is only updated after a good row; its reader's is current
+            _skip_row(errors, first_line - 1 + reader.reader.line_num, f"invalid CSV ({e})")
+
+
+def read_tasks_file(path, errors=None):
+    """Lazily yields tasks from a .csv, .jsonl or .todocol file (optionally .gz).
+
+    CSV files need a header row with at least a "title" column; JSONL files
+    hold one JSON object per line. Rows are streamed so memory stays flat.
+    Malformed rows are recorded in errors (a RowErrors) and skipped; without
+    errors the first one raises ValueError.
+    """
+    fmt, gzipped = detect_format(path)
+    if fmt is None:
+        raise ValueError(f"Unsupported import format: {os.path.splitext(path)[1] or path}")
+    opener = gzip.open if gzipped else open
+    if fmt == "columnar":
+        with opener(path, "rb") as f:
+            for task_id, title, priority, done in read_columnar(f):
+                yield (title, priority, done)
+        return
+    # utf-8-sig drops the byte order mark Excel puts before a CSV header
+    with opener(path, "rt", newline='', encoding='utf-8-sig') as f:
+        if fmt == 'csv':
+            yield from _csv_rows(f, errors)
+        else:
+            yield from _json_rows(f, errors)
+
+
+def write_tasks(tasks, f, fmt="jsonl"):
+    """Writes task records to an open file one row (or block) at a time.
+
+    fmt is "jsonl" (one JSON object per line) or "csv" (with a header row),
+    both written to a text file, or "columnar" written to a binary file.
+    Returns the number of rows written.
+    """
+    count = 0
+    if fmt == "csv":
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for task in tasks:
+            writer.writerow(task)
+            count += 1
+    elif fmt == "jsonl":
+        for task in tasks:
+            f.write(json.dumps(dict(zip(FIELDS, task))) + "\n")
+            count += 1
+    elif fmt == "columnar":
+        count = write_columnar(tasks, f)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return count
+
+
+def export_tasks(tasks, path, fmt=None, compress=None):
+    """Streams tasks into path, picking format and gzip from the name unless given.
+
+    Returns the number of rows written.
+    """
+    detected, gzipped = detect_format(path)
+    fmt = fmt or detected or "jsonl"
+    compress = gzipped if compress is None else compress
+    opener = gzip.open if compress else open
+    if fmt == "columnar":
+        with opener(path, "wb") as f:
+            return write_tasks(tasks, f, fmt)
+    with opener(path, "wt", newline="", encoding="utf-8") as f:
+        return write_tasks(tasks, f, fmt)
+
+
+def write_columnar(tasks, f, block_rows=COLUMNAR_BLOCK_ROWS):
+    """Writes tasks to a binary file in the columnar snapshot format; returns the row count."""
+    f.write(COLUMNAR_MAGIC)
+    tasks = iter(tasks)
+    count = 0
+    while True:
+        block = list(islice(tasks, block_rows))
+        if not block:
+            break
+        f.write(encode_columnar_block(block))
+        count += len(block)
+    return count
+
+
+def encode_columnar_block(block):
+    """One block of the columnar format (header and compressed payload) as bytes"""
+    ids = array("q")
+    lengths = array("I")
+    titles = []
+    priorities = {}
+    codes = bytearray()
+    done = bytearray()
+    for task_id, title, priority, is_done in block:
+        ids.append(task_id)
+        encoded = title.encode("utf-8")
+        lengths.append(len(encoded))
+        titles.append(encoded)
+        codes.append(priorities.setdefault(priority, len(priorities)))
+        done.append(1 if is_done else 0)
+    table = json.dumps(list(priorities)).encode("utf-8")
+    payload = zlib.compress(b"".join([
+        struct.pack("<H", len(table)), table,
+        ids.tobytes(), bytes(done), bytes(codes), lengths.tobytes(), b"".join(titles),
+    ]), 1)
+    return struct.pack("<II", len(block), len(payload)) + payload
+
+
+def read_columnar(f):
+    """Yields (id, title, priority, done) tuples from a columnar snapshot, one block at a time."""
+    for rows, payload in iter_columnar_blocks(f):
+        yield from decode_columnar_block(rows, payload)
+
+
+def iter_columnar_blocks(f):
+    """Yields the (row count, compressed payload) of each block of a columnar snapshot"""
+    if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError("Not a columnar task snapshot")
+    while True:
+        header = f.read(8)
+        if not header:
+            break
+        rows, size = struct.unpack("<II", header)
+        yield rows, f.read(size)
+
+
+def decode_columnar_block(rows, payload):
+    """Yields the (id, title, priority, done) tuples held in one compressed block"""
+    data = memoryview(zlib.decompress(payload))
+    (table_len,) = struct.unpack_from("<H", data)
+    pos = 2 + table_len
+    priorities = json.loads(bytes(data[2:pos]))
+    ids = array("q")
+    ids.frombytes(data[pos:pos + rows * 8])
+    pos += rows * 8
+    done = data[pos:pos + rows]
+    codes = data[pos + rows:pos + 2 * rows]
+    pos += 2 * rows
+    lengths = array("I")
+    lengths.frombytes(data[pos:pos + rows * 4])
+    pos += rows * 4
+    for i in range(rows):
+        end = pos + lengths[i]
+        yield (ids[i], str(data[pos:end], "utf-8"), priorities[codes[i]], done[i])
+        pos = end
+
+
+# --- Parallel import and export ---
+#
+# Parsing, validating and formatting run in a ProcessPoolExecutor. The file
+# is read and written, and the database written, by the calling process
+# only; it collects the chunks in file order, so ids come out as in a serial
+# import.
+
+
+def split_lines(f, chunk_bytes=PARSE_CHUNK_BYTES, csv_quotes=False):
+    """Yields chunks of a binary file that each end on a line boundary.
+
+    With csv_quotes a chunk never ends inside a quoted CSV field: every chunk
+    holds an even number of quote characters, so each one starts unquoted.
+    """
+    pending = b""
+    while True:
+        block = f.read(chunk_bytes)
+        if not block:
+            if pending:
+                yield pending
+            return
+        data = pending + block
+        cut = data.rfind(b"\n")
+        while csv_quotes and cut >= 0 and data.count(b'"', 0, cut) % 2:
+            cut = data.rfind(b"\n", 0, cut)
+        if cut < 0:
+            pending = data
+            continue
+        yield data[:cut + 1]
+        pending = data[cut + 1:]
+
+
+def parse_chunk(fmt, data, extra=None, first_line=1):
+    """Parses and validates one chunk in a worker process; returns (rows, skipped, errors).
+
+    rows are INSERT-ready (title, priority code, done) tuples, skipped counts
+    rows without a title and errors is a RowErrors of the malformed ones.
+    extra is the CSV header, or the row count of a columnar block;
+    first_line is the line of the file the chunk starts on.
+    """
+    from tasks import task_params
+    errors = RowErrors()
+    if fmt == "columnar":
+        items = ((title, priority, done) for _, title, priority, done in decode_columnar_block(extra, data))
+    elif fmt == "csv":
+        items = _csv_rows(io.StringIO(data.decode("utf-8"), newline=""), errors, extra, first_line)
+    else:
+        items = _json_rows(io.StringIO(data.decode("utf-8"), newline=""), errors, first_line)
+    rows = []
+    skipped = 0
+    for item in items:
+        params = task_params(item)
+        if params is None:
+            skipped += 1
+        else:
+            rows.append(params)
+    return rows, skipped, errors
+
+
+def _import_chunks(path, chunk_bytes):
+    """Yields (data, extra, first line, compressed bytes read so far) for every chunk of an import file"""
+    fmt, gzipped = detect_format(path)
+    with open(path, "rb") as raw:
+        f = gzip.GzipFile(fileobj=raw) if gzipped else raw
+        if fmt == "columnar":
+            for rows, payload in iter_columnar_blocks(f):
+                yield payload, rows, None, raw.tell()
+            return
+        header = None
+        line = 1
+        for data in split_lines(f, chunk_bytes, csv_quotes=fmt == "csv"):
+            if line == 1 and data.startswith(codecs.BOM_UTF8):
+                data = data[len(codecs.BOM_UTF8):]
+            if fmt == "csv" and header is None:
+                # The first row of the first chunk is the header
+                cut = data.find(b"\n")
+                while cut >= 0 and data.count(b'"', 0, cut) % 2:
+                    cut = data.find(b"\n", cut + 1)
+                cut = len(data) if cut < 0 else cut + 1
+                header = next(csv.reader(io.StringIO(data[:cut].decode("utf-8"), newline="")), [])
+                line += data.count(b"\n", 0, cut)
+                data = data[cut:]
+                if not data:
+                    continue
+            yield data, header, line, raw.tell()
+            line += data.count(b"\n")
+
+
+def _ordered_results(executor, func, chunks, jobs):
+    """Runs func(*args) on the executor for each (args, tag) in chunks; yields (result, tag) in order.
+
+    Only QUEUE_CHUNKS_PER_JOB * jobs chunks are submitted ahead of the one
+    being consumed, so a slow consumer holds back reading instead of letting
+    parsed chunks pile up in memory.
+    """
+    window = deque()
+    try:
+        for args, tag in chunks:
+            window.append((executor.submit(func, *args), tag))
+            if len(window) >= QUEUE_CHUNKS_PER_JOB * jobs:
+                future, tag = window.popleft()
+                yield future.result(), tag
+        while window:
+            future, tag = window.popleft()
+            yield future.result(), tag
+    finally:
+        for future, _ in window:
+            future.cancel()
+
+
+def _executor(jobs):
+    # "spawn" keeps the workers from inheriting the caller's SQLite connections and threads
+    import multiprocessing
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn"))
+
+
+def import_parallel(path, insert=None, jobs=None, chunk_bytes=PARSE_CHUNK_BYTES, progress=None, errors=None):
+    """Parses and validates a .csv, .jsonl or .todocol file (optionally .gz) on jobs worker processes.
+
+    insert(rows) is called in the calling process with each chunk's
+    (title, priority code, done) rows, in file order; it is the single writer
+    (usually TaskManager.insert_rows) and returns how many rows it stored.
+    Without insert the file is only validated. progress(rows, bytes_read,
+    total_bytes) is called after every chunk. Malformed rows are recorded in
+    errors (a RowErrors) and skipped; without errors the first one raises
+    ValueError. Returns (rows, skipped).
+    """
+    fmt, _ = detect_format(path)
+    if fmt is None:
+        raise ValueError(f"Unsupported import format: {os.path.splitext(path)[1] or path}")
+    jobs = jobs or default_jobs() or 1
+    total_bytes = os.path.getsize(path)
+    chunks = (((fmt, data, extra, line), position) for data, extra, line, position in _import_chunks(path, chunk_bytes))
+    count = skipped = 0
+    with _executor(jobs) as executor:
+        for (rows, titleless, bad), position in _ordered_results(executor, parse_chunk, chunks, jobs):
+            skipped += titleless
+            if bad.count:
+                if errors is None:
+                    _skip_row(None, *bad.first[0])
+                errors.extend(bad)
+            if insert is None:
+                count += len(rows)
+            elif rows:
+                stored = insert(rows)
+                if not stored:
+                    break
+                count += stored
+            if progress is not None:
+                progress(count, position, total_bytes)
+    return count, skipped
+
+
+def format_chunk(fmt, rows):
+    """Serializes rows of (id, title, priority, done) in a worker process; returns bytes"""
+    if fmt == "columnar":
+        return encode_columnar_block(rows)
+    out = io.StringIO(newline="")
+    if fmt == "csv":
+        csv.writer(out).writerows(rows)
+    else:
+        out.write("".join(json.dumps(dict(zip(FIELDS, task))) + "\n" for task in rows))
+    return out.getvalue().encode("utf-8")
+
+
+def export_parallel(tasks, path, fmt=None, compress=None, jobs=None, chunk_rows=None):
+    """Like export_tasks, but rows are serialized on jobs worker processes.
+
+    The calling process reads tasks and writes the chunks out in order, so
+    the file is the same as export_tasks would write. Returns the number of
+    rows written.
+    """
+    detected, gzipped = detect_format(path)
+    fmt = fmt or detected or "jsonl"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    compress = gzipped if compress is None else compress
+    jobs = jobs or default_jobs() or 1
+    # A columnar chunk is exactly one block, as write_columnar would cut it
+    chunk_rows = chunk_rows or (COLUMNAR_BLOCK_ROWS if fmt == "columnar" else FORMAT_CHUNK_ROWS)
+    tasks = iter(tasks)
+
+    def chunks():
+        while True:
+            block = [tuple(task) for task in islice(tasks, chunk_rows)]
+            if not block:
+                return
+            yield (fmt, block), len(block)
+
+    count = 0
+    with (gzip.open if compress else open)(path, "wb") as f, _executor(jobs) as executor:
+        if fmt == "columnar":
+            f.write(COLUMNAR_MAGIC)
+        elif fmt == "csv":
+            f.write(format_chunk("csv", [FIELDS]))
+        for data, rows in _ordered_results(executor, format_chunk, chunks(), jobs):
+            f.write(data)
+            count += rows
+    return count
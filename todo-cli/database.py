@@ -1,65 +1,722 @@
 # database.py
+import os
+import re
 import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# Database of the default task list; other lists live next to it (see TaskLists)
+DEFAULT_DB_FILE = "todo.db"
+DEFAULT_LIST = "default"
+# List names double as file name parts, so they are kept to safe characters
+LIST_NAME = re.compile(r"[A-Za-z0-9_-]+")
+# SQLite attaches at most 10 databases to one connection by default
+ATTACH_LIMIT = 10
+
+# Pragmas applied to every new connection, picked with Storage(profile=...).
+# "concurrent" lets the CLI and both GUIs share todo.db: WAL keeps readers and
+# the writer from blocking each other, and busy_timeout waits out short locks.
+PROFILES = {
+    "default": {
+        "busy_timeout": 5000,
+    },
+    "concurrent": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,       # KiB, i.e. 16 MiB of page cache
+        "mmap_size": 268435456,     # 256 MiB
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    },
+}
+DEFAULT_PROFILE = "concurrent"
+
+# Schema version recorded in PRAGMA user_version; Storage.migrate() upgrades older files
+SCHEMA_VERSION = 1
+# Rows copied per transaction when a migration rebuilds the tasks table
+MIGRATION_BATCH_ROWS = 50000
+# Change feed rows kept for readers catching up; the feed prunes itself every
+# CHANGES_PRUNE_EVERY rows. Both are baked into its trigger when it is created.
+CHANGES_KEEP_ROWS = 100000
+CHANGES_PRUNE_EVERY = 1000
+
+# Priorities are stored as small integers. Lower codes sort first, so
+# ORDER BY priority lists High, then Medium, then Low.
+PRIORITY_CODES = {"High": 0, "Medium": 1, "Low": 2}
+DEFAULT_PRIORITY = "Medium"
+
+# The current time as Unix seconds (unixepoch() needs SQLite 3.38+)
+NOW_SQL = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+TASKS_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS {{name}} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        priority INTEGER NOT NULL DEFAULT {PRIORITY_CODES[DEFAULT_PRIORITY]},
+        done INTEGER NOT NULL DEFAULT 0,
+        created_at INTEGER NOT NULL DEFAULT ({NOW_SQL}),
+        updated_at INTEGER NOT NULL DEFAULT ({NOW_SQL})
+    );
+"""
+TASK_INDEXES = (
+    # Back the filtered / ordered / keyset-paginated listings in TaskManager.get_tasks
+    "CREATE INDEX IF NOT EXISTS idx_tasks_done_priority ON tasks (done, priority, id)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks (priority, id)",
+    # Time-based listings ("created this week", "recently changed")
+    "CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks (created_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_tasks_updated_at ON tasks (updated_at, id)",
+)
+
+def priority_code_sql(expr):
+    """SQL mapping a legacy TEXT priority to its code; unknown values become Medium"""
+    cases = " ".join(f"WHEN '{name.lower()}' THEN {code}" for name, code in PRIORITY_CODES.items())
+    return f"CASE lower(trim({expr})) {cases} ELSE {PRIORITY_CODES[DEFAULT_PRIORITY]} END"
+
+def open_connection(db_file, timeout=5.0, profile=DEFAULT_PROFILE, check_same_thread=True):
+    """Open a SQLite connection returning Rows, with the pragmas of profile applied"""
+    conn = sqlite3.connect(db_file, timeout=timeout, check_same_thread=check_same_thread)
+    conn.row_factory = sqlite3.Row
+    pragmas = PROFILES[profile] if isinstance(profile, str) else profile
+    for name, value in pragmas.items():
+        retry_busy(lambda: conn.execute(f"PRAGMA {name} = {value}").fetchall())
+    return conn
+
+def is_busy_error(e):
+    """True for the SQLITE_BUSY / SQLITE_LOCKED errors that are worth retrying"""
+    message = str(e).lower()
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+def retry_busy(func, retries=5, backoff=0.05):
+    """Call func, retrying with exponential backoff while the database is busy"""
+    delay = backoff
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except sqlite3.OperationalError as e:
+            if attempt == retries or not is_busy_error(e):
+                raise
+            time.sleep(delay)
+            delay *= 2
+
+class ConnectionPool:
+    """A small thread-aware pool of SQLite connections to one database file.
+
+    Each thread is bound to a single connection for as long as it holds it, so
+    repeated calls from the same thread reuse the same connection. At most
+    `size` connections are open at once; a further thread waits up to
+    `timeout` seconds for another thread to release() one, then gets an
+    OperationalError. Threads that never release keep their connection, so
+    size the pool for the number of long-lived threads that use it.
+    """
+
+    def __init__(self, db_file, size=4, timeout=5.0, profile=DEFAULT_PROFILE):
+        self.db_file = db_file
+        self.size = size
+        self.timeout = timeout
+        self.profile = profile
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._all = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def get(self):
+        """Return the connection bound to the calling thread, acquiring one if needed"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if not self._slots.acquire(timeout=self.timeout):
+                raise sqlite3.OperationalError(
+                    f"connection pool exhausted: all {self.size} connections are held by other threads")
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    conn = open_connection(self.db_file, self.timeout, self.profile, check_same_thread=False)
+                    self._all.append(conn)
+            self._local.conn = conn
+        return conn
+
+    def release(self):
+        """Return the calling thread's connection to the pool for reuse"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                self._idle.append(conn)
+            self._slots.release()
+
+    def close_all(self):
+        """Close every connection the pool has opened"""
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all.clear()
+            self._idle.clear()
+        self._local = threading.local()
+        self._slots = threading.BoundedSemaphore(self.size)
+
 
 class Storage:
-    def __init__(self, db_file):
+    def __init__(self, db_file, timeout=5.0, pool_size=0, profile=DEFAULT_PROFILE, retries=5, backoff=0.05,
+                 counters=True, instrument=None, journal=True, changes=True):
         self.db_file = db_file
-        self.conn = None
+        self.journal = journal
+        self.changes = changes
+        # Receives statement(sql, rows, elapsed, convert) / error(sql, e) calls; see instrument.Metrics
+        self.instrument = instrument
+        self.counters = counters
+        self.timeout = timeout
+        self.profile = profile
+        self.retries = retries
+        self.backoff = backoff
+        self.pool = ConnectionPool(db_file, pool_size, timeout, profile) if pool_size else None
+        self.has_fts = False
+        self.has_counters = False
+        self.has_journal = False
+        self.has_changes = False
+        self._conn = None
+        self._local = threading.local()
+
+    @property
+    def conn(self):
+        """The connection for the calling thread (pooled) or the shared one"""
+        if self.pool:
+            return self.pool.get()
+        return self._conn
 
     def connect(self):
-        """Create a database connection to a SQLite database"""
+        """Create a database connection to a SQLite database.
+
+        Connecting is idempotent: an already open connection is reused.
+        """
+        if self._conn is not None:
+            return
         try:
-            self.conn = sqlite3.connect(self.db_file)
-            self.conn.row_factory = sqlite3.Row
+            if self.pool:
+                self._conn = self.pool.get()
+            else:
+                self._conn = open_connection(self.db_file, self.timeout, self.profile)
             self.create_table()
         except sqlite3.Error as e:
             print(e)
 
     def close(self):
         """Close the database connection"""
-        if self.conn:
-            self.conn.close()
+        if self.pool:
+            self.pool.close_all()
+        elif self._conn:
+            self._conn.close()
+        self._conn = None
+
+    def _retry(self, func):
+        return retry_busy(func, self.retries, self.backoff)
+
+    def _commit(self):
+        if not self._in_transaction():
+            self._retry(self.conn.commit)
+
+    def _in_transaction(self):
+        return getattr(self._local, 'depth', 0) > 0
+
+    @contextmanager
+    def transaction(self):
+        """Group every statement in the block into a single commit.
+
+        Blocks may be nested; only the outermost one commits, and any
+        exception rolls the whole transaction back. The write lock is taken
+        up front (BEGIN IMMEDIATE) so concurrent writers queue on busy_timeout
+        instead of failing mid-transaction.
+        """
+        conn = self.conn
+        depth = getattr(self._local, 'depth', 0)
+        if depth == 0 and not conn.in_transaction:
+            self._retry(lambda: conn.execute("BEGIN IMMEDIATE"))
+        self._local.depth = depth + 1
+        try:
+            yield self
+        except BaseException:
+            if depth == 0:
+                conn.rollback()
+            raise
+        else:
+            if depth == 0:
+                self._retry(conn.commit)
+        finally:
+            self._local.depth = depth
 
     def execute(self, sql, params=()):
         """Execute a SQL statement"""
+        start = time.perf_counter() if self.instrument else 0.0
+        try:
+            c = self._retry(lambda: self.conn.cursor().execute(sql, params))
+            self._commit()
+            if self.instrument:
+                self.instrument.statement(sql, max(c.rowcount, 0), time.perf_counter() - start)
+            return c
+        except sqlite3.Error as e:
+            if self.instrument:
+                self.instrument.error(sql, e)
+            print(e)
+            return None
+
+    def executemany(self, sql, seq_of_params):
+        """Execute a SQL statement for every parameter set in a single transaction"""
+        seq_of_params = list(seq_of_params)  # may be replayed if the database is busy
+        start = time.perf_counter() if self.instrument else 0.0
         try:
-            c = self.conn.cursor()
-            c.execute(sql, params)
-            self.conn.commit()
+            c = self._retry(lambda: self.conn.cursor().executemany(sql, seq_of_params))
+            self._commit()
+            if self.instrument:
+                self.instrument.statement(sql, max(c.rowcount, 0), time.perf_counter() - start)
             return c
         except sqlite3.Error as e:
+            if not self._in_transaction():
+                self.conn.rollback()
+            if self.instrument:
+                self.instrument.error(sql, e)
             print(e)
             return None
 
-    def fetchall(self, sql, params=()):
-        """Execute a SQL query and fetch all results"""
+    def _cursor(self, record):
+        c = self.conn.cursor()
+        if record is not None:
+            c.row_factory = lambda cursor, row: record._make(row)
+        return c
+
+    def fetchall(self, sql, params=(), record=None):
+        """Execute a SQL query and fetch all results.
+
+        Rows are dicts unless record is given, in which case each row is built
+        with record._make(row) (e.g. a namedtuple type) without an intermediate dict.
+        """
+        start = time.perf_counter() if self.instrument else 0.0
         try:
-            c = self.conn.cursor()
-            c.execute(sql, params)
-            rows = c.fetchall()
-            return [dict(row) for row in rows]
+            rows = self._retry(lambda: self._cursor(record).execute(sql, params).fetchall())
+            if not self.instrument:
+                return rows if record is not None else [dict(row) for row in rows]
+            # Time SQLite and the dict conversion separately (records are built during the fetch)
+            fetched = time.perf_counter()
+            if record is None:
+                rows = [dict(row) for row in rows]
+            self.instrument.statement(sql, len(rows), fetched - start, time.perf_counter() - fetched)
+            return rows
         except sqlite3.Error as e:
+            if self.instrument:
+                self.instrument.error(sql, e)
             print(e)
             return []
 
+    def fetchiter(self, sql, params=(), size=500, record=None):
+        """Execute a SQL query and lazily yield its rows, fetching size at a time"""
+        instrument = self.instrument
+        if instrument:
+            yield from self._fetchiter_timed(sql, params, size, record, instrument)
+            return
+        try:
+            c = self._retry(lambda: self._cursor(record).execute(sql, params))
+            while True:
+                rows = c.fetchmany(size)
+                if not rows:
+                    break
+                if record is not None:
+                    yield from rows
+                else:
+                    for row in rows:
+                        yield dict(row)
+        except sqlite3.Error as e:
+            print(e)
+
+    def _fetchiter_timed(self, sql, params, size, record, instrument):
+        """fetchiter, counting only the time spent inside SQLite and converting rows"""
+        elapsed = convert = 0.0
+        count = 0
+        try:
+            start = time.perf_counter()
+            c = self._retry(lambda: self._cursor(record).execute(sql, params))
+            while True:
+                rows = c.fetchmany(size)
+                fetched = time.perf_counter()
+                elapsed += fetched - start
+                if not rows:
+                    break
+                if record is None:
+                    rows = [dict(row) for row in rows]
+                    convert += time.perf_counter() - fetched
+                count += len(rows)
+                yield from rows
+                start = time.perf_counter()
+        except sqlite3.Error as e:
+            instrument.error(sql, e)
+            print(e)
+            return
+        instrument.statement(sql, count, elapsed, convert)
+
     def create_table(self):
-        """Create the tasks table if it doesn't exist"""
-        sql = """
-            CREATE TABLE IF NOT EXISTS tasks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                priority TEXT NOT NULL,
-                done BOOLEAN NOT NULL
+        """Create the tasks table at SCHEMA_VERSION, or migrate an existing older one"""
+        if self._table_exists("tasks"):
+            self.migrate()
+        else:
+            with self.transaction():
+                self.execute(TASKS_SCHEMA.format(name="tasks"))
+                for sql in TASK_INDEXES:
+                    self.execute(sql)
+                self.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.create_search_index()
+        if self.counters:
+            self.create_stats_table()
+        if self.journal:
+            self.create_journal_table()
+        if self.changes:
+            self.create_changes_table()
+
+    def _table_exists(self, name):
+        return bool(self.fetchall("SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)))
+
+    def _creating(self, table):
+        """A transaction while table is still missing, so it is set up atomically.
+
+        Once it exists every CREATE ... IF NOT EXISTS is a no-op, and
+        connecting need not queue behind other writers for the write lock.
+        """
+        return nullcontext() if self._table_exists(table) else self.transaction()
+
+    def schema_version(self):
+        """The schema version stored in the database file (0 for files older than versioning)"""
+        return self._retry(lambda: self.conn.execute("PRAGMA user_version").fetchone()[0])
+
+    def migrate(self, batch_size=MIGRATION_BATCH_ROWS):
+        """Upgrade the schema to SCHEMA_VERSION, applying each pending migration in order.
+
+        Returns the resulting version. Files written by a newer version of the
+        app are left untouched.
+        """
+        version = self.schema_version()
+        while version < SCHEMA_VERSION:
+            MIGRATIONS[version + 1](self, batch_size)
+            version = self.schema_version()
+        return version
+
+    def _migrate_typed_priority(self, batch_size):
+        """Version 1: integer priority, created_at/updated_at columns and their indexes.
+
+        Changing a column's type means rebuilding tasks, which is done online.
+        Triggers mirror any write made to tasks while its rows are copied into
+        tasks_v1. The copy runs batch_size rows per short transaction, so other
+        connections keep reading and writing. Only the final swap and index
+        build hold the write lock.
+        """
+        conn = self.conn
+        run = lambda sql, params=(): self._retry(lambda: conn.execute(sql, params))
+        start = time.perf_counter()
+        code = priority_code_sql("new.priority")
+        with self.transaction():
+            run(TASKS_SCHEMA.format(name="tasks_v1"))
+            run(f"""
+                CREATE TRIGGER IF NOT EXISTS tasks_v1_insert AFTER INSERT ON tasks BEGIN
+                    INSERT OR REPLACE INTO tasks_v1 (id, title, priority, done)
+                        VALUES (new.id, new.title, {code}, new.done);
+                END;
+            """)
+            run(f"""
+                CREATE TRIGGER IF NOT EXISTS tasks_v1_update AFTER UPDATE ON tasks BEGIN
+                    INSERT OR REPLACE INTO tasks_v1 (id, title, priority, done)
+                        VALUES (new.id, new.title, {code}, new.done);
+                END;
+            """)
+            run("""
+                CREATE TRIGGER IF NOT EXISTS tasks_v1_delete AFTER DELETE ON tasks BEGIN
+                    DELETE FROM tasks_v1 WHERE id = old.id;
+                END;
+            """)
+
+        copied, last_id = 0, 0
+        while True:
+            with self.transaction():
+                end = run("SELECT MAX(id) FROM (SELECT id FROM tasks WHERE id > ? ORDER BY id LIMIT ?)",
+                          (last_id, batch_size)).fetchone()[0]
+                if end is None:
+                    break
+                copied += run(f"INSERT OR IGNORE INTO tasks_v1 (id, title, priority, done) "
+                              f"SELECT id, title, {priority_code_sql('priority')}, done FROM tasks "
+                              f"WHERE id > ? AND id <= ?", (last_id, end)).rowcount
+                last_id = end
+
+        with self.transaction():
+            if self.schema_version() >= 1:
+                return  # another connection finished the migration first
+            # Keep AUTOINCREMENT from reusing ids of tasks deleted before the migration
+            seq = run("SELECT MAX(seq) FROM sqlite_sequence WHERE name IN ('tasks', 'tasks_v1')").fetchone()[0]
+            run("DELETE FROM sqlite_sequence WHERE name = 'tasks_v1'")
+            if seq is not None:
+                run("INSERT INTO sqlite_sequence (name, seq) VALUES ('tasks_v1', ?)", (seq,))
+            # Dropping tasks also drops its mirror, search, counter and change feed triggers
+            run("DROP TABLE tasks")
+            run("DROP TABLE IF EXISTS task_stats")
+            run("ALTER TABLE tasks_v1 RENAME TO tasks")
+            for sql in TASK_INDEXES:
+                run(sql)
+            # Recreate the triggers before committing so no write goes unindexed or uncounted
+            self.create_search_index()
+            if self.counters:
+                self.create_stats_table()
+            if self.changes:
+                self.create_changes_table()
+            run("PRAGMA user_version = 1")
+        # stderr, so a migration on first use doesn't end up in `export -` output
+        print(f"Migrated {copied} tasks to schema version 1 in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    def create_stats_table(self):
+        """Create the task_stats summary table and the triggers that keep its counts current.
+
+        task_stats holds one row per (priority, done) pair, so aggregate
+        statistics cost a handful of rows however large tasks grows. It is
+        created, wired up and seeded in one transaction, so another process
+        can't write a task between the seeding and the triggers.
+        """
+        with self._creating("task_stats"):
+            existed = self._table_exists("task_stats")
+            self.execute("""
+                CREATE TABLE IF NOT EXISTS task_stats (
+                    priority INTEGER NOT NULL,
+                    done INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (priority, done)
+                ) WITHOUT ROWID;
+            """)
+            self.execute("""
+                CREATE TRIGGER IF NOT EXISTS task_stats_insert AFTER INSERT ON tasks BEGIN
+                    INSERT INTO task_stats (priority, done, count) VALUES (new.priority, new.done, 1)
+                        ON CONFLICT (priority, done) DO UPDATE SET count = count + 1;
+                END;
+            """)
+            self.execute("""
+                CREATE TRIGGER IF NOT EXISTS task_stats_delete AFTER DELETE ON tasks BEGIN
+                    UPDATE task_stats SET count = count - 1 WHERE priority = old.priority AND done = old.done;
+                END;
+            """)
+            self.execute("""
+                CREATE TRIGGER IF NOT EXISTS task_stats_update AFTER UPDATE OF priority, done ON tasks BEGIN
+                    UPDATE task_stats SET count = count - 1 WHERE priority = old.priority AND done = old.done;
+                    INSERT INTO task_stats (priority, done, count) VALUES (new.priority, new.done, 1)
+                        ON CONFLICT (priority, done) DO UPDATE SET count = count + 1;
+                END;
+            """)
+            if not existed:
+                # Seed the counts from tasks written before the summary table existed
+                self.execute("INSERT INTO task_stats (priority, done, count) "
+                             "SELECT priority, done, COUNT(*) FROM tasks GROUP BY priority, done")
+        self.has_counters = True
+
+    def create_journal_table(self):
+        """Create the task_log operation journal behind TaskManager.undo and redo.
+
+        Rows are appended in seq (rowid) order, one group per action, and only
+        their undone flag ever changes. The partial index holds just the
+        undone rows (the redo stack), so ordinary appends never touch it.
+        """
+        self.execute("""
+            CREATE TABLE IF NOT EXISTS task_log (
+                seq INTEGER PRIMARY KEY,
+                action INTEGER NOT NULL,
+                op TEXT NOT NULL,
+                task_id INTEGER NOT NULL,
+                title TEXT,
+                priority INTEGER,
+                done INTEGER,
+                prev_done INTEGER,
+                created_at INTEGER,
+                undone INTEGER NOT NULL DEFAULT 0
             );
+        """)
+        self.execute("CREATE INDEX IF NOT EXISTS idx_task_log_redo ON task_log (seq) WHERE undone = 1")
+        self.has_journal = True
+
+    def create_changes_table(self):
+        """Create the task_changes feed behind TaskManager.changes_since.
+
+        Triggers append the id of every inserted, updated or deleted task
+        under a monotonic seq (AUTOINCREMENT never hands out a seq twice), so
+        any writer, including another process, feeds it. Readers remember the
+        last seq they saw and fetch only the tasks changed after it. Every
+        CHANGES_PRUNE_EVERY rows the feed drops rows older than the last
+        CHANGES_KEEP_ROWS; a reader further behind than that reloads instead.
+        """
+        with self._creating("task_changes"):
+            self.execute("""
+                CREATE TABLE IF NOT EXISTS task_changes (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id INTEGER NOT NULL,
+                    op TEXT NOT NULL
+                );
+            """)
+            for op, event, row in (("insert", "INSERT", "new"), ("update", "UPDATE", "new"), ("delete", "DELETE", "old")):
+                self.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS task_changes_{op} AFTER {event} ON tasks BEGIN
+                        INSERT INTO task_changes (task_id, op) VALUES ({row}.id, '{op}');
+                    END;
+                """)
+            self.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS task_changes_prune AFTER INSERT ON task_changes
+                WHEN new.seq % {CHANGES_PRUNE_EVERY} = 0 BEGIN
+                    DELETE FROM task_changes WHERE seq <= new.seq - {CHANGES_KEEP_ROWS};
+                END;
+            """)
+        self.has_changes = True
+
+    def create_search_index(self):
+        """Create the FTS5 index over task titles and the triggers that keep it in sync.
+
+        SQLite builds without FTS5 are left without an index (has_fts stays
+        False) and TaskManager.search falls back to a LIKE scan. The index is
+        created and rebuilt in one transaction with its triggers, so no task
+        written meanwhile is left out.
         """
-        self.execute(sql)
+        with self._creating("tasks_fts"):
+            existed = self._table_exists("tasks_fts")
+            try:
+                self._retry(lambda: self.conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(title, content='tasks', content_rowid='id')"
+                ))
+            except sqlite3.OperationalError:
+                self.has_fts = False
+                return
+            self.execute("""
+                CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+                    INSERT INTO tasks_fts (rowid, title) VALUES (new.id, new.title);
+                END;
+            """)
+            self.execute("""
+                CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+                    INSERT INTO tasks_fts (tasks_fts, rowid, title) VALUES ('delete', old.id, old.title);
+                END;
+            """)
+            self.execute("""
+                CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title ON tasks BEGIN
+                    INSERT INTO tasks_fts (tasks_fts, rowid, title) VALUES ('delete', old.id, old.title);
+                    INSERT INTO tasks_fts (rowid, title) VALUES (new.id, new.title);
+                END;
+            """)
+            if not existed:
+                # Index any tasks written before the search index existed
+                self.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+        self.has_fts = True
+
+# Migration applied to reach each schema version, run in order by Storage.migrate
+MIGRATIONS = {
+    1: Storage._migrate_typed_priority,
+}
+
+def init_database(db_file=DEFAULT_DB_FILE, **kwargs):
+    """Initialize the database and return the connected Storage for reuse.
 
-def init_database():
-    """Initialize the database and create the table"""
-    db = Storage('todo.db')
+    Statement metrics are switched on by the TODO_METRICS / TODO_SLOW_MS
+    environment variables unless an instrument is passed explicitly.
+    """
+    if "instrument" not in kwargs:
+        from instrument import metrics_from_env
+        kwargs["instrument"] = metrics_from_env()
+    db = Storage(db_file, **kwargs)
     db.connect()
-    db.create_table()
-    db.close()
+    return db
+
+class TaskLists:
+    """Routes each named task list to its own database file (shard).
+
+    The default list is base_file itself; a list called "work" lives in
+    todo-work.db next to it. Every list has its own file and therefore its
+    own write lock, so writers on different lists never wait for each other.
+    Storages are opened on first use with storage_kwargs and kept open.
+    """
+
+    def __init__(self, base_file=DEFAULT_DB_FILE, **storage_kwargs):
+        self.base_file = base_file
+        if "instrument" not in storage_kwargs:
+            # One set of counters (and one TODO_METRICS file) shared by every list
+            from instrument import metrics_from_env
+            storage_kwargs["instrument"] = metrics_from_env()
+        self.storage_kwargs = storage_kwargs
+        self._storages = {}
+        self._lock = threading.Lock()
+
+    def _file_prefix(self):
+        return os.path.splitext(self.base_file)[0] + "-"
+
+    def path(self, name=DEFAULT_LIST):
+        """Database file holding the list called name"""
+        if not LIST_NAME.fullmatch(name or ""):
+            raise ValueError(f"Invalid list name: {name!r} (use letters, digits, _ and -)")
+        if name == DEFAULT_LIST:
+            return self.base_file
+        return f"{self._file_prefix()}{name}.db"
+
+    def names(self):
+        """Names of the lists that exist on disk, default first"""
+        import glob
+        prefix = self._file_prefix()
+        found = sorted(path[len(prefix):-len(".db")] for path in glob.glob(glob.escape(prefix) + "*.db"))
+        names = [name for name in found if LIST_NAME.fullmatch(name) and name != DEFAULT_LIST]
+        if os.path.exists(self.base_file):
+            names.insert(0, DEFAULT_LIST)
+        return names
+
+    def storage(self, name=DEFAULT_LIST):
+        """The connected Storage of a list, creating its file on first use"""
+        path = self.path(name)
+        with self._lock:
+            db = self._storages.get(name)
+            if db is None:
+                db = self._storages[name] = Storage(path, **self.storage_kwargs)
+                db.connect()
+            return db
+
+    def close(self):
+        with self._lock:
+            for db in self._storages.values():
+                db.close()
+            self._storages.clear()
+
+    @contextmanager
+    def attached(self, names=None):
+        """Yields a read-only connection with the lists in names attached as l0, l1, ...
+
+        Query them as l0.tasks and so on. The aliases are generated because a
+        list may be called "main" or "temp", which SQLite reserves as schema
+        names. The connection is separate from the lists' own Storages, so a
+        long cross-list read never holds up their writers. At most
+        ATTACH_LIMIT lists can be attached at once.
+        """
+        from urllib.parse import quote
+        names = self.names() if names is None else list(names)
+        if len(names) > ATTACH_LIMIT:
+            raise ValueError(f"Cannot attach more than {ATTACH_LIMIT} lists at once")
+        conn = sqlite3.connect(":memory:", uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            for i, name in enumerate(names):
+                uri = "file:" + quote(os.path.abspath(self.path(name))) + "?mode=ro"
+                conn.execute(f"ATTACH DATABASE ? AS l{i}", (uri,))
+            yield conn
+        finally:
+            conn.close()
+
+    def summary(self, names=None):
+        """Task counts of every list, read with one UNION ALL query per ATTACH_LIMIT lists.
+
+        Returns a list of {"name", "total", "done"} dicts, in the order of names.
+        """
+        names = self.names() if names is None else list(names)
+        rows = []
+        for start in range(0, len(names), ATTACH_LIMIT):
+            chunk = names[start:start + ATTACH_LIMIT]
+            sql = " UNION ALL ".join(
+                f"SELECT ? AS name, COUNT(*) AS total, IFNULL(SUM(done), 0) AS done FROM l{i}.tasks"
+                for i in range(len(chunk)))
+            with self.attached(chunk) as conn:
+                rows.extend(dict(row) for row in conn.execute(sql, chunk))
+        return rows
 
 if __name__ == '__main__':
-    init_database()
\ No newline at end of file
+    init_database().close()
\ No newline at end of file
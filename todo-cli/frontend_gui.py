@@ -1,18 +1,70 @@
+from bisect import bisect_left
+from itertools import chain
 import customtkinter as ctk
 import database
 import tasks  # Importing your database logic
+from tasks import format_stats
+from worker import SEARCH_DELAY_MS, SEARCH_RESULTS, ChangeFeed, DatabaseWorker, RefreshScheduler
+from instrument import profiled
+
+# Height in pixels reserved for one task row in the virtualized list
+ROW_HEIGHT = 44
 
 # Set the appearance
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("green")
 
+class TaskRow:
+    """One recycled row of the task list, rebound to a different task as the list scrolls."""
+
+    def __init__(self, parent, on_toggle, on_delete):
+        self.task_id = None
+        self.frame = ctk.CTkFrame(parent, height=ROW_HEIGHT - 10)
+
+        self.label = ctk.CTkLabel(self.frame, text="", width=300, anchor="w")
+        self.label.pack(side="left", padx=10)
+
+        # Toggle Status Button
+        self.done_btn = ctk.CTkButton(self.frame, text="", width=80, command=lambda: on_toggle(self.task_id))
+        self.done_btn.pack(side="right", padx=5)
+
+        # Delete Button
+        self.del_btn = ctk.CTkButton(self.frame, text="Delete", width=80, fg_color="#c0392b",
+                                     command=lambda: on_delete(self.task_id))
+        self.del_btn.pack(side="right", padx=5)
+
+    def show(self, task):
+        """Binds the row to task, only reconfiguring widgets when the data changed."""
+        task_id, title, priority, done = task
+        text = f"ID: {task_id} [{priority}] {title}"
+        if self.label.cget("text") != text:
+            self.label.configure(text=text)
+        status_text = "Done" if done else "Not Done"
+        if self.done_btn.cget("text") != status_text:
+            self.done_btn.configure(text=status_text, fg_color="#27ae60" if done else "#34495e")
+        self.task_id = task_id
+        if not self.frame.winfo_ismapped():
+            self.frame.pack(fill="x", pady=5)
+
+    def hide(self):
+        self.task_id = None
+        self.frame.pack_forget()
+
+
 class TodoApp(ctk.CTk):
-    def __init__(self):
+    def __init__(self, storage=None):
         super().__init__()
 
-        self.db_storage = database.Storage('todo.db')
-        self.db_storage.connect()
-        self.task_manager = tasks.TaskManager(self.db_storage)
+        # A pooled Storage lets the background worker thread open its own connection
+        self.db_storage = storage if storage is not None else database.Storage(database.DEFAULT_DB_FILE, pool_size=2)
+        self.task_manager = tasks.TaskManager(self.db_storage, cache=True)
+        self.worker = DatabaseWorker(self, self.task_manager, on_busy=self.set_loading)
+        self.scheduler = RefreshScheduler(self, self.worker, lambda: self.feed.poll(),
+                                          reload=self.load_tasks_ui)
+        self.feed = ChangeFeed(self, self.worker, self.scheduler, self.apply_changes, self.load_tasks_ui)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.bind("<Control-z>", lambda event: self.undo_ui())
+        self.bind("<Control-y>", lambda event: self.redo_ui())
 
         self.title("AI-101 Python Todo - Frontend")
         self.geometry("600x500")
@@ -35,58 +87,210 @@ class TodoApp(ctk.CTk):
         self.add_button = ctk.CTkButton(self.input_frame, text="Add Task", command=self.add_task_ui)
         self.add_button.pack(side="left", padx=10)
 
-        # Scrollable Task List
-        self.task_list_frame = ctk.CTkScrollableFrame(self, label_text="Tasks")
-        self.task_list_frame.pack(pady=20, padx=20, fill="both", expand=True)
+        # Live Search
+        self.search_entry = ctk.CTkEntry(self, placeholder_text="Search tasks...")
+        self.search_entry.pack(padx=20, fill="x")
+        self.search_entry.bind("<KeyRelease>", lambda event: self.schedule_search())
+        self.search_job = None
+
+        # Virtualized Task List: a fixed pool of rows is rebound to the tasks in view
+        self.list_container = ctk.CTkFrame(self)
+        self.list_container.pack(pady=20, padx=20, fill="both", expand=True)
+
+        self.list_label = ctk.CTkLabel(self.list_container, text="Tasks")
+        self.list_label.pack(side="top")
+
+        self.loading_label = ctk.CTkLabel(self.list_container, text="", text_color="#f1c40f")
+        self.loading_label.pack(side="bottom")
+
+        # Summary Panel
+        self.stats_label = ctk.CTkLabel(self, text="", anchor="w")
+        self.stats_label.pack(padx=20, pady=(0, 10), fill="x")
+
+        self.scrollbar = ctk.CTkScrollbar(self.list_container, command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.task_list_frame = ctk.CTkFrame(self.list_container, fg_color="transparent")
+        self.task_list_frame.pack(side="left", fill="both", expand=True)
+        self.task_list_frame.bind("<Configure>", lambda event: self.render_rows())
+
+        self.bind_all("<MouseWheel>", self.on_mousewheel)
+        self.bind_all("<Button-4>", lambda event: self.scroll_rows(-3))
+        self.bind_all("<Button-5>", lambda event: self.scroll_rows(3))
+
+        self.tasks_data = []
+        # False while tasks_data is the TaskManager's shared cache list, which must be copied before editing
+        self.owns_data = True
+        self.rows = []
+        self.first_row = 0
 
         self.load_tasks_ui()
+        self.feed.start()
+
+    def schedule_search(self):
+        """Runs the search once typing pauses instead of on every keystroke."""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(SEARCH_DELAY_MS, self.load_tasks_ui)
 
+    @profiled
     def load_tasks_ui(self):
-        """Clears and reloads tasks from the database into the UI."""
-        # Clear existing widgets in the scrollable frame
-        for widget in self.task_list_frame.winfo_children():
-            widget.destroy()
+        """Reloads tasks (or the search matches) on the worker thread.
 
-        # Fetch from DB using TaskManager
-        tasks_data = self.task_manager.get_tasks()
+        A newer reload supersedes a pending one.
+        """
+        self.search_job = None
+        self.feed.reset()
+        query = self.search_entry.get().strip()
+        if query:
+            self.worker.submit(tasks.TaskManager.search, query, SEARCH_RESULTS, callback=self.show_tasks, key="refresh")
+        else:
+            self.worker.submit(tasks.TaskManager.get_tasks, callback=self.show_tasks, key="refresh")
+        self.worker.submit(tasks.TaskManager.stats, callback=self.show_stats, key="stats")
 
-        for task in tasks_data:
-            task_id, title, priority, done = task['id'], task['title'], task['priority'], task['done']
-            status_text = "Done" if done else "Not Done"
-            btn_color = "#27ae60" if done else "#34495e"
+    def show_stats(self, stats):
+        self.stats_label.configure(text=format_stats(stats))
 
-            # Create a row frame for each task
-            row_frame = ctk.CTkFrame(self.task_list_frame)
-            row_frame.pack(fill="x", pady=5)
+    @profiled
+    def show_tasks(self, tasks_data):
+        # Read before our own writes landed, so it would undo their optimistic updates
+        if not self.scheduler.accepts():
+            return
+        self.tasks_data = tasks_data
+        self.owns_data = False
+        self.render_rows()
 
-            lbl = ctk.CTkLabel(row_frame, text=f"ID: {task_id} [{priority}] {title}", width=300, anchor="w")
-            lbl.pack(side="left", padx=10)
+    @profiled
+    def apply_changes(self, changes):
+        """Applies a change feed delta, {task_id: Task or None}, to tasks_data.
 
-            # Toggle Status Button
-            done_btn = ctk.CTkButton(row_frame, text=status_text, width=80, fg_color=btn_color,
-                                     command=lambda i=task_id: self.toggle_task_ui(i))
-            done_btn.pack(side="right", padx=5)
+        Without a search tasks_data is in id order. Tasks are tuples led by
+        their id, so (task_id,) sorts just before that task and bisection
+        finds where each changed task is, or belongs.
+        """
+        if self.search_job is not None:
+            return  # the pending search reloads the list anyway
+        if self.search_entry.get().strip():
+            # Ranked matches can't be patched in place; search again
+            self.load_tasks_ui()
+            return
+        if not self.owns_data:
+            self.tasks_data = list(self.tasks_data)
+            self.owns_data = True
+        data = self.tasks_data
+        for task_id, task in sorted(changes.items()):
+            index = bisect_left(data, (task_id,))
+            present = index < len(data) and data[index].id == task_id
+            if task is None:
+                if present:
+                    del data[index]
+            elif present:
+                data[index] = task
+            else:
+                data.insert(index, task)
+        self.render_rows()
+        self.worker.submit(tasks.TaskManager.stats, callback=self.show_stats, key="stats")
+
+    def set_loading(self, busy):
+        self.loading_label.configure(text="Loading..." if busy else "")
+
+    def on_close(self):
+        self.feed.cancel()
+        self.scheduler.cancel()
+        self.worker.shutdown()
+        self.destroy()
+
+    def visible_rows(self):
+        return max(1, self.task_list_frame.winfo_height() // ROW_HEIGHT)
+
+    @profiled
+    def render_rows(self):
+        """Rebinds the pooled rows to the slice of tasks starting at first_row.
+
+        Only as many rows as fit the viewport ever exist (rows left over
+        after the window shrinks are hidden), so redraw cost does not grow
+        with the number of tasks.
+        """
+        total = len(self.tasks_data)
+        visible = self.visible_rows()
+        self.first_row = max(0, min(self.first_row, total - visible))
+
+        while len(self.rows) < visible:
+            self.rows.append(TaskRow(self.task_list_frame, self.toggle_task_ui, self.delete_task_ui))
+
+        for offset, row in enumerate(self.rows):
+            index = self.first_row + offset
+            if offset < visible and index < total:
+                row.show(self.tasks_data[index])
+            else:
+                row.hide()
+
+        if total > visible:
+            self.scrollbar.set(self.first_row / total, (self.first_row + visible) / total)
+        else:
+            self.scrollbar.set(0, 1)
 
-            # Delete Button
-            del_btn = ctk.CTkButton(row_frame, text="Delete", width=80, fg_color="#c0392b",
-                                    command=lambda i=task_id: self.delete_task_ui(i))
-            del_btn.pack(side="right", padx=5)
+    def scroll_rows(self, delta):
+        self.first_row += delta
+        self.render_rows()
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.first_row = int(float(amount) * len(self.tasks_data))
+            self.render_rows()
+        elif action == "scroll":
+            step = self.visible_rows() if unit == "pages" else 1
+            self.scroll_rows(int(amount) * step)
+
+    def on_mousewheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
 
     def add_task_ui(self):
         title = self.task_entry.get()
         priority = self.priority_dropdown.get()
         if title:
-            self.task_manager.add_task(title, priority)
             self.task_entry.delete(0, 'end')
-            self.load_tasks_ui()
+            self.scheduler.write(tasks.TaskManager.add_task, title, priority)
 
     def toggle_task_ui(self, task_id):
-        self.task_manager.mark_task(task_id)
-        self.load_tasks_ui()
+        # mark_tasks and delete_tasks return how many rows changed, so a miss triggers a reload
+        self.scheduler.write(tasks.TaskManager.mark_tasks, [task_id], optimistic=lambda: self.update_task(task_id))
 
     def delete_task_ui(self, task_id):
-        self.task_manager.delete_task(task_id)
-        self.load_tasks_ui()
+        self.scheduler.write(tasks.TaskManager.delete_tasks, [task_id],
+                             optimistic=lambda: self.update_task(task_id, delete=True))
+
+    def undo_ui(self):
+        """Reverts the latest add, toggle or delete (Ctrl+Z); the list catches up once it lands."""
+        self.scheduler.write(tasks.TaskManager.undo)
+
+    def redo_ui(self):
+        """Re-applies the change undone last (Ctrl+Y)."""
+        self.scheduler.write(tasks.TaskManager.redo)
+
+    def find_task(self, task_id):
+        """Index of task_id in tasks_data, looking at the rows on screen first."""
+        data = self.tasks_data
+        on_screen = range(self.first_row, min(self.first_row + len(self.rows), len(data)))
+        for index in chain(on_screen, range(len(data))):
+            if data[index].id == task_id:
+                return index
+        return None
+
+    def update_task(self, task_id, delete=False):
+        """Optimistically toggles (or removes) a task in the list shown, before the database confirms it."""
+        index = self.find_task(task_id)
+        if index is None:
+            return
+        if not self.owns_data:
+            self.tasks_data = list(self.tasks_data)
+            self.owns_data = True
+        if delete:
+            del self.tasks_data[index]
+        else:
+            task = self.tasks_data[index]
+            self.tasks_data[index] = task._replace(done=int(not task.done))
+        self.render_rows()
 
 if __name__ == "__main__":
     app = TodoApp()
@@ -0,0 +1,186 @@
+# instrument.py
+"""Statement metrics for Storage and profiling hooks for TaskManager and the GUIs.
+
+Everything is off unless switched on through the environment:
+
+    TODO_METRICS=metrics.json   time every statement, write the counters there at exit
+    TODO_SLOW_MS=50             log statements slower than this to stderr
+    TODO_PROFILE=cprofile       profile TaskManager calls and GUI refreshes...
+    TODO_PROFILE_OUT=todo.prof  ...into this file at exit (read it with pstats or snakeviz)
+    TODO_PROFILE=trace          print each of those calls and its duration to stderr
+
+When off, Storage skips a single `if` per statement and profiled() hands the
+function back unwrapped, so there is nothing left to pay for.
+"""
+import atexit
+import os
+import sys
+import threading
+import time
+from functools import wraps
+from types import FunctionType
+# cProfile, pstats and json are imported only once they are needed, keeping CLI startup fast
+
+PROFILE_MODE = os.environ.get("TODO_PROFILE", "").strip().lower()
+PROFILE_OUT = os.environ.get("TODO_PROFILE_OUT", "todo.prof")
+
+
+class Metrics:
+    """Per-statement counters fed by Storage; also the slow-query log.
+
+    Any object with the same statement() and error() methods can be passed
+    to Storage(instrument=...) instead, e.g. to forward timings elsewhere.
+    """
+
+    def __init__(self, slow_ms=None, slow_log=None):
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self.slow_queries = 0
+        self.started = time.time()
+        # Normalized SQL -> [calls, rows, seconds, max seconds, conversion seconds, errors]
+        self._statements = {}
+        self._normalized = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, sql):
+        key = self._normalized.get(sql)
+        if key is None:
+            key = self._normalized[sql] = " ".join(sql.split())
+        entry = self._statements.get(key)
+        if entry is None:
+            entry = self._statements[key] = [0, 0, 0.0, 0.0, 0.0, 0]
+        return key, entry
+
+    def statement(self, sql, rows, elapsed, convert=0.0):
+        """Record one statement: rows touched, seconds in SQLite and seconds turning rows into dicts"""
+        with self._lock:
+            key, entry = self._entry(sql)
+            entry[0] += 1
+            entry[1] += rows
+            entry[2] += elapsed
+            entry[3] = max(entry[3], elapsed)
+            entry[4] += convert
+        if self.slow_ms is not None and (elapsed + convert) * 1000 >= self.slow_ms:
+            self.slow_queries += 1
+            print(f"[slow query] {elapsed * 1000:.1f}ms sqlite + {convert * 1000:.1f}ms convert, "
+                  f"{rows} rows: {key}", file=self.slow_log or sys.stderr)
+
+    def error(self, sql, error):
+        with self._lock:
+            self._entry(sql)[1][5] += 1
+
+    def snapshot(self):
+        """The counters as a JSON-ready dict, slowest total time first"""
+        with self._lock:
+            items = [(sql, list(entry)) for sql, entry in self._statements.items()]
+        statements = [
+            {
+                "sql": sql,
+                "calls": calls,
+                "rows": rows,
+                "total_ms": total * 1000,
+                "mean_ms": total * 1000 / calls if calls else 0.0,
+                "max_ms": worst * 1000,
+                "convert_ms": convert * 1000,
+                "errors": errors,
+            }
+            for sql, (calls, rows, total, worst, convert, errors) in items
+        ]
+        statements.sort(key=lambda s: s["total_ms"], reverse=True)
+        return {
+            "uptime_s": time.time() - self.started,
+            "slow_queries": self.slow_queries,
+            "statements": statements,
+        }
+
+    def write(self, path):
+        """Write snapshot() to path as JSON, replacing the old file in one step"""
+        import json
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp, path)
+
+
+def metrics_from_env(environ=os.environ):
+    """Metrics configured from TODO_METRICS / TODO_SLOW_MS, or None when neither is set"""
+    path = environ.get("TODO_METRICS")
+    slow_ms = environ.get("TODO_SLOW_MS")
+    if not path and not slow_ms:
+        return None
+    metrics = Metrics(slow_ms=float(slow_ms) if slow_ms else None)
+    if path:
+        atexit.register(metrics.write, path)
+    return metrics
+
+
+# --- Profiling hooks ---
+
+_profiles = []
+_local = threading.local()
+
+
+def _thread_profile():
+    profile = getattr(_local, "profile", None)
+    if profile is None:
+        import cProfile
+        profile = _local.profile = cProfile.Profile()
+        _local.depth = 0
+        _profiles.append(profile)
+        if len(_profiles) == 1 and PROFILE_MODE == "cprofile":
+            atexit.register(write_profile, PROFILE_OUT)
+    return profile
+
+
+def profiled(func, mode=None):
+    """Wrap func in the TODO_PROFILE hook; returns func itself when profiling is off"""
+    mode = PROFILE_MODE if mode is None else mode
+    if mode == "cprofile":
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # One profiler per thread, switched on only by the outermost profiled call
+            profile = _thread_profile()
+            _local.depth += 1
+            if _local.depth == 1:
+                profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _local.depth -= 1
+                if _local.depth == 0:
+                    profile.disable()
+        return wrapper
+    if mode == "trace":
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                print(f"[trace] {func.__qualname__} {(time.perf_counter() - start) * 1000:.2f}ms "
+                      f"({threading.current_thread().name})", file=sys.stderr)
+        return wrapper
+    return func
+
+
+def profile_methods(cls, mode=None):
+    """Class decorator applying profiled() to every public method of cls"""
+    mode = PROFILE_MODE if mode is None else mode
+    if mode:
+        for name, attr in list(vars(cls).items()):
+            if not name.startswith("_") and isinstance(attr, FunctionType):
+                setattr(cls, name, profiled(attr, mode))
+    return cls
+
+
+def write_profile(path=PROFILE_OUT):
+    """Merge the per-thread cProfile data collected so far into one pstats file"""
+    profiles = [p for p in list(_profiles) if p.getstats()]
+    if not profiles:
+        return None
+    import pstats
+    stats = pstats.Stats(profiles[0])
+    for profile in profiles[1:]:
+        stats.add(profile)
+    stats.dump_stats(path)
+    return stats
@@ -1,16 +1,25 @@
 # main.py
+import time
+_START = time.perf_counter()
+
+import argparse
+import os
+import shlex
 import sys
-from tasks import TaskManager
-from database import init_database, Storage
-from frontend_gui import TodoApp
+from tasks import TaskManager, BULK_CHUNK_SIZE, LIST_PAGE_SIZE, ORDER_COLUMNS, STATUS_FILTERS, parse_task_ids
+from database import DEFAULT_LIST, LIST_NAME, TaskLists
+# The GUI stack (frontend_gui / customtkinter), bulk readers and the API server are imported on demand
+_IMPORTED = time.perf_counter()
 
 G = "\033[92m"
 W = "\033[97m"
 R = "\033[0m"
 
 class TodoAppCLI:
-    def __init__(self):
-        storage = Storage('todo.db')
+    def __init__(self, storage=None, lists=None):
+        self.lists = lists if lists is not None else TaskLists()
+        if storage is None:
+            storage = self.lists.storage()
         self.task_manager = TaskManager(storage)
 
     def run(self):
@@ -25,6 +34,8 @@ class TodoAppCLI:
         print(f"{G}2.{W} List Tasks")
         print(f"{G}3.{W} Toggle Complete")
         print(f"{G}4.{W} Delete Task")
+        print(f"{G}5.{W} Search Tasks")
+        print(f"{G}6.{W} Statistics")
         print(f"{G}0.{W} Exit{R}")
 
     def process_choice(self, choice):
@@ -36,6 +47,10 @@ class TodoAppCLI:
             self.mark_task()
         elif choice == '4':
             self.delete_task()
+        elif choice == '5':
+            self.search_tasks()
+        elif choice == '6':
+            self.task_manager.show_stats()
         elif choice == '0':
             print(f"{G}Goodbye!{R}")
             exit()
@@ -56,21 +71,308 @@ class TodoAppCLI:
         self.task_manager.list_tasks()
 
     def mark_task(self):
-        tid = input(f"{W}Enter ID to toggle: {R}").strip()
-        self.task_manager.mark_task(tid)
+        tid = input(f"{W}Enter ID(s) to toggle (e.g. 3, 1,4 or 3-40): {R}").strip()
+        ids = parse_task_ids(tid)
+        if not ids:
+            print(f"{W}[!] Invalid task ID.{R}")
+        elif len(ids) == 1:
+            self.task_manager.mark_task(ids[0])
+        else:
+            self.task_manager.mark_tasks(ids)
 
     def delete_task(self):
-        tid = input(f"{W}Enter ID to delete: {R}").strip()
-        self.task_manager.delete_task(tid)
+        tid = input(f"{W}Enter ID(s) to delete (e.g. 3, 1,4 or 3-40): {R}").strip()
+        ids = parse_task_ids(tid)
+        if not ids:
+            print(f"{W}[!] Invalid task ID.{R}")
+        elif len(ids) == 1:
+            self.task_manager.delete_task(ids[0])
+        else:
+            self.task_manager.delete_tasks(ids)
+
+    def search_tasks(self):
+        query = input(f"{W}Search (words match prefixes, \"quote\" phrases): {R}").strip()
+        if query:
+            self.task_manager.search_tasks(query)
+
+    def show_lists(self):
+        rows = self.lists.summary()
+        if not rows:
+            print(f"{W}[!] No task lists yet.{R}")
+            return
+        for row in rows:
+            print(f"{G}{row['name']:<20}{W}{row['done']}/{row['total']} done{R}")
+
+    def print_tasks(self, **options):
+        try:
+            self.task_manager.list_tasks(**options)
+        except BrokenPipeError:
+            # Output was piped into a pager that exited early; silence the final flush
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+
+    def import_tasks(self, path, chunk_size=BULK_CHUNK_SIZE, jobs=None, check=False):
+        """Imports (or with check, only validates) a file; jobs > 0 parses it on that many processes.
+
+        Malformed rows are skipped and listed by line number. Returns a
+        non-zero exit code if the file can't be opened or has an unsupported
+        format, or if check finds malformed rows.
+        """
+        from bulk import RowErrors, default_jobs, import_parallel, read_tasks_file
+        jobs = default_jobs() if jobs is None else jobs
+        start = time.perf_counter()
+        progress = show_progress if sys.stderr.isatty() and (jobs or check) else None
+        errors = RowErrors()
+        try:
+            if not jobs and not check:
+                self.task_manager.add_tasks(read_tasks_file(path, errors), chunk_size=chunk_size)
+            else:
+                insert = None if check else self.task_manager.insert_rows
+                count, skipped = import_parallel(path, insert, jobs, progress=progress, errors=errors)
+        except (OSError, ValueError) as e:
+            if progress:
+                print(file=sys.stderr)
+            print(f"{W}[!] Import failed: {e}{R}", file=sys.stderr)
+            return 1
+        if progress:
+            print(file=sys.stderr)
+        if jobs or check:
+            elapsed = time.perf_counter() - start
+            rate = count / elapsed if elapsed > 0 else count
+            verb = "Checked" if check else "Added"
+            print(f"{G}[+] {verb} {count} tasks in {elapsed:.2f}s ({rate:.0f} rows/sec).{R}")
+            if skipped:
+                print(f"{W}[!] Skipped {skipped} rows without a title.{R}")
+        report_row_errors(errors)
+        return 1 if check and errors.count else 0
+
+    def export_tasks(self, path="-", fmt=None, compress=None, jobs=None):
+        from bulk import default_jobs, export_parallel, export_tasks, write_tasks
+        jobs = default_jobs() if jobs is None else jobs
+        start = time.perf_counter()
+        tasks = self.task_manager.iter_tasks()
+        if path == "-":
+            fmt = fmt or "jsonl"
+            count = write_tasks(tasks, sys.stdout.buffer if fmt == "columnar" else sys.stdout, fmt)
+            report = sys.stderr
+        elif jobs:
+            count = export_parallel(tasks, path, fmt, compress, jobs)
+            report = sys.stdout
+        else:
+            count = export_tasks(tasks, path, fmt, compress)
+            report = sys.stdout
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else count
+        print(f"{G}[+] Exported {count} tasks to {path} in {elapsed:.2f}s ({rate:.0f} rows/sec).{R}", file=report)
+
+
+def show_progress(rows, bytes_read, total_bytes):
+    """Progress line for long imports, redrawn in place on stderr"""
+    percent = bytes_read * 100 // total_bytes if total_bytes else 100
+    print(f"\r{G}[import]{W} {percent:3d}% {rows} rows{R}", end="", file=sys.stderr, flush=True)
+
+
+def report_row_errors(errors):
+    """Lists the malformed rows an import skipped, one line each"""
+    if not errors.count:
+        return
+    print(f"{W}[!] Skipped {errors.count} malformed rows:{R}")
+    for line, reason in errors.first:
+        print(f"{W}    line {line}: {reason}{R}")
+    if errors.count > len(errors.first):
+        print(f"{W}    ... and {errors.count - len(errors.first)} more{R}")
+
+
+PRIORITIES = ["Low", "Medium", "High"]
+
+
+def list_name(value):
+    if not LIST_NAME.fullmatch(value):
+        raise argparse.ArgumentTypeError(f"invalid list name {value!r} (use letters, digits, _ and -)")
+    return value
+
+
+def build_parser(batch=False):
+    """The command line parser; with batch, the one for --batch lines.
+
+    A batch line takes no global options and can only run the subcommands
+    that work inside the batch's transaction on the chosen list.
+    """
+    if batch:
+        parser = argparse.ArgumentParser(prog="--batch line", description="One subcommand of a --batch script")
+        subparsers = parser.add_subparsers(dest="command")
+        _add_task_commands(subparsers)
+        return parser
+    parser = argparse.ArgumentParser(description="Python Todo Application")
+    parser.add_argument("--gui", action="store_true", help="launch the graphical interface")
+    parser.add_argument("--batch", action="store_true",
+                        help="read one subcommand per line from stdin and apply them all in one transaction")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print import and database initialization timings to stderr")
+    parser.add_argument("--list", "-l", dest="list_name", metavar="NAME", type=list_name, default=DEFAULT_LIST,
+                        help="task list to work on; each list has its own database file (default: todo.db)")
+    subparsers = parser.add_subparsers(dest="command")
+    _add_task_commands(subparsers)
+
+    subparsers.add_parser("lists", help="show every task list with its task counts")
+
+    serve_parser = subparsers.add_parser("serve", help="share the task list over a local HTTP JSON API")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="interface to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765)")
+    serve_parser.add_argument("--batch-max", type=int, default=256,
+                              help="most concurrent writes committed in one transaction (default: 256)")
+    return parser
+
+
+def _add_task_commands(subparsers):
+    """Adds the subcommands that work on one list and can run in a --batch script"""
+    add_parser = subparsers.add_parser("add", help="add a task")
+    add_parser.add_argument("title")
+    add_parser.add_argument("--priority", "-p", choices=PRIORITIES, default="Medium")
+
+    list_parser = subparsers.add_parser("list", help="print tasks and exit (pipe into `less -R` to page)")
+    list_parser.add_argument("--status", choices=sorted(STATUS_FILTERS))
+    list_parser.add_argument("--priority", choices=PRIORITIES)
+    list_parser.add_argument("--sort", dest="order_by", choices=list(ORDER_COLUMNS), default="id")
+    list_parser.add_argument("--limit", type=int, help="show at most this many tasks")
+    list_parser.add_argument("--page", type=int, help=f"1-based page of --limit tasks to show (default page size: {LIST_PAGE_SIZE})")
+
+    done_parser = subparsers.add_parser("done", help="mark tasks done, e.g. `done 3` or `done 1,4,10-20`")
+    done_parser.add_argument("ids")
+    done_parser.add_argument("--undo", action="store_true", help="mark the tasks not done instead")
+
+    rm_parser = subparsers.add_parser("rm", help="delete tasks, e.g. `rm 3` or `rm 1,4,10-20`")
+    rm_parser.add_argument("ids")
+
+    subparsers.add_parser("undo", help="revert the latest add, status change or delete")
+    subparsers.add_parser("redo", help="re-apply the change undone most recently")
+
+    stats_parser = subparsers.add_parser("stats", help="print counts by priority and status")
+    stats_parser.add_argument("--json", action="store_true", help="print the raw statistics as JSON")
+
+    import_parser = subparsers.add_parser("import", help="bulk import tasks from a .csv or .jsonl file")
+    import_parser.add_argument("file", help="path to a .csv, .jsonl or .todocol export (optionally .gz)")
+    import_parser.add_argument("--chunk-size", type=int, default=BULK_CHUNK_SIZE,
+                               help=f"rows per transaction without --jobs (default: {BULK_CHUNK_SIZE})")
+    import_parser.add_argument("--jobs", "-j", type=int,
+                               help="processes that parse and validate the file (default: one per core but one; "
+                                    "0 parses in this process)")
+    import_parser.add_argument("--check", action="store_true", help="only validate the file, import nothing")
+
+    export_parser = subparsers.add_parser("export", help="stream all tasks to JSONL, CSV or a columnar snapshot")
+    export_parser.add_argument("file", nargs="?", default="-", help="output path (default: stdout)")
+    export_parser.add_argument("--format", choices=["jsonl", "csv", "columnar"],
+                               help="output format (default: from the file extension, else jsonl)")
+    export_parser.add_argument("--gzip", dest="compress", action="store_true", default=None,
+                               help="gzip the output (implied by a .gz file name)")
+    export_parser.add_argument("--jobs", "-j", type=int,
+                               help="processes that format the rows (default: one per core but one; 0 for none)")
+
+
+def parse_args(argv=None):
+    return build_parser().parse_args(argv)
+
+
+def run_command(cli, args):
+    """Runs one parsed subcommand against the CLI's TaskManager; returns a non-zero exit code on failure"""
+    manager = cli.task_manager
+    if args.command == "add":
+        manager.add_task(args.title, args.priority)
+    elif args.command == "list":
+        cli.print_tasks(status=args.status, priority=args.priority, order_by=args.order_by,
+                        limit=args.limit, page=args.page)
+    elif args.command == "done":
+        manager.set_done(parse_task_ids(args.ids), done=not args.undo)
+    elif args.command == "rm":
+        manager.delete_tasks(parse_task_ids(args.ids))
+    elif args.command == "undo":
+        manager.undo()
+    elif args.command == "redo":
+        manager.redo()
+    elif args.command == "lists":
+        cli.show_lists()
+    elif args.command == "stats":
+        if args.json:
+            import json
+            print(json.dumps(manager.stats()))
+        else:
+            manager.show_stats()
+    elif args.command == "import":
+        return cli.import_tasks(args.file, chunk_size=args.chunk_size, jobs=args.jobs, check=args.check)
+    elif args.command == "export":
+        cli.export_tasks(args.file, args.format, args.compress, args.jobs)
+    elif args.command == "serve":
+        from server import serve
+        serve(manager.db, args.host, args.port, args.batch_max)
+
+
+def run_batch(cli, lines, parser=None):
+    """Applies one subcommand per input line inside a single transaction.
+
+    Lines are parsed with build_parser(batch=True) unless another parser is
+    given. Blank lines and lines starting with # are skipped. Any invalid
+    line, including one with global options such as --list, aborts the
+    batch and rolls back everything it did. Returns an exit code.
+    """
+    parser = parser or build_parser(batch=True)
+    count = 0
+    try:
+        with cli.task_manager.db.transaction():
+            for number, line in enumerate(lines, 1):
+                words = shlex.split(line, comments=True)
+                if not words:
+                    continue
+                try:
+                    args = parser.parse_args(words)
+                except SystemExit:
+                    raise ValueError(f"line {number}: invalid command: {line.strip()}")
+                if not args.command:
+                    raise ValueError(f"line {number}: missing subcommand: {line.strip()}")
+                if run_command(cli, args):
+                    raise ValueError(f"line {number}: command failed: {line.strip()}")
+                count += 1
+    except ValueError as e:
+        print(f"{W}[!] Batch aborted, nothing was saved ({e}).{R}", file=sys.stderr)
+        return 2
+    print(f"{G}[+] Batch applied {count} command(s).{R}")
+    return 0
+
+
+def report_startup(timings):
+    """Prints the --profile-startup breakdown to stderr"""
+    parts = ", ".join(f"{name}: {seconds * 1000:.1f} ms" for name, seconds in timings.items())
+    print(f"[startup] {parts}, total: {sum(timings.values()) * 1000:.1f} ms", file=sys.stderr)
 
 
 if __name__ == "__main__":
-    # Initialize database
-    init_database()
-    
-    if "--gui" in sys.argv:
-        app = TodoApp()
+    parser = build_parser()
+    args = parser.parse_args()
+    timings = {"imports": _IMPORTED - _START}
+
+    # Initialize the chosen list's database once and share the connection with the front end
+    start = time.perf_counter()
+    # The GUIs' worker and the API server's DB thread each need their own pooled connection
+    lists = TaskLists(pool_size=2) if args.gui or args.command == "serve" else TaskLists()
+    storage = lists.storage(args.list_name)
+    timings["db init"] = time.perf_counter() - start
+
+    if args.gui and not args.command:
+        start = time.perf_counter()
+        try:
+            from frontend_gui import TodoApp
+        except ImportError as e:
+            sys.exit(f"The GUI needs customtkinter and Tk ({e}). Install them or run without --gui.")
+        timings["gui imports"] = time.perf_counter() - start
+
+    if args.profile_startup:
+        report_startup(timings)
+
+    if args.batch:
+        sys.exit(run_batch(TodoAppCLI(storage, lists), sys.stdin))
+    elif args.command:
+        sys.exit(run_command(TodoAppCLI(storage, lists), args))
+    elif args.gui:
+        app = TodoApp(storage)
         app.mainloop()
     else:
-        app = TodoAppCLI()
+        app = TodoAppCLI(storage, lists)
         app.run()
\ No newline at end of file
@@ -1,19 +1,28 @@
+import bisect
 import tkinter as tk
 from tkinter import ttk, messagebox
-from tasks import TaskManager
-from database import Storage, init_database
+from tasks import TaskManager, format_stats
+from database import DEFAULT_DB_FILE, Storage, init_database
+from worker import SEARCH_DELAY_MS, SEARCH_RESULTS, ChangeFeed, DatabaseWorker, RefreshScheduler
+from instrument import profiled
 
 class TodoGUI:
-    def __init__(self, master):
+    def __init__(self, master, storage=None):
         self.master = master
         master.title("Todo App")
         master.geometry("800x600")
         master.resizable(False, False)
 
-        # Initialize TaskManager
-        self.storage = Storage('todo.db')
-        self.storage.connect()
-        self.task_manager = TaskManager(self.storage)
+        # Initialize TaskManager; a pooled Storage lets the worker thread open its own connection
+        self.storage = storage if storage is not None else Storage(DEFAULT_DB_FILE, pool_size=2)
+        self.task_manager = TaskManager(self.storage, cache=True)
+        self.worker = DatabaseWorker(master, self.task_manager, on_busy=self.set_loading)
+        self.scheduler = RefreshScheduler(master, self.worker, lambda: self.feed.poll(),
+                                          reload=self.refresh_task_list)
+        self.feed = ChangeFeed(master, self.worker, self.scheduler, self.apply_changes, self.refresh_task_list)
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
+        master.bind("<Control-z>", lambda event: self.undo())
+        master.bind("<Control-y>", lambda event: self.redo())
 
         # --- Styling ---
         self.style = ttk.Style()
@@ -56,6 +65,13 @@ class TodoGUI:
         add_button = ttk.Button(input_frame, text="Add Task", command=self.add_task_gui)
         add_button.grid(row=0, column=2, rowspan=2, padx=10, sticky="ns")
 
+        ttk.Label(input_frame, text="Search:").grid(row=2, column=0, sticky="w", pady=5, padx=5)
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(input_frame, width=40, textvariable=self.search_var)
+        self.search_entry.grid(row=2, column=1, pady=5, padx=5)
+        self.search_job = None
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+
         # --- Task List Frame ---
         task_list_frame = ttk.Frame(master, padding="15")
         task_list_frame.pack(pady=5, padx=10, fill="both", expand=True)
@@ -93,8 +109,28 @@ class TodoGUI:
         refresh_button = ttk.Button(action_button_frame, text="Refresh List", command=self.refresh_task_list)
         refresh_button.pack(side="left", padx=5, expand=True)
 
+        self.loading_label = ttk.Label(action_button_frame, text="", width=12)
+        self.loading_label.pack(side="left", padx=5)
+
+        # --- Summary Panel ---
+        self.stats_label = ttk.Label(master, text="", anchor="w", padding=(25, 0, 25, 10))
+        self.stats_label.pack(fill="x")
+
+        # Values currently shown in the Treeview, keyed by task id
+        self.task_rows = {}
+
         # Initial load
         self.refresh_task_list()
+        self.feed.start()
+
+    def set_loading(self, busy):
+        self.loading_label.configure(text="Loading..." if busy else "")
+
+    def on_close(self):
+        self.feed.cancel()
+        self.scheduler.cancel()
+        self.worker.shutdown()
+        self.master.destroy()
 
     def add_task_gui(self):
         title = self.task_title_entry.get().strip()
@@ -103,49 +139,152 @@ class TodoGUI:
             messagebox.showwarning("Input Error", "Task title cannot be empty.")
             return
         
-        self.task_manager.add_task(title, priority)
         self.task_title_entry.delete(0, tk.END)
-        self.refresh_task_list()
-        messagebox.showinfo("Success", "Task added successfully!")
+        self.scheduler.write(TaskManager.add_task, title, priority,
+                             callback=lambda _: messagebox.showinfo("Success", "Task added successfully!"))
+
+    def schedule_search(self):
+        """Runs the search once typing pauses instead of on every keystroke."""
+        if self.search_job is not None:
+            self.master.after_cancel(self.search_job)
+        self.search_job = self.master.after(SEARCH_DELAY_MS, self.refresh_task_list)
 
+    @profiled
     def refresh_task_list(self):
-        for item in self.task_tree.get_children():
-            self.task_tree.delete(item)
-
-        tasks = self.task_manager.get_tasks()
-        for task in tasks:
-            status = "Done" if task["done"] else "Not Done"
-            tag = 'done' if task["done"] else 'not_done'
-            self.task_tree.insert("", "end", values=(task["id"], task["title"], task["priority"], status), tags=(tag,))
-
-    def get_selected_task_id(self):
-        selected_item = self.task_tree.focus()
-        if not selected_item:
+        """Reloads the tasks (or the search matches) on the worker thread.
+
+        A newer refresh supersedes a pending one.
+        """
+        self.search_job = None
+        self.feed.reset()
+        query = self.search_var.get().strip()
+        if query:
+            self.worker.submit(TaskManager.search, query, SEARCH_RESULTS, callback=self.apply_task_rows, key="refresh")
+        else:
+            self.worker.submit(TaskManager.get_tasks, callback=self.apply_task_rows, key="refresh")
+        self.worker.submit(TaskManager.stats, callback=self.show_stats, key="stats")
+
+    def show_stats(self, stats):
+        self.stats_label.configure(text=format_stats(stats))
+
+    @profiled
+    def apply_task_rows(self, tasks):
+        """Applies only the rows that changed to the Treeview.
+
+        Items use the task id as their iid, and self.task_rows remembers the
+        values last shown for each id, so unchanged rows are never touched.
+        Results read while our own writes are in flight are stale and skipped.
+        """
+        if not self.scheduler.accepts():
+            return
+        rows = {}
+        for task_id, title, priority, done in tasks:
+            rows[task_id] = (task_id, title, priority, "Done" if done else "Not Done")
+
+        for task_id in self.task_rows.keys() - rows.keys():
+            self.task_tree.delete(str(task_id))
+
+        # Rows only need moving when the order changed, e.g. search results ranked by relevance
+        reordered = [i for i in self.task_rows if i in rows] != [i for i in rows if i in self.task_rows]
+
+        for index, (task_id, values) in enumerate(rows.items()):
+            tag = 'done' if values[3] == "Done" else 'not_done'
+            shown = self.task_rows.get(task_id)
+            if shown is None:
+                self.task_tree.insert("", index, iid=str(task_id), values=values, tags=(tag,))
+                continue
+            if reordered:
+                self.task_tree.move(str(task_id), "", index)
+            if shown != values:
+                self.task_tree.item(str(task_id), values=values, tags=(tag,))
+        self.task_rows = rows
+
+    @profiled
+    def apply_changes(self, changes):
+        """Applies a change feed delta, {task_id: Task or None}, to the Treeview.
+
+        Without a search the rows are in id order, so new tasks are appended
+        and only a restored task (undo of a delete) is placed by bisection.
+        """
+        if self.search_job is not None:
+            return  # the pending search reloads the list anyway
+        if self.search_var.get().strip():
+            # Ranked matches can't be patched in place; search again
+            self.refresh_task_list()
+            return
+        for task_id, task in sorted(changes.items()):
+            if task is None:
+                if self.task_rows.pop(task_id, None) is not None:
+                    self.task_tree.delete(str(task_id))
+                continue
+            values = (task_id, task.title, task.priority, "Done" if task.done else "Not Done")
+            tag = 'done' if task.done else 'not_done'
+            shown = self.task_rows.get(task_id)
+            if shown is None:
+                if task_id > next(reversed(self.task_rows), 0):
+                    self.task_tree.insert("", "end", iid=str(task_id), values=values, tags=(tag,))
+                    self.task_rows[task_id] = values
+                else:
+                    index = bisect.bisect(list(self.task_rows), task_id)
+                    self.task_tree.insert("", index, iid=str(task_id), values=values, tags=(tag,))
+                    self.task_rows[task_id] = values
+                    self.task_rows = dict(sorted(self.task_rows.items()))
+            elif shown != values:
+                self.task_tree.item(str(task_id), values=values, tags=(tag,))
+                self.task_rows[task_id] = values
+        self.worker.submit(TaskManager.stats, callback=self.show_stats, key="stats")
+
+    def toggle_rows(self, task_ids):
+        """Optimistically flips the status shown for task_ids, before the database confirms it."""
+        for task_id in task_ids:
+            values = self.task_rows.get(task_id)
+            if values is None:
+                continue
+            done = values[3] != "Done"
+            values = values[:3] + ("Done" if done else "Not Done",)
+            self.task_rows[task_id] = values
+            self.task_tree.item(str(task_id), values=values, tags=('done' if done else 'not_done',))
+
+    def remove_rows(self, task_ids):
+        """Optimistically removes task_ids from the list, before the database confirms it."""
+        for task_id in task_ids:
+            if self.task_rows.pop(task_id, None) is not None:
+                self.task_tree.delete(str(task_id))
+
+    def get_selected_task_ids(self):
+        selected_items = self.task_tree.selection() or ((self.task_tree.focus(),) if self.task_tree.focus() else ())
+        if not selected_items:
             messagebox.showwarning("Selection Error", "Please select a task from the list.")
-            return None
-        
-        task_id = self.task_tree.item(selected_item, "values")[0]
-        return task_id
+            return []
+
+        # Items use the task id as their iid
+        return [int(item) for item in selected_items]
 
     def toggle_task_status(self):
-        task_id = self.get_selected_task_id()
-        if task_id is not None:
-            self.task_manager.mark_task(task_id)
-            self.refresh_task_list()
-            messagebox.showinfo("Success", f"Task {task_id} status toggled.")
+        task_ids = self.get_selected_task_ids()
+        if task_ids:
+            self.scheduler.write(TaskManager.mark_tasks, task_ids, optimistic=lambda: self.toggle_rows(task_ids))
 
     def delete_task_gui(self):
-        task_id = self.get_selected_task_id()
-        if task_id is not None:
-            if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete Task ID {task_id}?"):
-                self.task_manager.delete_task(task_id)
-                self.refresh_task_list()
-                messagebox.showinfo("Success", f"Task {task_id} deleted.")
+        task_ids = self.get_selected_task_ids()
+        if not task_ids:
+            return
+        label = f"Task ID {task_ids[0]}" if len(task_ids) == 1 else f"{len(task_ids)} tasks"
+        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {label}?"):
+            self.scheduler.write(TaskManager.delete_tasks, task_ids, optimistic=lambda: self.remove_rows(task_ids))
+
+    def undo(self):
+        """Reverts the latest add, toggle or delete (Ctrl+Z); the list catches up once it lands."""
+        self.scheduler.write(TaskManager.undo)
+
+    def redo(self):
+        """Re-applies the change undone last (Ctrl+Y)."""
+        self.scheduler.write(TaskManager.redo)
 
 def main_gui():
-    init_database() # Ensure database is initialized
+    storage = init_database(pool_size=2) # Ensure database is initialized
     root = tk.Tk()
-    app = TodoGUI(root)
+    app = TodoGUI(root, storage)
     root.mainloop()
 
 if __name__ == '__main__':
@@ -0,0 +1,360 @@
+# server.py
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qsl
+
+from tasks import PRIORITY_CODES, PRIORITY_NAMES, TaskManager, priority_code
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Most writes committed together in one transaction
+WRITE_BATCH_MAX = 256
+# Page size of GET /tasks when the request gives no limit
+DEFAULT_PAGE_LIMIT = 100
+# Serialized GET responses kept for ETag checks, least recently used dropped first
+RESPONSE_CACHE_SIZE = 128
+MAX_BODY_BYTES = 1 << 20
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class TodoServer:
+    """Serves TaskManager operations as a small JSON API over HTTP/1.1.
+
+    Requests are parsed on the asyncio loop. Every database call runs on one
+    dedicated executor thread, which owns the TaskManager and its pooled
+    connection. Writes arriving while a batch is being committed are queued
+    and committed together in the next transaction (group commit). List and
+    stats responses carry an ETag, so clients can revalidate with
+    If-None-Match and get a 304 without the body being rebuilt.
+
+        GET    /tasks?status=&priority=&sort=&limit=&after=&offset=&q=   after=<id> pages sort=id only
+        POST   /tasks            {"title": ..., "priority": ...}
+        PATCH  /tasks/<id>       {"done": true}
+        DELETE /tasks/<id>
+        POST   /undo, /redo     revert or re-apply the latest journaled change
+        GET    /changes?since=   tasks written after a change feed seq; without since, the current seq
+        GET    /stats
+        GET    /metrics          statement timings (with TODO_METRICS / TODO_SLOW_MS) and write batching
+    """
+
+    def __init__(self, storage, host=DEFAULT_HOST, port=DEFAULT_PORT, batch_max=WRITE_BATCH_MAX):
+        self.storage = storage
+        self.host = host
+        self.port = port
+        self.batch_max = batch_max
+        self.manager = TaskManager(storage, cache=True)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="todo-db")
+        # Write counters, read by tests and the load test's summary
+        self.batches = 0
+        self.writes = 0
+        self._generation = 0
+        self._responses = OrderedDict()
+        self._writes = None
+        self._server = None
+
+    # --- Database thread ---
+
+    def _call(self, func, *args):
+        """Run func on the executor thread, keeping TaskManager's progress messages off stdout"""
+        def quiet():
+            with contextlib.redirect_stdout(io.StringIO()):
+                return func(*args)
+        return asyncio.get_running_loop().run_in_executor(self.executor, quiet)
+
+    def _apply_writes(self, batch):
+        """Commit a batch of (func, args) writes in one transaction; returns (result, error) pairs.
+
+        If the shared transaction fails, each write is retried in a transaction
+        of its own so one bad write only fails its own request.
+        """
+        self.batches += 1
+        self.writes += len(batch)
+        self._generation += 1
+        try:
+            with self.storage.transaction():
+                return [(func(self.manager, *args), None) for func, args in batch]
+        except Exception:
+            self.manager.invalidate_cache()
+        results = []
+        for func, args in batch:
+            try:
+                with self.storage.transaction():
+                    results.append((func(self.manager, *args), None))
+            except Exception as e:
+                self.manager.invalidate_cache()
+                results.append((None, e))
+        return results
+
+    def _version(self):
+        """Changes whenever this server or another connection commits a write"""
+        rows = self.storage.fetchall("PRAGMA data_version")
+        return (rows[0]["data_version"] if rows else None, self._generation)
+
+    def _read(self, key, func, args):
+        """Return (etag, body) for a GET, rebuilding the body only if the data changed"""
+        version = self._version()
+        cached = self._responses.get(key)
+        if cached is not None and cached[0] == version:
+            self._responses.move_to_end(key)
+            return cached[1], cached[2]
+        body = json.dumps(func(*args)).encode("utf-8")
+        # Content-based, so a rebuilt but identical body keeps its ETag
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        self._responses[key] = (version, etag, body)
+        self._responses.move_to_end(key)
+        if len(self._responses) > RESPONSE_CACHE_SIZE:
+            self._responses.popitem(last=False)
+        return etag, body
+
+    def _list_tasks(self, status, priority, order_by, limit, after_id, offset, query):
+        if query:
+            tasks = self.manager.search(query, limit)
+        else:
+            tasks = self.manager.get_tasks(status, priority, order_by, limit, after_id, offset)
+        return [self._task_json(t) for t in tasks]
+
+    def _changes(self, since):
+        """Body of GET /changes: the new seq, whether the client must reload, and the changed tasks"""
+        if since is None:
+            return {"seq": self.manager.latest_change(), "reload": True, "changes": []}
+        seq, changes = self.manager.changes_since(since)
+        return {
+            "seq": seq,
+            "reload": changes is None,
+            "changes": [{"id": task_id, "task": self._task_json(task) if task is not None else None}
+                        for task_id, task in sorted((changes or {}).items())],
+        }
+
+    @staticmethod
+    def _task_json(task):
+        return {"id": task.id, "title": task.title, "priority": task.priority, "done": bool(task.done)}
+
+    # --- Event loop ---
+
+    async def write(self, func, *args):
+        """Queue func(task_manager, *args) for the next write batch and wait for its result"""
+        future = asyncio.get_running_loop().create_future()
+        await self._writes.put((func, args, future))
+        return await future
+
+    async def _writer(self):
+        while True:
+            batch = [await self._writes.get()]
+            while len(batch) < self.batch_max and not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            try:
+                results = await self._call(self._apply_writes, [(func, args) for func, args, _ in batch])
+            except Exception as e:
+                results = [(None, e)] * len(batch)
+            for (_, _, future), (result, error) in zip(batch, results):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    async def start(self):
+        self._writes = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer())
+        self._server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._writer_task.cancel()
+        self.executor.shutdown(wait=True)
+
+    async def serve_forever(self):
+        server = await self.start()
+        print(f"Serving the todo API on http://{self.host}:{self.port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def handle(self, reader, writer):
+        """Serve requests from one connection, keeping it open between requests (HTTP/1.1)"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ")
+                except ValueError:
+                    writer.write(self._response(400, {"error": "Malformed request line"}, keep_alive=False))
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    writer.write(self._response(400, {"error": "Invalid Content-Length"}, keep_alive=False))
+                    break
+                if length > MAX_BODY_BYTES:
+                    writer.write(self._response(413, {"error": "Request body too large"}, keep_alive=False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+                try:
+                    status, payload, etag = await self.dispatch(method, target, headers, body)
+                except HTTPError as e:
+                    status, payload, etag = e.status, {"error": str(e)}, None
+                except ValueError as e:
+                    status, payload, etag = 400, {"error": str(e)}, None
+                except Exception as e:
+                    status, payload, etag = 500, {"error": str(e) or type(e).__name__}, None
+                writer.write(self._response(status, payload, etag, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _response(status, payload=None, etag=None, keep_alive=True):
+        if isinstance(payload, bytes):
+            body = payload
+        else:
+            body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        if body:
+            head.append("Content-Type: application/json")
+        head.append(f"Content-Length: {len(body)}")
+        if etag:
+            head.append(f"ETag: {etag}")
+        head.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        return ("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body
+
+    async def dispatch(self, method, target, headers, body):
+        """Route one request; returns (status, payload, etag)"""
+        path, _, query = target.partition("?")
+        params = dict(parse_qsl(query))
+        parts = [part for part in path.split("/") if part]
+
+        if parts == ["tasks"]:
+            if method == "GET":
+                args = (
+                    params.get("status"), params.get("priority"), params.get("sort", "id"),
+                    self._int_param(params, "limit", DEFAULT_PAGE_LIMIT), self._int_param(params, "after"),
+                    self._int_param(params, "offset"), params.get("q", "").strip(),
+                )
+                return await self._conditional_get(("tasks",) + args, self._list_tasks, args, headers)
+            if method == "POST":
+                data = self._json(body)
+                title = data.get("title")
+                if not isinstance(title, str) or not title.strip():
+                    raise HTTPError(400, "title is required")
+                priority = data.get("priority", "Medium")
+                if priority not in PRIORITY_CODES:
+                    raise HTTPError(400, f"Unknown priority: {priority}")
+                task_id = await self.write(TaskManager.add_task, title.strip(), priority)
+                if task_id is None:
+                    raise HTTPError(500, "Task could not be saved")
+                task = {"id": task_id, "title": title.strip(),
+                        "priority": PRIORITY_NAMES[priority_code(priority)], "done": False}
+                return 201, task, None
+            raise HTTPError(405, f"{method} not allowed on /tasks")
+
+        if len(parts) == 2 and parts[0] == "tasks":
+            try:
+                task_id = int(parts[1])
+            except ValueError:
+                raise HTTPError(404, f"No task {parts[1]}") from None
+            if method == "PATCH":
+                data = self._json(body)
+                if not isinstance(data.get("done"), bool):
+                    raise HTTPError(400, "done (true or false) is required")
+                count = await self.write(TaskManager.set_done, [task_id], data["done"])
+            elif method == "DELETE":
+                count = await self.write(TaskManager.delete_tasks, [task_id])
+            else:
+                raise HTTPError(405, f"{method} not allowed on /tasks/<id>")
+            if not count:
+                raise HTTPError(404, f"No task {task_id}")
+            return 204, None, None
+
+        if parts in (["undo"], ["redo"]):
+            if method != "POST":
+                raise HTTPError(405, f"{method} not allowed on /{parts[0]}")
+            count = await self.write(TaskManager.undo if parts == ["undo"] else TaskManager.redo)
+            return 200, {"changed": count}, None
+
+        if parts == ["changes"]:
+            if method != "GET":
+                raise HTTPError(405, f"{method} not allowed on /changes")
+            return 200, await self._call(self._changes, self._int_param(params, "since")), None
+
+        if parts == ["stats"]:
+            if method != "GET":
+                raise HTTPError(405, f"{method} not allowed on /stats")
+            return await self._conditional_get(("stats",), self.manager.stats, (), headers)
+
+        if parts == ["metrics"]:
+            if method != "GET":
+                raise HTTPError(405, f"{method} not allowed on /metrics")
+            instrument = self.storage.instrument
+            metrics = instrument.snapshot() if hasattr(instrument, "snapshot") else {}
+            metrics["server"] = {"write_batches": self.batches, "writes": self.writes}
+            return 200, metrics, None
+
+        raise HTTPError(404, f"No route for {path}")
+
+    async def _conditional_get(self, key, func, args, headers):
+        etag, body = await self._call(self._read, key, func, args)
+        if etag in (tag.strip() for tag in headers.get("if-none-match", "").split(",")):
+            return 304, None, etag
+        return 200, body, etag
+
+    @staticmethod
+    def _int_param(params, name, default=None):
+        value = params.get(name)
+        if value is None or value == "":
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise HTTPError(400, f"{name} must be an integer") from None
+
+    @staticmethod
+    def _json(body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON") from None
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        return data
+
+
+def serve(storage, host=DEFAULT_HOST, port=DEFAULT_PORT, batch_max=WRITE_BATCH_MAX):
+    """Run the API until interrupted. storage must be pooled (pool_size >= 2)."""
+    server = TodoServer(storage, host, port, batch_max)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("Server stopped.")
@@ -1,44 +1,622 @@
 # tasks.py
+import re
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import chain, islice
+from database import DEFAULT_PRIORITY, NOW_SQL, PRIORITY_CODES
+from instrument import profile_methods
+
 # ANSI Color Codes
 G = "\033[92m"  # Green
 W = "\033[97m"  # White
 R = "\033[0m"   # Reset
 RR = "\033[91m"  # Red
 
+# Display order for priorities, highest first; also the integer codes stored in tasks
+PRIORITY_ORDER = PRIORITY_CODES
+PRIORITY_NAMES = {code: name for name, code in PRIORITY_CODES.items()}
+
+# Filters and sort keys accepted by TaskManager.get_tasks
+STATUS_FILTERS = {"done": 1, "pending": 0}
+ORDER_COLUMNS = {
+    "id": ("id",),
+    "priority": ("priority", "id"),
+    "status": ("done", "priority", "id"),
+    "created": ("created_at", "id"),
+    "updated": ("updated_at", "id"),
+}
+
+def task_columns(table="tasks"):
+    """SELECT list for Task rows, turning the stored priority code back into its name"""
+    cases = " ".join(f"WHEN {code} THEN '{name}'" for name, code in PRIORITY_CODES.items())
+    return f"{table}.id, {table}.title, CASE {table}.priority {cases} END AS priority, {table}.done"
+
+TASK_COLUMNS = task_columns()
+
+def priority_code(priority):
+    """Maps a priority name (any case) to its stored code; unknown or missing values become Medium."""
+    if isinstance(priority, str):
+        priority = priority.strip().capitalize()
+    return PRIORITY_CODES.get(priority, PRIORITY_CODES[DEFAULT_PRIORITY])
+
+# Default number of results returned by TaskManager.search
+SEARCH_LIMIT = 50
+
+# Longest title list_tasks will pad to; longer titles are truncated
+MAX_TITLE_WIDTH = 60
+# Rendered rows buffered per stdout write in list_tasks
+LIST_CHUNK_ROWS = 200
+# Page size used by list_tasks when a page is asked for without a limit
+LIST_PAGE_SIZE = 50
+
+# Rows per transaction used by add_tasks
+BULK_CHUNK_SIZE = 1000
+# Rows per multi-row INSERT in insert_rows. FTS5 flushes its pending index
+# data at the end of every statement, so the search trigger is about five
+# times cheaper per row when many rows share a statement. 300 rows of 3
+# values stay under the 999-variable limit of older SQLite builds.
+ROWS_PER_INSERT = 300
+
+# Newest task_log rows kept for undo. Compaction runs once the log has grown
+# JOURNAL_COMPACT_SLACK rows past that, so its cost is spread over many writes.
+JOURNAL_KEEP_ROWS = 10000
+JOURNAL_COMPACT_SLACK = 2000
+
+# task_log statements; each is prefixed with the action id by _journal.
+# Status changes and deletes log the row as it was before the write.
+LOG_ADD_SQL = "INSERT INTO task_log (action, op, task_id, title, priority, done) VALUES (?, 'add', ?, ?, ?, 0)"
+LOG_FLIP_SQL = ("INSERT INTO task_log (action, op, task_id, done, prev_done) "
+                "SELECT ?, 'done', id, NOT done, done FROM tasks WHERE id = ?")
+LOG_SET_SQL = ("INSERT INTO task_log (action, op, task_id, done, prev_done) "
+               "SELECT ?, 'done', id, ?, done FROM tasks WHERE id = ?")
+LOG_DELETE_SQL = ("INSERT INTO task_log (action, op, task_id, title, priority, done, created_at) "
+                  "SELECT ?, 'delete', id, title, priority, done, created_at FROM tasks WHERE id = ?")
+# How undo and redo describe each journaled operation
+LOG_OP_NAMES = {"add": "add", "done": "status change", "delete": "delete"}
+
+# Most task_changes rows changes_since turns into a delta; past that a full
+# reload is cheaper than fetching the changed tasks one id at a time
+CHANGE_FEED_MAX_ROWS = 5000
+
+# Longest id range parse_task_ids expands, so a typo like 1-999999999 can't exhaust memory
+MAX_ID_RANGE = 100000
+
+def parse_task_ids(text):
+    """Parses "3", "1,4,7" or ranges like "3-40" into a list of unique task IDs.
+
+    Tokens that are not integers or valid ranges, including ranges of more
+    than MAX_ID_RANGE ids, are ignored. Repeated ids are kept once, in the
+    order they first appear.
+    """
+    ids = []
+    for token in text.replace(" ", "").split(","):
+        start, sep, end = token.partition("-")
+        try:
+            if sep:
+                lo, hi = sorted((int(start), int(end)))
+                if hi - lo < MAX_ID_RANGE:
+                    ids.extend(range(lo, hi + 1))
+            elif token:
+                ids.append(int(token))
+        except ValueError:
+            continue
+    return list(dict.fromkeys(ids))
+
+def task_params(item):
+    """Normalizes a bulk task item into an INSERT parameter tuple (None if it has no title).
+
+    Each item is a (title, priority[, done]) sequence or a mapping with
+    "title", "priority" and optional "done" keys.
+    """
+    if isinstance(item, dict):
+        title, priority, done = item.get("title"), item.get("priority"), item.get("done", False)
+    else:
+        title, priority, done = (list(item) + [None, False])[:3]
+    title = (title or "").strip()
+    if not title:
+        return None
+    if isinstance(done, str):
+        done = done.strip().lower() in ("1", "true", "yes", "done")
+    return (title, priority_code(priority), bool(done))
+
+def format_stats(stats):
+    """One-line summary of TaskManager.stats() for the GUIs' summary panels"""
+    parts = [f"{stats['total']} tasks", f"{stats['done']} done ({stats['completion']:.0%})"]
+    for priority in ("High", "Medium", "Low"):
+        counts = stats["by_priority"].get(priority)
+        if counts:
+            parts.append(f"{priority}: {counts['done']}/{counts['total']}")
+    return "   |   ".join(parts)
+
+class _InsertFailed(Exception):
+    """Rolls back insert_rows after Storage reported a failed statement"""
+
+class Task(namedtuple("Task", "id title priority done")):
+    """A task row: an immutable tuple with named fields.
+
+    Much smaller than a dict per row. For code written against the old dict
+    rows, task["title"], task.get("title") and dict(task) still work.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self._fields else default
+
+    def keys(self):
+        return self._fields
+
+@profile_methods  # no-op unless TODO_PROFILE is set
 class TaskManager:
-    def __init__(self, storage):
+    def __init__(self, storage, cache=False):
         self.db = storage
         self.db.connect()
+        # Optional write-through cache of every task, keyed by id (see get_tasks)
+        self.cache = {} if cache else None
+        self._cache_rows = None
+        self._data_version = None
+        self._change_seq = None
+
+    def _cached_tasks(self):
+        """Returns all tasks from the cache, refreshing it only if another connection wrote.
+
+        PRAGMA data_version only changes when a different connection commits,
+        so our own writes (applied write-through below) never force a reload.
+        When it does change, the tasks named in the change feed since the
+        last refresh are patched in; the whole table is reloaded only when
+        that delta is unavailable.
+        """
+        versions = self.db.fetchall("PRAGMA data_version")
+        version = versions[0]["data_version"] if versions else None
+        if version is None or version != self._data_version:
+            changes = None
+            if self._data_version is not None and self._change_seq is not None:
+                seq, changes = self.changes_since(self._change_seq)
+            if changes is None:
+                # Read the seq first: changes made during the reload are replayed next time, harmlessly
+                seq = self.latest_change()
+                rows = self.db.fetchall(f"SELECT {TASK_COLUMNS} FROM tasks ORDER BY id", record=Task)
+                self.cache = {task.id: task for task in rows}
+                self._cache_rows = rows
+            else:
+                self._apply_changes(changes)
+            self._change_seq = seq
+            self._data_version = version
+        if self._cache_rows is None:
+            # Ids only grow, so insertion order of the dict is id order
+            self._cache_rows = list(self.cache.values())
+        return self._cache_rows
+
+    def _cache_write(self, task_id, task=None, flip=False, done=None):
+        """Applies one of our own writes to the cache: store task, flip or set done, or drop the id."""
+        if self.cache is None:
+            return
+        if task is not None:
+            self.cache[task_id] = task
+        elif flip or done is not None:
+            cached = self.cache.get(task_id)
+            if cached is not None:
+                self.cache[task_id] = cached._replace(done=int(not cached.done) if flip else int(done))
+        else:
+            self.cache.pop(task_id, None)
+        self._cache_rows = None
+
+    def _apply_changes(self, changes):
+        """Patches a changes_since delta into the cache, keeping its id order."""
+        last = next(reversed(self.cache), 0)
+        in_order = True
+        for task_id, task in sorted(changes.items()):
+            if task is None:
+                self.cache.pop(task_id, None)
+                continue
+            if task_id not in self.cache:
+                in_order = in_order and task_id > last
+                last = max(last, task_id)
+            self.cache[task_id] = task
+        if not in_order:
+            # An id below the newest came back (undo of a delete); re-sort once
+            self.cache = dict(sorted(self.cache.items()))
+        self._cache_rows = None
+
+    def invalidate_cache(self):
+        """Forces the cache to reload on its next read, e.g. after a rolled back transaction."""
+        self._data_version = None
+
+    def latest_change(self):
+        """The newest seq in the change feed (0 if empty), or None without a feed.
+
+        Read it before loading tasks to get the seq to pass to changes_since later.
+        """
+        if not getattr(self.db, "has_changes", False):
+            return None
+        rows = self.db.fetchall("SELECT IFNULL(MAX(seq), 0) AS seq FROM task_changes")
+        return rows[0]["seq"] if rows else None
+
+    def changes_since(self, seq, limit=CHANGE_FEED_MAX_ROWS):
+        """Returns (latest seq, {task_id: Task or None}) for the tasks written after seq.
+
+        Each changed task appears once with its current row, or None if it
+        was deleted, however often it changed, so applying a delta twice is
+        harmless. Pass the returned seq to the next call. The delta is None
+        when it can't be given: no change feed, seq already pruned from the
+        feed or from another database, or more than limit changes. The
+        caller should then reload everything.
+        """
+        if seq is None or not getattr(self.db, "has_changes", False):
+            return seq, None
+        bounds = self._seq_bounds("task_changes")
+        if bounds is None:
+            return seq, None
+        first, last = bounds
+        if last is None or last == seq:
+            return seq, {}
+        if last < seq or seq < first - 1 or last - seq > limit:
+            return last, None
+        rows = self.db.fetchall(
+            f"SELECT c.task_id, {task_columns('t')} FROM "
+            "(SELECT DISTINCT task_id FROM task_changes WHERE seq > ? AND seq <= ?) AS c "
+            "LEFT JOIN tasks t ON t.id = c.task_id", (seq, last))
+        if not rows:
+            return last, None
+        return last, {
+            row["task_id"]: Task(row["id"], row["title"], row["priority"], row["done"]) if row["id"] is not None else None
+            for row in rows
+        }
+
+    @contextmanager
+    def _journal(self, sql=None, params=()):
+        """Runs a write in one transaction with its task_log rows; yields the action id.
+
+        When sql is given it is run first for every tuple in params, with the
+        action id prepended, to log rows as they were before the write. One
+        call is one undo step. Without a journal on the storage the block runs
+        as is and None is yielded.
+        """
+        if not getattr(self.db, "has_journal", False):
+            yield None
+            return
+        with self.db.transaction():
+            action = self._begin_action()
+            if sql is not None:
+                self.db.executemany(sql, [(action,) + tuple(p) for p in params])
+            yield action
+
+    def _seq_bounds(self, table):
+        """Returns (first, last) seq of task_log or task_changes, (None, None) if empty, None on error.
+
+        Two subqueries, so SQLite answers each from one end of the rowid b-tree.
+        """
+        rows = self.db.fetchall(f"SELECT (SELECT MIN(seq) FROM {table}) AS first, "
+                                f"(SELECT MAX(seq) FROM {table}) AS last")
+        return (rows[0]["first"], rows[0]["last"]) if rows else None
+
+    def _begin_action(self):
+        """Starts a journaled action in the open transaction and returns its id.
+
+        The id is the seq its first log row will get, so an action's rows can
+        be found by a rowid range scan. A new action discards the redo stack.
+        """
+        self.db.execute("DELETE FROM task_log WHERE undone = 1")
+        first, last = self._seq_bounds("task_log") or (None, None)
+        if last is not None and last - first >= JOURNAL_KEEP_ROWS + JOURNAL_COMPACT_SLACK:
+            self.compact_journal()
+        return (last or 0) + 1
+
+    def compact_journal(self, keep=JOURNAL_KEEP_ROWS):
+        """Drops the oldest task_log rows, keeping the newest keep rows and every action they touch.
+
+        Returns the number of rows removed.
+        """
+        if not getattr(self.db, "has_journal", False):
+            return 0
+        c = self.db.execute("DELETE FROM task_log WHERE seq < "
+                            "(SELECT action FROM task_log ORDER BY seq DESC LIMIT 1 OFFSET ?)", (max(keep, 1) - 1,))
+        return c.rowcount if c is not None else 0
 
-    def _find_task_by_id(self, task_id_input):
-        """Helper to find a task dictionary by its ID."""
+    def undo(self):
+        """Reverts the latest journaled add, status change or delete; returns how many tasks it touched."""
+        return self._replay(undo=True)
+
+    def redo(self):
+        """Re-applies the action undone most recently; returns how many tasks it touched."""
+        return self._replay(undo=False)
+
+    def _replay(self, undo):
+        word = "undo" if undo else "redo"
+        if not getattr(self.db, "has_journal", False):
+            print(f"{W}[!] Nothing to {word}.{R}")
+            return 0
+        with self.db.transaction():
+            # Undone rows always sit at the tail of the log: the redo stack
+            if undo:
+                latest = self.db.fetchall("SELECT action FROM task_log WHERE undone = 0 ORDER BY seq DESC LIMIT 1")
+            else:
+                latest = self.db.fetchall("SELECT action FROM task_log WHERE undone = 1 ORDER BY seq LIMIT 1")
+            if not latest:
+                print(f"{W}[!] Nothing to {word}.{R}")
+                return 0
+            action = latest[0]["action"]
+            entries = self.db.fetchall(
+                "SELECT op, task_id, title, priority, done, prev_done, created_at FROM task_log "
+                "WHERE seq >= ? AND action = ? ORDER BY seq", (action, action))
+            op = entries[0]["op"] if entries else None
+            if op == ("add" if undo else "delete"):
+                self.db.executemany("DELETE FROM tasks WHERE id = ?", [(e["task_id"],) for e in entries])
+            elif op in ("add", "delete"):
+                self.db.executemany(
+                    f"INSERT OR IGNORE INTO tasks (id, title, priority, done, created_at) "
+                    f"VALUES (?, ?, ?, ?, COALESCE(?, {NOW_SQL}))",
+                    [(e["task_id"], e["title"], e["priority"], e["done"], e["created_at"]) for e in entries])
+            elif op == "done":
+                self.db.executemany(f"UPDATE tasks SET done = ?, updated_at = {NOW_SQL} WHERE id = ?",
+                                    [(e["prev_done"] if undo else e["done"], e["task_id"]) for e in entries])
+            self.db.execute("UPDATE task_log SET undone = ? WHERE seq >= ? AND action = ?", (int(undo), action, action))
+
+        if op == ("add" if undo else "delete"):
+            for e in entries:
+                self._cache_write(e["task_id"])
+        elif op == "done":
+            for e in entries:
+                self._cache_write(e["task_id"], done=e["prev_done"] if undo else e["done"])
+        elif op is not None:
+            # Restored ids would break the cache's id order; reload it instead
+            self.invalidate_cache()
+        print(f"{G}[+] {'Undid' if undo else 'Redid'} {LOG_OP_NAMES.get(op, 'change')} of {len(entries)} task(s).{R}")
+        return len(entries)
+
+    @staticmethod
+    def _parse_id(task_id_input):
+        """Helper to turn user input into an integer task ID (or None)."""
         try:
-            t_id = int(task_id_input)
-            tasks = self.db.fetchall("SELECT id, title, priority, done FROM tasks WHERE id = ?", (t_id,))
-            if tasks:
-                return tasks[0]
-        except ValueError:
-            pass
-        return None
+            return int(task_id_input)
+        except (TypeError, ValueError):
+            return None
+
+    @classmethod
+    def _parse_ids(cls, task_ids):
+        """Turns user input into unique integer task IDs, dropping invalid ones."""
+        return list(dict.fromkeys(t_id for t_id in map(cls._parse_id, task_ids) if t_id is not None))
 
     def add_task(self, title, priority):
-        """Adds a task with priority to the list."""
-        self.db.execute("INSERT INTO tasks (title, priority, done) VALUES (?, ?, ?)", (title, priority, False))
+        """Adds a task with priority to the list; returns the new task's id (None on failure)."""
+        code = priority_code(priority)
+        with self._journal() as action:
+            c = self.db.execute("INSERT INTO tasks (title, priority, done) VALUES (?, ?, ?)", (title, code, False))
+            if c is not None and action is not None:
+                self.db.execute(LOG_ADD_SQL, (action, c.lastrowid, title, code))
+        if c is not None:
+            self._cache_write(c.lastrowid, Task(c.lastrowid, title, PRIORITY_NAMES[code], 0))
         print(f"{G}[+] Task added successfully!{R}")
+        return c.lastrowid if c is not None else None
+
+    def add_tasks(self, tasks, chunk_size=BULK_CHUNK_SIZE):
+        """Adds many tasks, committing them in chunks of chunk_size rows.
+
+        Each item is either a (title, priority[, done]) sequence or a mapping
+        with "title", "priority" and optional "done" keys. Items without a
+        title are skipped. Returns the number of rows inserted.
+        """
+        start = time.perf_counter()
+        skipped = 0
+
+        def valid_rows():
+            nonlocal skipped
+            for row in map(self._task_params, tasks):
+                if row:
+                    yield row
+                else:
+                    skipped += 1
+
+        rows = valid_rows()
+        total = 0
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk or not self.insert_rows(chunk):
+                break
+            total += len(chunk)
+        elapsed = time.perf_counter() - start
+        rate = total / elapsed if elapsed > 0 else total
+        print(f"{G}[+] Added {total} tasks in {elapsed:.2f}s ({rate:.0f} rows/sec).{R}")
+        if skipped:
+            print(f"{W}[!] Skipped {skipped} rows without a title.{R}")
+        return total
+
+    def insert_rows(self, rows):
+        """Inserts already normalized (title, priority code, done) tuples in one transaction.
+
+        This is the batch path behind add_tasks and the parallel importer.
+        Bulk inserts are not journaled. Returns the number of rows inserted,
+        0 if the batch failed and was rolled back.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        try:
+            with self.db.transaction():
+                for start in range(0, len(rows), ROWS_PER_INSERT):
+                    part = rows[start:start + ROWS_PER_INSERT]
+                    sql = "INSERT INTO tasks (title, priority, done) VALUES " + ", ".join(["(?, ?, ?)"] * len(part))
+                    if self.db.execute(sql, list(chain.from_iterable(part))) is None:
+                        raise _InsertFailed
+        except _InsertFailed:
+            return 0
+        if self.cache is not None:
+            # Cheaper to reload once on the next read than to track every new id
+            self.invalidate_cache()
+        return len(rows)
+
+    _task_params = staticmethod(task_params)
+
+    def get_tasks(self, status=None, priority=None, order_by="id", limit=None, after_id=None, offset=None):
+        """Fetches tasks, filtering, ordering and paginating in SQL.
+
+        status is "done" or "pending", priority one of "Low"/"Medium"/"High".
+        In id order, pages are keyset based: pass the id of the last row
+        already seen as after_id to get the rows that follow it. Other orders
+        page with offset; after_id raises ValueError there.
+
+        With the cache enabled, an unfiltered call is answered from memory;
+        the returned list is shared and must not be modified.
+        """
+        unfiltered = all(value is None for value in (status, priority, limit, after_id, offset))
+        if self.cache is not None and unfiltered and order_by == "id":
+            return self._cached_tasks()
+        sql, params = self._select_tasks(status, priority, order_by, limit, after_id, offset)
+        return self.db.fetchall(sql, params, record=Task)
+
+    def iter_tasks(self, status=None, priority=None, order_by="id", limit=None, after_id=None, offset=None):
+        """Like get_tasks, but lazily streams rows from the cursor."""
+        sql, params = self._select_tasks(status, priority, order_by, limit, after_id, offset)
+        return self.db.fetchiter(sql, params, record=Task)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Finds tasks whose titles match query, best matches first.
+
+        Words are prefix matched ("gro" finds "groceries") and all must be
+        present; "quoted text" matches as a phrase. Uses the FTS5 index when
+        the database has one, and a LIKE scan otherwise.
+        """
+        terms = [(phrase.strip(), True) if phrase else (word, False)
+                 for phrase, word in re.findall(r'"([^"]*)"|(\S+)', query)]
+        terms = [(term, quoted) for term, quoted in terms if term]
+        if not terms:
+            return []
+        limit = limit if limit is not None else -1
+        if getattr(self.db, "has_fts", False):
+            match = " ".join(
+                '"{}"{}'.format(term.replace('"', '""'), "" if quoted else "*") for term, quoted in terms
+            )
+            return self.db.fetchall(
+                f"SELECT {task_columns('t')} FROM tasks_fts "
+                "JOIN tasks t ON t.id = tasks_fts.rowid WHERE tasks_fts MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit), record=Task,
+            )
+        where = " AND ".join("title LIKE ? ESCAPE '\\'" for _ in terms)
+        patterns = tuple("%" + re.sub(r"([%_\\])", r"\\\1", term) + "%" for term, _ in terms)
+        return self.db.fetchall(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE {where} ORDER BY id LIMIT ?", patterns + (limit,),
+            record=Task,
+        )
+
+    @staticmethod
+    def _select_tasks(status, priority, order_by, limit, after_id, offset=None):
+        """Builds the SELECT statement and parameters shared by get_tasks and iter_tasks."""
+        if status is not None and status not in STATUS_FILTERS:
+            raise ValueError(f"Unknown status filter: {status}")
+        if priority is not None and priority not in PRIORITY_CODES:
+            raise ValueError(f"Unknown priority filter: {priority}")
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"Unknown sort key: {order_by}")
+
+        # Columns are qualified because ORDER BY would otherwise pick the priority name alias
+        where, params = [], []
+        if status is not None:
+            where.append("tasks.done = ?")
+            params.append(STATUS_FILTERS[status])
+        if priority is not None:
+            where.append("tasks.priority = ?")
+            params.append(PRIORITY_CODES[priority])
+        if after_id is not None:
+            # An id stays a valid cursor after its row is edited or deleted; the sort
+            # values of another order can't be looked up from a deleted row.
+            if order_by != "id":
+                raise ValueError(f"after_id pages the id order only, not {order_by}; use offset")
+            where.append("tasks.id > ?")
+            params.append(after_id)
 
-    def get_tasks(self):
-        """Fetches all tasks from the database."""
-        return self.db.fetchall("SELECT id, title, priority, done FROM tasks")
+        sql = f"SELECT {TASK_COLUMNS} FROM tasks"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + ", ".join(f"tasks.{column}" for column in ORDER_COLUMNS[order_by])
+        if limit is not None or offset is not None:
+            sql += " LIMIT ?"
+            params.append(limit if limit is not None else -1)
+        if offset is not None:
+            sql += " OFFSET ?"
+            params.append(offset)
+        return sql, tuple(params)
+
+    def stats(self):
+        """Returns task counts by priority and status plus the completion ratio.
+
+        Read from the trigger-maintained task_stats table when the storage
+        has one, otherwise aggregated with GROUP BY over tasks.
+        """
+        if getattr(self.db, "has_counters", False):
+            rows = self.db.fetchall("SELECT priority, done, count FROM task_stats WHERE count > 0")
+        else:
+            rows = self.db.fetchall("SELECT priority, done, COUNT(*) AS count FROM tasks GROUP BY priority, done")
+        by_priority = {}
+        for row in rows:
+            name = PRIORITY_NAMES.get(row["priority"], str(row["priority"]))
+            counts = by_priority.setdefault(name, {"done": 0, "pending": 0, "total": 0})
+            counts["done" if row["done"] else "pending"] += row["count"]
+            counts["total"] += row["count"]
+        total = sum(c["total"] for c in by_priority.values())
+        done = sum(c["done"] for c in by_priority.values())
+        return {
+            "total": total,
+            "done": done,
+            "pending": total - done,
+            "completion": done / total if total else 0.0,
+            "by_priority": by_priority,
+        }
 
-    def list_tasks(self):
-        """Displays tasks in a formatted table."""
-        tasks = self.get_tasks()
-        if not tasks:
+    def show_stats(self):
+        """Displays task counts and completion by priority."""
+        stats = self.stats()
+        if not stats["total"]:
             print(f"\n{W}[!] No tasks found.{R}")
             return
+        print(f"\n{G}{'Priority':<10} | {'Done':>8} | {'Pending':>8} | {'Total':>8} | {'Complete':>8}{R}")
+        print(f"{W}{'-' * 54}{R}")
+        for priority in sorted(stats["by_priority"], key=lambda p: (PRIORITY_ORDER.get(p, len(PRIORITY_ORDER)), p)):
+            c = stats["by_priority"][priority]
+            print(f"{W}{priority:<10} | {c['done']:>8} | {c['pending']:>8} | {c['total']:>8} | "
+                  f"{c['done'] / c['total']:>8.0%}{R}")
+        print(f"{W}{'-' * 54}{R}")
+        print(f"{G}{'All':<10} | {stats['done']:>8} | {stats['pending']:>8} | {stats['total']:>8} | "
+              f"{stats['completion']:>8.0%}{R}")
+
+    def list_tasks(self, status=None, priority=None, order_by="id", limit=None, page=None, out=None):
+        """Displays tasks in a formatted table, streaming rows as they are read.
+
+        page selects which page of limit rows (LIST_PAGE_SIZE if no limit is
+        given) to show, counting from 1.
+        Output is written to out (stdout by default) in buffered chunks.
+        """
+        if page and limit is None:
+            limit = LIST_PAGE_SIZE
+        offset = (page - 1) * limit if page and limit else None
+        self._print_table(self.iter_tasks(status, priority, order_by, limit, offset=offset), out)
+
+    def search_tasks(self, query, limit=SEARCH_LIMIT, out=None):
+        """Displays the tasks matching query, best matches first."""
+        self._print_table(iter(self.search(query, limit)), out)
+
+    def _print_table(self, tasks, out=None):
+        """Renders an iterator of tasks as a table, writing in buffered chunks.
+
+        The title column fits the first chunk of rows (all of a --limit page);
+        longer titles further down are truncated like those over MAX_TITLE_WIDTH.
+        """
+        out = out or sys.stdout
+        head = list(islice(tasks, LIST_CHUNK_ROWS))
+        if not head:
+            print(f"\n{W}[!] No tasks found.{R}", file=out)
+            return
 
-        # Determine column widths dynamically
-        max_title = max(len(t["title"]) for t in tasks) if tasks else 25
+        # Sized from rows already read rather than a scan of every title, so the first rows print at once
+        max_title = min(max(len(task[1]) for task in head), MAX_TITLE_WIDTH)
         id_width = 4
         title_width = max(max_title, len("Task Title")) + 2
         priority_width = 12
@@ -53,36 +631,98 @@ class TaskManager:
         )
         divider = f"{W}{'-' * (id_width + title_width + priority_width + status_width + 9)}{R}"
 
-        print("\n" + header)
-        print(divider)
-
+        lines = ["\n" + header, divider]
         # Task Rows
-        for task in tasks:
-            status = "Done" if task["done"] else "Not Done"
-            s_color = G if task["done"] else RR  # Green for Done, Red for Not Done
-
-            print(
-                f"{W}{task['id']:<{id_width}}{R} | "
-                f"{W}{task['title']:<{title_width}}{R} | "
-                f"{W}{task['priority']:<{priority_width}}{R} | "
-                f"{s_color}{status:<{status_width}}{R}"
+        for task in chain(head, tasks):
+            task_id, title, priority, done = task
+            status_text = "Done" if done else "Not Done"
+            s_color = G if done else RR  # Green for Done, Red for Not Done
+            if len(title) > title_width:
+                title = title[:title_width - 3] + "..."
+
+            lines.append(
+                f"{W}{task_id:<{id_width}}{R} | "
+                f"{W}{title:<{title_width}}{R} | "
+                f"{W}{priority:<{priority_width}}{R} | "
+                f"{s_color}{status_text:<{status_width}}{R}"
             )
-        print(divider)
+            if len(lines) >= LIST_CHUNK_ROWS:
+                out.write("\n".join(lines) + "\n")
+                lines = []
+        lines.append(divider)
+        out.write("\n".join(lines) + "\n")
+        out.flush()
 
     def mark_task(self, task_id):
         """Flips completion status."""
-        task = self._find_task_by_id(task_id)
-        if task:
-            self.db.execute("UPDATE tasks SET done = ? WHERE id = ?", (not task['done'], task['id']))
+        t_id = self._parse_id(task_id)
+        c = None
+        if t_id is not None:
+            with self._journal(LOG_FLIP_SQL, [(t_id,)]):
+                c = self.db.execute(f"UPDATE tasks SET done = NOT done, updated_at = {NOW_SQL} WHERE id = ?", (t_id,))
+        if c is not None and c.rowcount > 0:
+            self._cache_write(t_id, flip=True)
             print(f"{G}[+] Task status updated.{R}")
         else:
             print(f"{W}[!] Task ID not found.{R}")
 
+    def mark_tasks(self, task_ids):
+        """Flips completion status of many tasks in one transaction; returns how many changed."""
+        params = [(t_id,) for t_id in self._parse_ids(task_ids)]
+        c = None
+        if params:
+            with self._journal(LOG_FLIP_SQL, params):
+                c = self.db.executemany(f"UPDATE tasks SET done = NOT done, updated_at = {NOW_SQL} WHERE id = ?", params)
+        count = c.rowcount if c is not None else 0
+        if count:
+            for (t_id,) in params:
+                self._cache_write(t_id, flip=True)
+            print(f"{G}[+] {count} task(s) status updated.{R}")
+        else:
+            print(f"{W}[!] Task ID not found.{R}")
+        return count
+
+    def set_done(self, task_ids, done=True):
+        """Marks many tasks done (or not done) in one transaction; returns how many matched."""
+        params = [(int(done), t_id) for t_id in self._parse_ids(task_ids)]
+        c = None
+        if params:
+            with self._journal(LOG_SET_SQL, params):
+                c = self.db.executemany(f"UPDATE tasks SET done = ?, updated_at = {NOW_SQL} WHERE id = ?", params)
+        count = c.rowcount if c is not None else 0
+        if count:
+            for _, t_id in params:
+                self._cache_write(t_id, done=done)
+            print(f"{G}[+] {count} task(s) marked {'done' if done else 'not done'}.{R}")
+        else:
+            print(f"{W}[!] Task ID not found.{R}")
+        return count
+
     def delete_task(self, task_id):
         """Removes task from list."""
-        task = self._find_task_by_id(task_id)
-        if task:
-            self.db.execute("DELETE FROM tasks WHERE id = ?", (task['id'],))
+        t_id = self._parse_id(task_id)
+        c = None
+        if t_id is not None:
+            with self._journal(LOG_DELETE_SQL, [(t_id,)]):
+                c = self.db.execute("DELETE FROM tasks WHERE id = ?", (t_id,))
+        if c is not None and c.rowcount > 0:
+            self._cache_write(t_id)
             print(f"{G}[+] Task deleted successfully.{R}")
         else:
             print(f"{W}[!] Task ID not found.{R}")
+
+    def delete_tasks(self, task_ids):
+        """Removes many tasks in one transaction; returns how many were deleted."""
+        params = [(t_id,) for t_id in self._parse_ids(task_ids)]
+        c = None
+        if params:
+            with self._journal(LOG_DELETE_SQL, params):
+                c = self.db.executemany("DELETE FROM tasks WHERE id = ?", params)
+        count = c.rowcount if c is not None else 0
+        if count:
+            for (t_id,) in params:
+                self._cache_write(t_id)
+            print(f"{G}[+] {count} task(s) deleted successfully.{R}")
+        else:
+            print(f"{W}[!] Task ID not found.{R}")
+        return count
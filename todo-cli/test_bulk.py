@@ -0,0 +1,138 @@
+import io
+import os
+import tempfile
+import unittest
+from bulk import (RowErrors, detect_format, export_parallel, export_tasks, import_parallel, read_columnar,
+                  read_tasks_file, split_lines, write_columnar)
+
+ROWS = [(1, "Buy milk", "High", 0), (2, "Write, \"quoted\" report", "Low", 1), (5, "Café ☕", "Medium", 0)]
+
+class TestBulkFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def roundtrip(self, name, **options):
+        path = os.path.join(self.tmpdir.name, name)
+        self.assertEqual(export_tasks(iter(ROWS), path, **options), len(ROWS))
+        return list(read_tasks_file(path))
+
+    def test_detect_format(self):
+        """
+        Test that format and compression are guessed from the file name.
+        """
+        self.assertEqual(detect_format("a.csv"), ("csv", False))
+        self.assertEqual(detect_format("a.JSONL.gz"), ("jsonl", True))
+        self.assertEqual(detect_format("a.todocol"), ("columnar", False))
+        self.assertEqual(detect_format("a.txt"), (None, False))
+
+    def test_jsonl_gzip_roundtrip(self):
+        """
+        Test that a gzipped JSONL export reads back as the same tasks.
+        """
+        rows = self.roundtrip("tasks.jsonl.gz")
+        self.assertEqual([(r["id"], r["title"], r["priority"], r["done"]) for r in rows], ROWS)
+
+    def test_csv_roundtrip(self):
+        """
+        Test that CSV quoting survives an export and import.
+        """
+        rows = self.roundtrip("tasks.csv")
+        self.assertEqual([r["title"] for r in rows], [r[1] for r in ROWS])
+
+    def test_csv_with_byte_order_mark(self):
+        """
+        Test that a BOM before the header (as Excel writes it) still finds the title column, serially and in parallel.
+        """
+        path = os.path.join(self.tmpdir.name, "excel.csv")
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            f.write("title,priority\r\nBuy milk,High\r\nCall mom,Low\r\n")
+        self.assertEqual([r["title"] for r in read_tasks_file(path)], ["Buy milk", "Call mom"])
+        self.assertEqual(import_parallel(path, lambda chunk: len(chunk), jobs=1), (2, 0))
+
+    def test_malformed_rows_are_skipped_with_their_line(self):
+        """
+        Test that bad JSON, non-object rows and oversized CSV fields are counted by line, serially and in parallel.
+        """
+        jsonl = os.path.join(self.tmpdir.name, "bad.jsonl")
+        with open(jsonl, "w") as f:
+            f.write('{"title": "A"}\nnot json\n5\n\n{"title": 7}\n["B", "High"]\n{"title": "C", "priority": []}\n')
+        csv_path = os.path.join(self.tmpdir.name, "bad.csv")
+        with open(csv_path, "w", newline="") as f:
+            f.write('title\nA\n"multi\n' + "x" * 200000 + '"\nB\n')
+        expected = {
+            jsonl: [(2, "invalid JSON (Expecting value)"), (3, "expected a JSON object, got number"),
+                    (5, "title must be a string, got number"), (7, "priority must be a string, got array")],
+            csv_path: [(4, "invalid CSV (field larger than field limit (131072))")],
+        }
+        for path, lines in expected.items():
+            serial, parallel = RowErrors(), RowErrors()
+            self.assertEqual(len(list(read_tasks_file(path, serial))), 2, path)
+            self.assertEqual(import_parallel(path, jobs=1, chunk_bytes=16, errors=parallel), (2, 0))
+            self.assertEqual((serial.count, serial.first), (len(lines), lines))
+            self.assertEqual((parallel.count, parallel.first), (len(lines), lines))
+            with self.assertRaisesRegex(ValueError, f"^line {lines[0][0]}: "):
+                import_parallel(path, jobs=1)
+        with self.assertRaisesRegex(ValueError, "^line 2: invalid JSON"):
+            list(read_tasks_file(jsonl))
+
+    def test_columnar_roundtrip_across_blocks(self):
+        """
+        Test that the columnar snapshot keeps every column across block boundaries.
+        """
+        path = os.path.join(self.tmpdir.name, "tasks.todocol")
+        with open(path, "wb") as f:
+            self.assertEqual(write_columnar(iter(ROWS), f, block_rows=2), 3)
+        with open(path, "rb") as f:
+            self.assertEqual(list(read_columnar(f)), ROWS)
+        self.assertEqual(list(read_tasks_file(path)), [(t, p, d) for _, t, p, d in ROWS])
+
+    def test_split_lines_keeps_quoted_newlines_together(self):
+        """
+        Test that CSV chunks only end on newlines outside quoted fields.
+        """
+        data = b'title\n"two\nlines",x\nplain\n"a ""quote""\n"\n'
+        chunks = list(split_lines(io.BytesIO(data), chunk_bytes=4, csv_quotes=True))
+        self.assertEqual(b"".join(chunks), data)
+        self.assertTrue(all(chunk.count(b'"') % 2 == 0 for chunk in chunks))
+        self.assertEqual(list(split_lines(io.BytesIO(b"a\nb"), chunk_bytes=1)), [b"a\n", b"b"])
+
+    def test_parallel_import_matches_serial_read(self):
+        """
+        Test that worker processes parse every format into the same rows, in file order.
+        """
+        rows = ROWS + [(6, "Multi\nline", "Low", 1), (7, " ", "High", 0)] * 50
+        expected = [(title.strip(), {"High": 0, "Medium": 1, "Low": 2}[priority], bool(done))
+                    for _, title, priority, done in rows if title.strip()]
+        for name in ("tasks.jsonl.gz", "tasks.csv", "tasks.todocol"):
+            path = os.path.join(self.tmpdir.name, name)
+            export_tasks(iter(rows), path)
+            inserted, progress = [], []
+            count, skipped = import_parallel(path, lambda chunk: inserted.extend(chunk) or len(chunk), jobs=2,
+                                             chunk_bytes=64, progress=lambda *p: progress.append(p))
+            self.assertEqual((count, skipped, inserted), (len(expected), 50, expected), name)
+            self.assertEqual(progress[-1][0], len(expected))
+        self.assertEqual(import_parallel(path, jobs=1), (len(expected), 50))
+
+    def test_parallel_export_matches_serial_export(self):
+        """
+        Test that formatting on worker processes writes byte-identical files.
+        """
+        rows = ROWS * 30
+        for name in ("tasks.jsonl", "tasks.csv", "tasks.todocol"):
+            serial = os.path.join(self.tmpdir.name, name)
+            parallel = os.path.join(self.tmpdir.name, "parallel-" + name)
+            export_tasks(iter(rows), serial)
+            self.assertEqual(export_parallel(iter(rows), parallel, jobs=2, chunk_rows=7), len(rows))
+            if name.endswith(".todocol"):
+                with open(parallel, "rb") as f:
+                    self.assertEqual(list(read_columnar(f)), rows)
+                continue
+            with open(serial, "rb") as a, open(parallel, "rb") as b:
+                self.assertEqual(a.read(), b.read(), name)
+
+if __name__ == '__main__':
+    unittest.main()
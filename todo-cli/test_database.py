@@ -0,0 +1,473 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from database import SCHEMA_VERSION, ConnectionPool, Storage, TaskLists, init_database, open_connection, retry_busy
+from tasks import TaskManager
+
+def hammer(db_file, worker, count):
+    """Writes and reads from a separate process; returns anything printed as an error"""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        manager = TaskManager(Storage(db_file))
+        for i in range(count):
+            manager.add_task(f"worker {worker} task {i}", "Low")
+            manager.mark_tasks([i + 1])
+            manager.get_tasks(status="pending", limit=20)
+    return [line for line in output.getvalue().splitlines() if "[+]" not in line]
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        # Use a throwaway database file so connections can be shared between threads
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, 'todo.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_connect_reuses_connection(self):
+        """
+        Test that connecting twice keeps the same long-lived connection.
+        """
+        storage = Storage(self.db_file)
+        storage.connect()
+        conn = storage.conn
+        storage.connect()
+        self.assertIs(storage.conn, conn)
+        storage.close()
+
+    def test_init_database_returns_connected_storage(self):
+        """
+        Test that init_database hands back a ready-to-use Storage.
+        """
+        storage = init_database(self.db_file)
+        self.assertEqual(storage.fetchall("SELECT COUNT(*) AS n FROM tasks"), [{"n": 0}])
+        storage.close()
+
+    def test_transaction_commits_once(self):
+        """
+        Test that writes inside a transaction are only visible after it ends.
+        """
+        storage = init_database(self.db_file)
+        other = init_database(self.db_file)
+        with storage.transaction():
+            storage.execute("INSERT INTO tasks (title, priority, done) VALUES (?, ?, ?)", ("A", "Low", False))
+            storage.execute("INSERT INTO tasks (title, priority, done) VALUES (?, ?, ?)", ("B", "Low", False))
+            self.assertEqual(other.fetchall("SELECT COUNT(*) AS n FROM tasks"), [{"n": 0}])
+        self.assertEqual(other.fetchall("SELECT COUNT(*) AS n FROM tasks"), [{"n": 2}])
+        storage.close()
+        other.close()
+
+    def test_transaction_rolls_back_on_error(self):
+        """
+        Test that an exception inside a transaction discards its writes.
+        """
+        storage = init_database(self.db_file)
+        with self.assertRaises(RuntimeError):
+            with storage.transaction():
+                storage.execute("INSERT INTO tasks (title, priority, done) VALUES (?, ?, ?)", ("A", "Low", False))
+                with storage.transaction():
+                    raise RuntimeError("boom")
+        self.assertEqual(storage.fetchall("SELECT COUNT(*) AS n FROM tasks"), [{"n": 0}])
+        storage.close()
+
+    def test_pool_binds_one_connection_per_thread(self):
+        """
+        Test that a pooled Storage gives each thread its own connection.
+        """
+        storage = init_database(self.db_file, pool_size=2)
+        main_conn = storage.conn
+        seen = []
+
+        def worker():
+            seen.append(storage.conn)
+            seen.append(storage.conn)
+            storage.pool.release()
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.assertIs(seen[0], seen[1])
+        self.assertIsNot(seen[0], main_conn)
+        storage.close()
+
+    def test_pool_raises_when_exhausted(self):
+        """
+        Test that a thread finding every pooled connection held gets an error instead of waiting forever.
+        """
+        pool = ConnectionPool(self.db_file, size=1, timeout=0.05)
+        pool.get()
+        errors = []
+
+        def worker():
+            try:
+                pool.get()
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join(5)
+        self.assertEqual(errors, ["connection pool exhausted: all 1 connections are held by other threads"])
+        pool.close_all()
+
+    def test_search_index_follows_table_changes(self):
+        """
+        Test that the FTS5 triggers keep search results in sync with tasks.
+        """
+        storage = init_database(self.db_file)
+        manager = TaskManager(storage)
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.add_tasks([("Buy groceries", "Low"), ("Buy milk today", "High"), ("Call mom", "Low")])
+            self.assertEqual([t["id"] for t in manager.search("gro")], [1])
+            self.assertEqual([t["id"] for t in manager.search('"buy milk"')], [2])
+            storage.execute("UPDATE tasks SET title = ? WHERE id = ?", ("Call dad", 3))
+            manager.delete_task(1)
+        self.assertEqual(manager.search("buy"), [(2, "Buy milk today", "High", 0)])
+        self.assertEqual(manager.search("mom"), [])
+        self.assertEqual([t["id"] for t in manager.search("dad")], [3])
+        storage.close()
+
+    def test_search_index_built_for_existing_rows(self):
+        """
+        Test that opening an older database indexes the rows it already has.
+        """
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+                     "priority TEXT NOT NULL, done BOOLEAN NOT NULL)")
+        conn.execute("INSERT INTO tasks (title, priority, done) VALUES ('Old task', 'Low', 0)")
+        conn.commit()
+        conn.close()
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage = init_database(self.db_file)
+        self.assertEqual([t["id"] for t in TaskManager(storage).search("old")], [1])
+        storage.close()
+
+    def test_migrates_legacy_schema(self):
+        """
+        Test that an unversioned file gets integer priorities, timestamps and indexes, keeping ids.
+        """
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+                     "priority TEXT NOT NULL, done BOOLEAN NOT NULL)")
+        conn.executemany("INSERT INTO tasks (title, priority, done) VALUES (?, ?, ?)",
+                         [("Alpha", "High", 1), ("Beta", "low", 0), ("Gamma", "Urgent", 0), ("Delta", "Low", 1),
+                          ("Epsilon", "Medium", 0), ("Zeta", "High", 0)])
+        conn.execute("DELETE FROM tasks WHERE id IN (2, 6)")
+        conn.commit()
+        conn.close()
+
+        storage = Storage(self.db_file)
+        with contextlib.redirect_stdout(io.StringIO()) as output, contextlib.redirect_stderr(io.StringIO()) as errors:
+            storage.connect()
+        self.assertIn("Migrated 4 tasks to schema version 1", errors.getvalue())
+        self.assertEqual(output.getvalue(), "")
+        self.assertEqual(storage.schema_version(), SCHEMA_VERSION)
+        self.assertEqual(storage.fetchall("SELECT id, priority, typeof(priority) AS type FROM tasks ORDER BY id"), [
+            {"id": 1, "priority": 0, "type": "integer"}, {"id": 3, "priority": 1, "type": "integer"},
+            {"id": 4, "priority": 2, "type": "integer"}, {"id": 5, "priority": 1, "type": "integer"},
+        ])
+        self.assertEqual(storage.fetchall("SELECT COUNT(*) AS n FROM tasks WHERE created_at IS NULL"), [{"n": 0}])
+        indexes = {row["name"] for row in storage.fetchall("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertTrue({"idx_tasks_priority", "idx_tasks_created_at", "idx_tasks_updated_at"} <= indexes)
+
+        manager = TaskManager(storage)
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.add_task("Eta", "High")
+        self.assertEqual([t.id for t in manager.get_tasks(order_by="priority")], [1, 7, 3, 5, 4])
+        self.assertEqual([t.id for t in manager.search("eta")], [7])
+        self.assertEqual(manager.stats()["by_priority"]["High"], {"done": 1, "pending": 1, "total": 2})
+        storage.close()
+
+    def test_migration_mirrors_writes_made_during_the_copy(self):
+        """
+        Test that rows written by other connections mid-copy reach the rebuilt table.
+        """
+        conn = sqlite3.connect(self.db_file)
+        conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, "
+                     "priority TEXT NOT NULL, done BOOLEAN NOT NULL)")
+        conn.executemany("INSERT INTO tasks (title, priority, done) VALUES (?, 'Low', 0)", [("a",), ("b",), ("c",)])
+        conn.commit()
+
+        storage = Storage(self.db_file)
+        storage._conn = open_connection(self.db_file)
+        original = storage.transaction
+        batches = []
+
+        def writing_transaction():
+            # After the first copied batch, write from a different connection
+            if len(batches) == 2:
+                conn.execute("UPDATE tasks SET priority = 'High', done = 1 WHERE id = 1")
+                conn.execute("DELETE FROM tasks WHERE id = 3")
+                conn.execute("INSERT INTO tasks (title, priority, done) VALUES ('d', 'Medium', 0)")
+                conn.commit()
+            batches.append(None)
+            return original()
+
+        storage.transaction = writing_transaction
+        with contextlib.redirect_stdout(io.StringIO()):
+            storage.migrate(batch_size=1)
+        conn.close()
+        self.assertEqual(storage.fetchall("SELECT id, title, priority, done FROM tasks ORDER BY id"), [
+            {"id": 1, "title": "a", "priority": 0, "done": 1}, {"id": 2, "title": "b", "priority": 2, "done": 0},
+            {"id": 4, "title": "d", "priority": 1, "done": 0},
+        ])
+        storage.close()
+
+    def test_keyset_pages_survive_a_changed_or_deleted_anchor(self):
+        """
+        Test that paging with after_id continues after the last row seen is edited or deleted.
+        """
+        storage = init_database(self.db_file)
+        manager = TaskManager(storage)
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.add_tasks([(f"Task {i}", "Low") for i in range(10)])
+            first = manager.get_tasks(limit=3)
+            manager.mark_tasks([first[-1].id])
+            second = manager.get_tasks(limit=3, after_id=first[-1].id)
+            manager.delete_tasks([second[-1].id])
+            rest = manager.get_tasks(limit=10, after_id=second[-1].id)
+        self.assertEqual([t.id for t in first + second + rest], list(range(1, 11)))
+        storage.close()
+
+    def test_cache_sees_writes_from_other_connections(self):
+        """
+        Test that a cached TaskManager picks up rows committed by another connection.
+        """
+        cached = TaskManager(init_database(self.db_file), cache=True)
+        other = TaskManager(init_database(self.db_file))
+        with contextlib.redirect_stdout(io.StringIO()):
+            cached.add_task("Mine", "Low")
+            self.assertEqual([t["title"] for t in cached.get_tasks()], ["Mine"])
+            other.add_task("Theirs", "High")
+            other.mark_task(1)
+        self.assertEqual([(t["title"], t["done"]) for t in cached.get_tasks()], [("Mine", 1), ("Theirs", 0)])
+        cached.db.close()
+        other.db.close()
+
+    def test_stats_counters_match_group_by(self):
+        """
+        Test that the trigger-maintained counters agree with a GROUP BY after every kind of write.
+        """
+        storage = init_database(self.db_file)
+        manager = TaskManager(storage)
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.add_tasks([("A", "Low"), ("B", "High"), ("C", "High", True), ("D", "Medium")])
+            manager.mark_tasks([1, 2])
+            manager.set_done([3], done=False)
+            manager.delete_task(4)
+            storage.execute("UPDATE tasks SET priority = 1 WHERE id = 1")
+        counted = manager.stats()
+        storage.has_counters = False
+        self.assertEqual(counted, manager.stats())
+        self.assertEqual((counted["total"], counted["done"]), (3, 2))
+        storage.close()
+
+    def test_undo_and_redo_replay_the_journal(self):
+        """
+        Test that undo reverts adds, status changes and deletes one action at a time, and redo re-applies them.
+        """
+        storage = init_database(self.db_file)
+        manager = TaskManager(storage, cache=True)
+
+        def shown():
+            return [tuple(t) for t in manager.get_tasks()]
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.add_task("A", "High")
+            manager.add_task("B", "Low")
+            manager.mark_tasks([1, 2])
+            manager.delete_tasks([1, 2])
+            self.assertEqual(shown(), [])
+            self.assertEqual(manager.undo(), 2)
+            self.assertEqual(shown(), [(1, "A", "High", 1), (2, "B", "Low", 1)])
+            manager.undo()
+            self.assertEqual(shown(), [(1, "A", "High", 0), (2, "B", "Low", 0)])
+            manager.undo()
+            self.assertEqual(shown(), [(1, "A", "High", 0)])
+            manager.redo()
+            manager.redo()
+            self.assertEqual(shown(), [(1, "A", "High", 1), (2, "B", "Low", 1)])
+            # A new change discards what is left to redo
+            manager.set_done([1], done=False)
+            self.assertEqual(manager.redo(), 0)
+            self.assertEqual(shown(), [(1, "A", "High", 0), (2, "B", "Low", 1)])
+        self.assertEqual(manager.stats()["done"], 1)
+        self.assertEqual(manager.search("A"), [(1, "A", "High", 0)])
+        storage.close()
+
+    def test_redo_flip_with_repeated_id(self):
+        """
+        Test that a toggle naming a task twice flips it once, and undo/redo restore exactly that.
+        """
+        storage = init_database(self.db_file)
+        manager = TaskManager(storage)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            manager.add_tasks([("A", "Low"), ("B", "Low")])
+            self.assertEqual(manager.mark_tasks([1, 1, 2]), 2)
+            self.assertEqual(manager.undo(), 2)
+            self.assertEqual(manager.redo(), 2)
+        self.assertEqual([t.done for t in manager.get_tasks()], [1, 1])
+        self.assertIn("[+] 2 task(s) status updated.", output.getvalue())
+        self.assertEqual(storage.fetchall("SELECT COUNT(*) AS n FROM task_log"), [{"n": 2}])
+        storage.close()
+
+    def test_journal_compaction_keeps_recent_actions(self):
+        """
+        Test that compaction drops the oldest log rows but never splits an action.
+        """
+        storage = init_database(self.db_file)
+        manager = TaskManager(storage)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for i in range(5):
+                manager.add_task(f"Task {i}", "Low")
+            manager.mark_tasks([1, 2, 3])
+            self.assertEqual(manager.compact_journal(keep=2), 5)
+            self.assertEqual(storage.fetchall("SELECT COUNT(*) AS n FROM task_log"), [{"n": 3}])
+            manager.undo()
+            self.assertEqual(manager.undo(), 0)
+        self.assertEqual(manager.stats()["done"], 0)
+        storage.close()
+
+    def test_change_feed_reports_writes_from_other_connections(self):
+        """
+        Test that changes_since returns each task changed by another connection once, as it is now.
+        """
+        reader = TaskManager(init_database(self.db_file))
+        writer = TaskManager(init_database(self.db_file))
+        with contextlib.redirect_stdout(io.StringIO()):
+            writer.add_tasks([("A", "Low"), ("B", "High")])
+            seq = reader.latest_change()
+            writer.mark_tasks([1, 1, 2])
+            writer.delete_task(2)
+            writer.add_task("C", "Medium")
+        seq, changes = reader.changes_since(seq)
+        self.assertEqual(changes, {1: (1, "A", "Low", 1), 2: None, 3: (3, "C", "Medium", 0)})
+        self.assertEqual(reader.changes_since(seq), (seq, {}))
+        self.assertEqual(reader.changes_since(seq, limit=0), (seq, {}))
+        self.assertIsNone(reader.changes_since(seq - 4, limit=2)[1])
+        self.assertIsNone(reader.changes_since(seq + 1)[1])
+        reader.db.close()
+        writer.db.close()
+
+    def test_change_feed_prunes_itself(self):
+        """
+        Test that the feed keeps only its newest rows and asks readers behind them to reload.
+        """
+        with patch("database.CHANGES_KEEP_ROWS", 10), patch("database.CHANGES_PRUNE_EVERY", 5):
+            storage = init_database(self.db_file)
+        manager = TaskManager(storage)
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.add_tasks([(f"Task {i}", "Low") for i in range(22)])
+        self.assertEqual(storage.fetchall("SELECT MIN(seq) AS first, MAX(seq) AS last FROM task_changes"),
+                         [{"first": 11, "last": 22}])
+        self.assertEqual(manager.changes_since(10), (22, {i: (i, f"Task {i - 1}", "Low", 0) for i in range(11, 23)}))
+        self.assertEqual(manager.changes_since(9), (22, None))
+        storage.close()
+
+    def test_cache_applies_changes_in_id_order(self):
+        """
+        Test that the cache patches in other connections' changes, restored ids included, in id order.
+        """
+        cached = TaskManager(init_database(self.db_file), cache=True)
+        other = TaskManager(init_database(self.db_file))
+        with contextlib.redirect_stdout(io.StringIO()):
+            other.add_tasks([("A", "Low"), ("B", "Low"), ("C", "Low")])
+            self.assertEqual(len(cached.get_tasks()), 3)
+            other.delete_tasks([1, 2])
+            self.assertEqual([t.id for t in cached.get_tasks()], [3])
+            other.undo()
+            other.mark_task(3)
+        self.assertEqual([(t.id, t.done) for t in cached.get_tasks()], [(1, 0), (2, 0), (3, 1)])
+        cached.db.close()
+        other.db.close()
+
+    def test_task_lists_route_to_their_own_files(self):
+        """
+        Test that each named list gets its own database file and lists can be summarized together.
+        """
+        lists = TaskLists(self.db_file)
+        with contextlib.redirect_stdout(io.StringIO()):
+            TaskManager(lists.storage()).add_task("Default task", "Low")
+            work = TaskManager(lists.storage("work"))
+            work.add_task("Work task", "High")
+            work.add_task("Other work task", "High")
+            work.mark_task(2)
+        self.assertEqual(lists.path("work"), os.path.join(self.tmpdir.name, "todo-work.db"))
+        self.assertIs(lists.storage("work"), lists.storage("work"))
+        self.assertEqual(lists.names(), ["default", "work"])
+        self.assertEqual(lists.summary(), [{"name": "default", "total": 1, "done": 0},
+                                           {"name": "work", "total": 2, "done": 1}])
+        with self.assertRaises(ValueError):
+            lists.path("../elsewhere")
+        lists.close()
+
+    def test_task_lists_do_not_share_a_write_lock(self):
+        """
+        Test that an open write transaction on one list does not block writes to another.
+        """
+        lists = TaskLists(self.db_file, timeout=0.1, retries=0)
+        with lists.storage("home").transaction():
+            lists.storage("home").execute("INSERT INTO tasks (title) VALUES ('Held')")
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                self.assertIsNotNone(lists.storage("work").execute("INSERT INTO tasks (title) VALUES ('Free')"))
+            self.assertEqual(output.getvalue(), "")
+        self.assertEqual([row["total"] for row in lists.summary(["home", "work"])], [1, 1])
+        lists.close()
+
+    def test_task_lists_may_use_reserved_schema_names(self):
+        """
+        Test that lists called main or temp, names SQLite reserves for schemas, can still be summarized.
+        """
+        lists = TaskLists(self.db_file)
+        with contextlib.redirect_stdout(io.StringIO()):
+            TaskManager(lists.storage("main")).add_task("Main task", "Low")
+            TaskManager(lists.storage("temp")).add_task("Temp task", "Low")
+        self.assertEqual(lists.summary(), [{"name": "main", "total": 1, "done": 0},
+                                           {"name": "temp", "total": 1, "done": 0}])
+        lists.close()
+
+    def test_concurrent_profile_enables_wal(self):
+        """
+        Test that the default profile switches the file to WAL journaling.
+        """
+        storage = init_database(self.db_file)
+        self.assertEqual(storage.fetchall("PRAGMA journal_mode"), [{"journal_mode": "wal"}])
+        self.assertEqual(storage.fetchall("PRAGMA busy_timeout"), [{"timeout": 5000}])
+        storage.close()
+
+    def test_retry_busy_backs_off_then_succeeds(self):
+        """
+        Test that busy errors are retried and other errors are raised at once.
+        """
+        func = MagicMock(side_effect=[sqlite3.OperationalError("database is locked"), "ok"])
+        self.assertEqual(retry_busy(func, retries=2, backoff=0), "ok")
+        self.assertEqual(func.call_count, 2)
+
+        func = MagicMock(side_effect=sqlite3.OperationalError("no such table: nope"))
+        with self.assertRaises(sqlite3.OperationalError):
+            retry_busy(func, retries=2, backoff=0)
+        self.assertEqual(func.call_count, 1)
+
+    def test_many_processes_share_the_database(self):
+        """
+        Test that several processes writing at once neither lose rows nor hit lock errors.
+        """
+        init_database(self.db_file).close()
+        workers, count = 4, 50
+        with multiprocessing.get_context("spawn").Pool(workers) as pool:
+            errors = pool.starmap(hammer, [(self.db_file, w, count) for w in range(workers)])
+        self.assertEqual(errors, [[]] * workers)
+        storage = init_database(self.db_file)
+        self.assertEqual(storage.fetchall("SELECT COUNT(*) AS n FROM tasks"), [{"n": workers * count}])
+        storage.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import importlib.util
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from tasks import Task
+
+HAS_CUSTOMTKINTER = importlib.util.find_spec("customtkinter") is not None
+if HAS_CUSTOMTKINTER:
+    from frontend_gui import TodoApp
+
+class FakeRow:
+    """Stands in for a TaskRow: remembers the task it is bound to, None while hidden."""
+
+    def __init__(self, *args):
+        self.task = None
+
+    def show(self, task):
+        self.task = task
+
+    def hide(self):
+        self.task = None
+
+@unittest.skipUnless(HAS_CUSTOMTKINTER, "customtkinter is not installed")
+class TestTodoAppRows(unittest.TestCase):
+
+    def setUp(self):
+        # The list methods only need these attributes, so no window is created
+        self.app = SimpleNamespace(
+            tasks_data=[], owns_data=True, rows=[], first_row=0, visible=3, search_job=None, search="",
+            task_list_frame=None, toggle_task_ui=None, delete_task_ui=None,
+            scrollbar=MagicMock(), worker=MagicMock(), show_stats=MagicMock(), load_tasks_ui=MagicMock(),
+        )
+        self.app.visible_rows = lambda: self.app.visible
+        self.app.search_entry = SimpleNamespace(get=lambda: self.app.search)
+        self.app.render_rows = lambda: TodoApp.render_rows(self.app)
+        patcher = patch("frontend_gui.TaskRow", FakeRow)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def shown(self):
+        return [row.task.id if row.task else None for row in self.app.rows]
+
+    def test_render_rows_recycles_one_row_per_visible_task(self):
+        """
+        Test that only the rows in view exist and are rebound to the slice starting at first_row.
+        """
+        self.app.tasks_data = [Task(i, f"Task {i}", "Low", 0) for i in range(1, 11)]
+        self.app.render_rows()
+        self.assertEqual(self.shown(), [1, 2, 3])
+        pool = list(self.app.rows)
+        self.app.first_row = 4
+        self.app.render_rows()
+        self.assertEqual(self.shown(), [5, 6, 7])
+        self.assertEqual(self.app.rows, pool)
+        self.app.scrollbar.set.assert_called_with(0.4, 0.7)
+
+    def test_render_rows_clamps_first_row(self):
+        """
+        Test that scrolling past either end stops at the first or last full page.
+        """
+        self.app.tasks_data = [Task(i, f"Task {i}", "Low", 0) for i in range(1, 6)]
+        self.app.first_row = 50
+        self.app.render_rows()
+        self.assertEqual((self.app.first_row, self.shown()), (2, [3, 4, 5]))
+        self.app.first_row = -4
+        self.app.render_rows()
+        self.assertEqual((self.app.first_row, self.shown()), (0, [1, 2, 3]))
+
+    def test_render_rows_hides_rows_without_a_task(self):
+        """
+        Test that rows past the end of a short list, or left over after the window shrinks, are hidden.
+        """
+        self.app.visible = 4
+        self.app.tasks_data = [Task(i, f"Task {i}", "Low", 0) for i in range(1, 4)]
+        self.app.render_rows()
+        self.assertEqual(self.shown(), [1, 2, 3, None])
+        self.app.visible = 2
+        self.app.render_rows()
+        self.assertEqual(self.shown(), [1, 2, None, None])
+        self.app.scrollbar.set.assert_called_with(0.0, 2 / 3)
+
+    def test_apply_changes_patches_a_copy_of_the_shared_list(self):
+        """
+        Test that a feed delta deletes, updates and inserts tasks in id order without editing the cached list.
+        """
+        cached = [Task(1, "A", "Low", 0), Task(3, "C", "Low", 0), Task(5, "E", "Low", 0)]
+        self.app.tasks_data, self.app.owns_data = cached, False
+        TodoApp.apply_changes(self.app, {5: None, 3: Task(3, "C", "Low", 1), 2: Task(2, "B", "High", 0), 9: None})
+        self.assertEqual(self.app.tasks_data, [(1, "A", "Low", 0), (2, "B", "High", 0), (3, "C", "Low", 1)])
+        self.assertEqual([t.id for t in cached], [1, 3, 5])
+        self.assertEqual(self.shown(), [1, 2, 3])
+        self.app.worker.submit.assert_called_once()
+
+    def test_apply_changes_searches_again_instead_of_patching_results(self):
+        """
+        Test that a delta arriving while search results are shown re-runs the search.
+        """
+        self.app.tasks_data = [Task(1, "A", "Low", 0)]
+        self.app.search = "A"
+        TodoApp.apply_changes(self.app, {1: None})
+        self.app.load_tasks_ui.assert_called_once_with()
+        self.assertEqual(self.app.tasks_data, [Task(1, "A", "Low", 0)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import contextlib
+import io
+import json
+import os
+import pstats
+import tempfile
+import unittest
+import instrument
+from database import init_database
+from instrument import Metrics, metrics_from_env, profile_methods, profiled
+from tasks import TaskManager
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.tmpdir.name, 'todo.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_storage_reports_every_statement(self):
+        """
+        Test that Storage times statements and counts their rows once an instrument is attached.
+        """
+        metrics = Metrics()
+        storage = init_database(self.db_file, instrument=metrics)
+        manager = TaskManager(storage)
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager.add_tasks([("A", "Low"), ("B", "High")])
+            manager.get_tasks()
+            list(storage.fetchiter("SELECT id FROM tasks", size=1))
+            storage.execute("SELECT * FROM missing_table")
+        by_sql = {s["sql"]: s for s in metrics.snapshot()["statements"]}
+        self.assertEqual(by_sql["INSERT INTO tasks (title, priority, done) VALUES (?, ?, ?), (?, ?, ?)"]["rows"], 2)
+        self.assertEqual(by_sql["SELECT id FROM tasks"]["rows"], 2)
+        self.assertEqual(by_sql["SELECT * FROM missing_table"]["errors"], 1)
+        self.assertTrue(all(s["total_ms"] >= 0 for s in by_sql.values()))
+        storage.close()
+
+    def test_slow_query_log_and_metrics_file(self):
+        """
+        Test that statements over the threshold are logged and the counters written as JSON.
+        """
+        log = io.StringIO()
+        metrics = Metrics(slow_ms=0, slow_log=log)
+        metrics.statement("SELECT  *\n FROM tasks", 3, 0.002, 0.001)
+        self.assertIn("[slow query] 2.0ms sqlite + 1.0ms convert, 3 rows: SELECT * FROM tasks", log.getvalue())
+        path = os.path.join(self.tmpdir.name, "metrics.json")
+        metrics.write(path)
+        with open(path) as f:
+            data = json.load(f)
+        self.assertEqual(data["slow_queries"], 1)
+        self.assertEqual(data["statements"][0]["calls"], 1)
+
+    def test_off_by_default(self):
+        """
+        Test that nothing is instrumented without the environment switches.
+        """
+        self.assertIsNone(metrics_from_env({}))
+        self.assertIsNone(init_database(self.db_file).instrument)
+        self.assertIsInstance(metrics_from_env({"TODO_SLOW_MS": "25"}), Metrics)
+
+class TestProfilingHooks(unittest.TestCase):
+
+    def test_profiled_is_identity_when_off(self):
+        """
+        Test that profiling hooks add no wrapper at all when TODO_PROFILE is unset.
+        """
+        def refresh():
+            pass
+        self.assertIs(profiled(refresh, mode=""), refresh)
+        self.assertIs(profile_methods(TaskManager, mode=""), TaskManager)
+
+    def test_trace_mode_reports_duration(self):
+        """
+        Test that trace mode prints each call and its duration to stderr.
+        """
+        class Refresher:
+            def refresh(self):
+                return "done"
+            def _helper(self):
+                pass
+        profile_methods(Refresher, mode="trace")
+        output = io.StringIO()
+        with contextlib.redirect_stderr(output):
+            self.assertEqual(Refresher().refresh(), "done")
+        self.assertIn("[trace] TestProfilingHooks.test_trace_mode_reports_duration.<locals>.Refresher.refresh",
+                      output.getvalue())
+        self.assertFalse(hasattr(Refresher._helper, "__wrapped__"))
+
+    def test_cprofile_mode_writes_stats(self):
+        """
+        Test that cProfile mode collects nested calls once and dumps a pstats file.
+        """
+        def inner():
+            return sum(range(100))
+
+        def outer():
+            return wrapped_inner() + 1
+
+        wrapped_inner = profiled(inner, mode="cprofile")
+        profiled(outer, mode="cprofile")()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "todo.prof")
+            instrument.write_profile(path)
+            names = {func[2] for func in pstats.Stats(path).stats}
+        self.assertIn("inner", names)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from database import TaskLists, init_database
+from main import TodoAppCLI, build_parser, run_batch, run_command
+
+class TestScriptableCLI(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.storage = init_database(os.path.join(self.tmpdir.name, 'todo.db'))
+        self.cli = TodoAppCLI(self.storage)
+        self.parser = build_parser()
+        self.output = io.StringIO()
+
+    def tearDown(self):
+        self.storage.close()
+        self.tmpdir.cleanup()
+
+    def run_args(self, *argv):
+        with contextlib.redirect_stdout(self.output):
+            return run_command(self.cli, self.parser.parse_args(argv))
+
+    def titles(self):
+        return [(t.title, t.priority, t.done) for t in self.cli.task_manager.get_tasks()]
+
+    def test_subcommands(self):
+        """
+        Test add, done and rm subcommands run against TaskManager and return.
+        """
+        self.run_args("add", "Buy milk", "-p", "High")
+        self.run_args("add", "Write report")
+        self.run_args("add", "Call mom")
+        self.run_args("done", "1-2")
+        self.run_args("rm", "3")
+        self.assertEqual(self.titles(), [("Buy milk", "High", 1), ("Write report", "Medium", 1)])
+        self.run_args("done", "2", "--undo")
+        self.assertEqual(self.titles()[1], ("Write report", "Medium", 0))
+
+    def test_interactive_ids_accept_lists_and_ranges(self):
+        """
+        Test that the menu's toggle and delete prompts parse a single id written as a list or range.
+        """
+        self.run_args("add", "Buy milk")
+        self.run_args("add", "Call mom")
+        with contextlib.redirect_stdout(self.output), patch("builtins.input", side_effect=["1,", "2-2", "x"]):
+            self.cli.mark_task()
+            self.cli.delete_task()
+            self.cli.delete_task()
+        self.assertEqual(self.titles(), [("Buy milk", "Medium", 1)])
+        self.assertIn("Invalid task ID", self.output.getvalue())
+        self.assertNotIn("not found", self.output.getvalue())
+
+    def test_export_jsonl_to_stdout(self):
+        """
+        Test export writes one JSON object per task.
+        """
+        self.run_args("add", "Buy milk")
+        self.output = io.StringIO()
+        self.run_args("export")
+        self.assertEqual(self.output.getvalue(),
+                         '{"id": 1, "title": "Buy milk", "priority": "Medium", "done": 0}\n')
+
+    def test_undo_and_redo(self):
+        """
+        Test that undo and redo subcommands step through the change history.
+        """
+        self.run_args("add", "Buy milk")
+        self.run_args("rm", "1")
+        self.run_args("undo")
+        self.assertEqual(self.titles(), [("Buy milk", "Medium", 0)])
+        self.run_args("redo")
+        self.assertEqual(self.titles(), [])
+
+    def test_lists_subcommand(self):
+        """
+        Test that --list picks a list parsed globally and `lists` shows every list's counts.
+        """
+        lists = TaskLists(self.storage.db_file)
+        args = self.parser.parse_args(["--list", "work", "add", "Ship it"])
+        self.assertEqual(args.list_name, "work")
+        with contextlib.redirect_stdout(self.output):
+            run_command(TodoAppCLI(lists.storage(args.list_name), lists), args)
+            self.cli.lists = lists
+            self.run_args("lists")
+        self.assertIn("work", self.output.getvalue())
+        self.assertIn("0/1 done", self.output.getvalue())
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            self.parser.parse_args(["--list", "a/b", "lists"])
+        lists.close()
+
+    def test_import_with_jobs_and_check(self):
+        """
+        Test that --check only validates and --jobs imports through worker processes.
+        """
+        path = os.path.join(self.tmpdir.name, "tasks.jsonl")
+        with open(path, "w") as f:
+            f.write('{"title": "Buy milk", "priority": "High"}\n{"title": ""}\n{"title": "Call mom", "done": true}\n')
+        self.run_args("import", path, "--check", "--jobs", "1")
+        self.assertEqual(self.titles(), [])
+        self.assertIn("Checked 2 tasks", self.output.getvalue())
+        self.assertIn("Skipped 1 rows", self.output.getvalue())
+        self.run_args("import", path, "-j", "1")
+        self.assertEqual(self.titles(), [("Buy milk", "High", 0), ("Call mom", "Medium", 1)])
+        self.output = io.StringIO()
+        self.run_args("import", path, "--jobs", "0")
+        self.assertIn("Skipped 1 rows", self.output.getvalue())
+
+    def test_stats_json(self):
+        """
+        Test the stats subcommand reports grouped counts.
+        """
+        self.run_args("add", "Buy milk", "-p", "High")
+        self.run_args("add", "Write report")
+        self.run_args("done", "1")
+        self.output = io.StringIO()
+        self.run_args("stats", "--json")
+        stats = json.loads(self.output.getvalue())
+        self.assertEqual((stats["total"], stats["done"], stats["pending"]), (2, 1, 1))
+        self.assertEqual(stats["by_priority"]["High"], {"done": 1, "pending": 0, "total": 1})
+
+    def test_import_reports_unreadable_files(self):
+        """
+        Test that a missing file or an unknown extension gets a one-line error and a non-zero exit code.
+        """
+        errors = io.StringIO()
+        with contextlib.redirect_stderr(errors):
+            for jobs in ("0", "1"):
+                self.assertEqual(self.run_args("import", os.path.join(self.tmpdir.name, "missing.csv"), "-j", jobs), 1)
+                self.assertEqual(self.run_args("import", "tasks.txt", "-j", jobs), 1)
+        self.assertEqual(errors.getvalue().count("[!] Import failed"), 4)
+        self.assertIn("Unsupported import format: .txt", errors.getvalue())
+        self.assertEqual(self.titles(), [])
+
+    def test_import_reports_malformed_rows(self):
+        """
+        Test that malformed rows are listed by line on every import path, and fail only --check.
+        """
+        path = os.path.join(self.tmpdir.name, "tasks.jsonl")
+        with open(path, "w") as f:
+            f.write('{"title": "Buy milk"}\n{"title": \n5\n')
+        for argv, code in ((("--check",), 1), (("-j", "0"), 0), (("-j", "1"), 0)):
+            self.output = io.StringIO()
+            self.assertEqual(self.run_args("import", path, *argv), code, argv)
+            self.assertIn("Skipped 2 malformed rows", self.output.getvalue())
+            self.assertIn("line 2: invalid JSON", self.output.getvalue())
+            self.assertIn("line 3: expected a JSON object, got number", self.output.getvalue())
+        self.assertEqual(self.titles(), [("Buy milk", "Medium", 0)] * 2)
+
+    def test_batch_applies_all_lines(self):
+        """
+        Test batch mode runs every line, skipping blanks and comments.
+        """
+        lines = ['add "Buy milk" -p Low\n', '\n', '# nightly sync\n', 'add Report\n', 'done 1\n']
+        with contextlib.redirect_stdout(self.output):
+            code = run_batch(self.cli, lines)
+        self.assertEqual(code, 0)
+        self.assertEqual(self.titles(), [("Buy milk", "Low", 1), ("Report", "Medium", 0)])
+        self.assertIn("Batch applied 3 command(s)", self.output.getvalue())
+
+    def test_batch_rolls_back_on_invalid_line(self):
+        """
+        Test that one bad line aborts the batch without saving earlier lines.
+        """
+        with contextlib.redirect_stdout(self.output), contextlib.redirect_stderr(io.StringIO()):
+            code = run_batch(self.cli, ["add First\n", "frobnicate 3\n"])
+        self.assertEqual(code, 2)
+        self.assertEqual(self.titles(), [])
+
+    def test_batch_rejects_global_options_and_other_commands(self):
+        """
+        Test that a batch line naming another list, or a command that can't run in a batch, aborts the batch.
+        """
+        for line in ("-l work add x\n", "add x --list work\n", "serve\n", "lists\n", "--gui\n"):
+            errors = io.StringIO()
+            with contextlib.redirect_stdout(self.output), contextlib.redirect_stderr(errors):
+                code = run_batch(self.cli, ["add First\n", line])
+            self.assertEqual(code, 2, line)
+            self.assertIn("Batch aborted", errors.getvalue())
+        self.assertEqual(self.titles(), [])
+
+if __name__ == '__main__':
+    unittest.main()
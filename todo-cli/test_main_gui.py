@@ -0,0 +1,103 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from main_gui import TodoGUI
+from tasks import Task
+
+class FakeTreeview:
+    """Stands in for a ttk.Treeview: keeps the item order and records every call that touches it."""
+
+    def __init__(self):
+        self.order = []
+        self.values = {}
+        self.calls = []
+
+    def insert(self, parent, index, iid, values, tags):
+        self.calls.append(("insert", iid))
+        self.order.insert(len(self.order) if index == "end" else index, iid)
+        self.values[iid] = values
+
+    def move(self, iid, parent, index):
+        self.calls.append(("move", iid))
+        self.order.remove(iid)
+        self.order.insert(index, iid)
+
+    def item(self, iid, values, tags):
+        self.calls.append(("item", iid))
+        self.values[iid] = values
+
+    def delete(self, iid):
+        self.calls.append(("delete", iid))
+        self.order.remove(iid)
+        del self.values[iid]
+
+class TestTodoGUIRows(unittest.TestCase):
+
+    def setUp(self):
+        # The diffing methods only need these attributes, so no Tk window is created
+        self.tree = FakeTreeview()
+        self.gui = SimpleNamespace(
+            task_tree=self.tree, task_rows={}, search_job=None, search=None,
+            scheduler=SimpleNamespace(accepts=lambda: True),
+            search_var=SimpleNamespace(get=lambda: self.gui.search or ""),
+            worker=MagicMock(), refresh_task_list=MagicMock(), show_stats=MagicMock(),
+        )
+
+    def load(self, tasks):
+        TodoGUI.apply_task_rows(self.gui, tasks)
+
+    def test_apply_task_rows_touches_only_changed_rows(self):
+        """
+        Test that a reload inserts, updates and deletes only the rows that differ from those shown.
+        """
+        self.load([Task(1, "A", "High", 0), Task(2, "B", "Low", 0), Task(3, "C", "Low", 0)])
+        self.tree.calls.clear()
+        self.load([Task(1, "A", "High", 0), Task(3, "C", "Low", 1), Task(4, "D", "Medium", 0)])
+        self.assertEqual(sorted(self.tree.calls), [("delete", "2"), ("insert", "4"), ("item", "3")])
+        self.assertEqual(self.tree.order, ["1", "3", "4"])
+        self.assertEqual(self.tree.values["3"], (3, "C", "Low", "Done"))
+
+    def test_apply_task_rows_moves_reordered_rows(self):
+        """
+        Test that rows are moved only when the new results come in a different order.
+        """
+        self.load([Task(1, "A", "High", 0), Task(2, "B", "Low", 0)])
+        self.tree.calls.clear()
+        self.load([Task(2, "B", "Low", 0), Task(1, "A", "High", 0)])
+        self.assertEqual(self.tree.calls, [("move", "2"), ("move", "1")])
+        self.assertEqual(self.tree.order, ["2", "1"])
+
+    def test_apply_task_rows_skips_stale_results(self):
+        """
+        Test that rows read while our own writes are in flight are not applied.
+        """
+        self.gui.scheduler.accepts = lambda: False
+        self.load([Task(1, "A", "High", 0)])
+        self.assertEqual((self.tree.calls, self.gui.task_rows), ([], {}))
+
+    def test_apply_changes_patches_rows_in_id_order(self):
+        """
+        Test that a feed delta deletes, updates, appends and bisects restored tasks into place.
+        """
+        self.load([Task(1, "A", "High", 0), Task(3, "C", "Low", 0), Task(5, "E", "Low", 0)])
+        self.tree.calls.clear()
+        TodoGUI.apply_changes(self.gui, {5: None, 3: Task(3, "C", "Low", 1), 2: Task(2, "B", "Low", 0),
+                                         7: Task(7, "G", "High", 0), 9: None})
+        self.assertEqual(self.tree.calls, [("insert", "2"), ("item", "3"), ("delete", "5"), ("insert", "7")])
+        self.assertEqual(self.tree.order, ["1", "2", "3", "7"])
+        self.assertEqual(list(self.gui.task_rows), [1, 2, 3, 7])
+        self.gui.worker.submit.assert_called_once()
+
+    def test_apply_changes_searches_again_instead_of_patching_results(self):
+        """
+        Test that a delta arriving while search results are shown re-runs the search.
+        """
+        self.load([Task(1, "A", "High", 0)])
+        self.tree.calls.clear()
+        self.gui.search = "A"
+        TodoGUI.apply_changes(self.gui, {1: None})
+        self.gui.refresh_task_list.assert_called_once_with()
+        self.assertEqual(self.tree.calls, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import asyncio
+import contextlib
+import http.client
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from database import init_database
+from server import TodoServer
+from tasks import TaskManager
+
+class TestTodoServer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.storage = init_database(os.path.join(self.tmpdir.name, 'todo.db'), pool_size=2)
+        self.server = TodoServer(self.storage, port=0)
+        # Run the server's event loop in the background, as `main.py serve` would in the foreground
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result(5)
+        self.conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=5)
+
+    def tearDown(self):
+        self.conn.close()
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+        self.storage.close()
+        self.tmpdir.cleanup()
+
+    def request(self, method, path, body=None, headers=None):
+        self.conn.request(method, path, json.dumps(body) if body is not None else None, headers or {})
+        response = self.conn.getresponse()
+        data = response.read()
+        return response.status, json.loads(data) if data else None, response.getheader("ETag")
+
+    def test_crud_over_one_connection(self):
+        """
+        Test create, list, update and delete round trips on a kept-alive connection.
+        """
+        status, task, _ = self.request("POST", "/tasks", {"title": "Buy milk", "priority": "High"})
+        self.assertEqual((status, task), (201, {"id": 1, "title": "Buy milk", "priority": "High", "done": False}))
+        self.request("POST", "/tasks", {"title": "Call mom"})
+        self.assertEqual(self.request("PATCH", "/tasks/2", {"done": True})[0], 204)
+        status, tasks, _ = self.request("GET", "/tasks?status=done")
+        self.assertEqual((status, [t["title"] for t in tasks]), (200, ["Call mom"]))
+        self.assertEqual(self.request("DELETE", "/tasks/1")[0], 204)
+        self.assertEqual(self.request("DELETE", "/tasks/1")[0], 404)
+        self.assertEqual(self.request("GET", "/stats")[1]["total"], 1)
+
+    def test_rejects_bad_requests(self):
+        """
+        Test validation errors come back as 400s with a JSON error message.
+        """
+        self.assertEqual(self.request("POST", "/tasks", {"title": " "})[0], 400)
+        self.assertEqual(self.request("POST", "/tasks", {"title": "x", "priority": "Urgent"})[0], 400)
+        self.assertEqual(self.request("GET", "/tasks?sort=title")[0], 400)
+        self.assertEqual(self.request("GET", "/tasks?limit=ten")[0], 400)
+        self.assertEqual(self.request("GET", "/tasks?sort=priority&after=3")[0], 400)
+        self.assertEqual(self.request("PUT", "/tasks")[0], 405)
+        status, error, _ = self.request("GET", "/nowhere")
+        self.assertEqual((status, list(error)), (404, ["error"]))
+
+    def test_rejects_invalid_content_length(self):
+        """
+        Test that a non-numeric or negative Content-Length gets a 400 instead of a dropped connection.
+        """
+        for length in ("abc", "-5"):
+            conn = http.client.HTTPConnection("127.0.0.1", self.server.port, timeout=5)
+            conn.putrequest("POST", "/tasks")
+            conn.putheader("Content-Length", length)
+            conn.endheaders()
+            response = conn.getresponse()
+            self.assertEqual((response.status, json.loads(response.read())), (400, {"error": "Invalid Content-Length"}))
+            conn.close()
+
+    def test_conditional_get_returns_not_modified(self):
+        """
+        Test that a matching If-None-Match gets a 304 until the list changes.
+        """
+        self.request("POST", "/tasks", {"title": "Buy milk"})
+        status, _, etag = self.request("GET", "/tasks")
+        self.assertEqual(status, 200)
+        self.assertEqual(self.request("GET", "/tasks", headers={"If-None-Match": etag})[0], 304)
+        self.request("PATCH", "/tasks/1", {"done": True})
+        status, tasks, new_etag = self.request("GET", "/tasks", headers={"If-None-Match": etag})
+        self.assertEqual((status, tasks[0]["done"]), (200, True))
+        self.assertNotEqual(new_etag, etag)
+
+    def test_conditional_get_sees_other_connections(self):
+        """
+        Test that a write made outside the server invalidates the ETag.
+        """
+        _, _, etag = self.request("GET", "/tasks")
+        other = init_database(self.storage.db_file)
+        with contextlib.redirect_stdout(io.StringIO()):
+            TaskManager(other).add_tasks([("Written elsewhere", "Low")])
+        other.close()
+        status, tasks, _ = self.request("GET", "/tasks", headers={"If-None-Match": etag})
+        self.assertEqual((status, [t["title"] for t in tasks]), (200, ["Written elsewhere"]))
+
+    def test_undo_and_redo(self):
+        """
+        Test that POST /undo and /redo revert and re-apply the latest change.
+        """
+        self.request("POST", "/tasks", {"title": "Buy milk"})
+        self.request("DELETE", "/tasks/1")
+        self.assertEqual(self.request("POST", "/undo"), (200, {"changed": 1}, None))
+        self.assertEqual([t["title"] for t in self.request("GET", "/tasks")[1]], ["Buy milk"])
+        self.assertEqual(self.request("POST", "/redo")[1], {"changed": 1})
+        self.assertEqual(self.request("GET", "/tasks")[1], [])
+        self.assertEqual(self.request("GET", "/undo")[0], 405)
+
+    def test_changes_feed(self):
+        """
+        Test that GET /changes returns the tasks written after a seq, and asks stale clients to reload.
+        """
+        status, start, _ = self.request("GET", "/changes")
+        self.assertEqual((status, start), (200, {"seq": 0, "reload": True, "changes": []}))
+        self.request("POST", "/tasks", {"title": "Buy milk"})
+        self.request("POST", "/tasks", {"title": "Call mom"})
+        self.request("DELETE", "/tasks/1")
+        status, feed, _ = self.request("GET", "/changes?since=0")
+        self.assertEqual((status, feed), (200, {"seq": 3, "reload": False, "changes": [
+            {"id": 1, "task": None},
+            {"id": 2, "task": {"id": 2, "title": "Call mom", "priority": "Medium", "done": False}},
+        ]}))
+        self.assertEqual(self.request("GET", "/changes?since=3")[1], {"seq": 3, "reload": False, "changes": []})
+        self.assertTrue(self.request("GET", "/changes?since=99")[1]["reload"])
+        self.assertEqual(self.request("GET", "/changes?since=x")[0], 400)
+
+    def test_metrics_endpoint_reports_write_batches(self):
+        """
+        Test that /metrics exposes the server's write counters.
+        """
+        self.request("POST", "/tasks", {"title": "Buy milk"})
+        status, metrics, _ = self.request("GET", "/metrics")
+        self.assertEqual((status, metrics["server"]), (200, {"write_batches": 1, "writes": 1}))
+
+    def test_concurrent_writes_share_transactions(self):
+        """
+        Test that writes queued together are committed in fewer transactions than requests.
+        """
+        async def burst():
+            return await asyncio.gather(*(self.server.write(TaskManager.add_task, f"Task {i}", "Low")
+                                          for i in range(50)))
+
+        ids = asyncio.run_coroutine_threadsafe(burst(), self.loop).result(10)
+        self.assertEqual(sorted(ids), list(range(1, 51)))
+        self.assertEqual(self.server.writes, 50)
+        self.assertLess(self.server.batches, 50)
+        self.assertEqual(len(self.request("GET", "/tasks?limit=100")[1]), 50)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
-from unittest.mock import MagicMock, patch
-from tasks import TaskManager
+from unittest.mock import MagicMock, call, patch
+from database import NOW_SQL
+from tasks import (LIST_PAGE_SIZE, ROWS_PER_INSERT, TASK_COLUMNS, Task, TaskManager, format_stats, parse_task_ids,
+                   task_columns)
 import io
 import sys
 
@@ -11,6 +13,8 @@ class TestTaskManager(unittest.TestCase):
         self.mock_storage = MagicMock()
         # Ensure connect() is called when TaskManager is initialized
         self.mock_storage.connect.return_value = None
+        self.mock_storage.has_journal = False
+        self.mock_storage.has_changes = False
         self.task_manager = TaskManager(self.mock_storage)
 
         # Capture print output for assertions
@@ -27,93 +31,267 @@ class TestTaskManager(unittest.TestCase):
         """
         self.task_manager.add_task("Test Task", "High")
         self.mock_storage.execute.assert_called_once_with(
-            "INSERT INTO tasks (title, priority, done) VALUES (?, ?, ?)", ("Test Task", "High", False)
+            "INSERT INTO tasks (title, priority, done) VALUES (?, ?, ?)", ("Test Task", 0, False)
         )
         self.assertIn("[+] Task added successfully!", self.held_output.getvalue())
 
+    def test_add_tasks_batches_in_chunks(self):
+        """
+        Test that add_tasks streams rows through multi-row INSERTs, one transaction per chunk.
+        """
+        items = [("Task 1", "Low"), {"title": "Task 2", "priority": "High", "done": "true"},
+                 ("  ", "Low"), ("Task 3",)]
+        count = self.task_manager.add_tasks(items, chunk_size=2)
+        self.assertEqual(count, 3)
+        sql = "INSERT INTO tasks (title, priority, done) VALUES (?, ?, ?)"
+        self.assertEqual(self.mock_storage.execute.call_args_list, [
+            call(sql + ", (?, ?, ?)", ["Task 1", 2, False, "Task 2", 0, True]),
+            call(sql, ["Task 3", 1, False]),
+        ])
+        self.assertEqual(self.mock_storage.transaction.call_count, 2)
+        self.mock_storage.executemany.assert_not_called()
+        self.assertIn("rows/sec", self.held_output.getvalue())
+
+    def test_insert_rows_splits_large_batches(self):
+        """
+        Test that insert_rows keeps each INSERT statement to ROWS_PER_INSERT rows.
+        """
+        rows = [(f"Task {i}", 1, False) for i in range(ROWS_PER_INSERT + 1)]
+        self.assertEqual(self.task_manager.insert_rows(rows), len(rows))
+        sizes = [len(args[1]) // 3 for args, _ in self.mock_storage.execute.call_args_list]
+        self.assertEqual(sizes, [ROWS_PER_INSERT, 1])
+        self.mock_storage.execute.return_value = None
+        self.assertEqual(self.task_manager.insert_rows(rows), 0)
+
     def test_get_tasks_empty(self):
         """
         Test get_tasks when no tasks are found.
         """
         self.mock_storage.fetchall.return_value = []
         tasks = self.task_manager.get_tasks()
-        self.mock_storage.fetchall.assert_called_once_with("SELECT id, title, priority, done FROM tasks")
+        self.mock_storage.fetchall.assert_called_once_with(f"SELECT {TASK_COLUMNS} FROM tasks ORDER BY tasks.id", (), record=Task)
         self.assertEqual(tasks, [])
 
     def test_get_tasks_with_data(self):
         """
         Test get_tasks when tasks are found.
         """
-        mock_tasks = [{"id": 1, "title": "Test Task", "priority": "High", "done": False}]
+        mock_tasks = [Task(1, "Test Task", "High", False)]
         self.mock_storage.fetchall.return_value = mock_tasks
         tasks = self.task_manager.get_tasks()
-        self.mock_storage.fetchall.assert_called_once_with("SELECT id, title, priority, done FROM tasks")
+        self.mock_storage.fetchall.assert_called_once_with(f"SELECT {TASK_COLUMNS} FROM tasks ORDER BY tasks.id", (), record=Task)
         self.assertEqual(tasks, mock_tasks)
 
+    def test_get_tasks_filtered_page(self):
+        """
+        Test filters, ordering and keyset pagination are pushed into SQL.
+        """
+        self.mock_storage.fetchall.return_value = []
+        self.task_manager.get_tasks(status="pending", priority="High", limit=50, after_id=10)
+        self.mock_storage.fetchall.assert_called_once_with(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE tasks.done = ? AND tasks.priority = ? AND tasks.id > ? "
+            "ORDER BY tasks.id LIMIT ?", (0, 0, 10, 50), record=Task
+        )
+
+    def test_get_tasks_pages_other_orders_by_offset(self):
+        """
+        Test a non-id ordering pages with offset and rejects an after_id cursor.
+        """
+        self.mock_storage.fetchall.return_value = []
+        self.task_manager.get_tasks(order_by="priority", limit=20, offset=40)
+        self.mock_storage.fetchall.assert_called_once_with(
+            f"SELECT {TASK_COLUMNS} FROM tasks ORDER BY tasks.priority, tasks.id LIMIT ? OFFSET ?", (20, 40), record=Task
+        )
+        with self.assertRaises(ValueError):
+            self.task_manager.get_tasks(order_by="priority", after_id=7, limit=20)
+
+    def test_get_tasks_rejects_unknown_options(self):
+        """
+        Test unknown status filters and sort keys raise ValueError.
+        """
+        with self.assertRaises(ValueError):
+            self.task_manager.get_tasks(status="archived")
+        with self.assertRaises(ValueError):
+            self.task_manager.get_tasks(priority="Urgent")
+        with self.assertRaises(ValueError):
+            self.task_manager.get_tasks(order_by="title; DROP TABLE tasks")
+
+    def test_get_tasks_cached_until_data_version_changes(self):
+        """
+        Test that the cache answers repeated reads and reloads after an external write.
+        """
+        manager = TaskManager(self.mock_storage, cache=True)
+        rows = [Task(1, "Test Task", "High", 0)]
+        version = [{"data_version": 1}]
+        self.mock_storage.fetchall.side_effect = lambda sql, params=(), record=None: version if "data_version" in sql else rows
+        self.assertEqual(manager.get_tasks(), rows)
+        self.assertEqual(manager.get_tasks(), rows)
+        loads = [c for c in self.mock_storage.fetchall.call_args_list if "FROM tasks" in c.args[0]]
+        self.assertEqual(len(loads), 1)
+
+        version = [{"data_version": 2}]
+        manager.get_tasks()
+        loads = [c for c in self.mock_storage.fetchall.call_args_list if "FROM tasks" in c.args[0]]
+        self.assertEqual(len(loads), 2)
+
+    def test_cache_is_write_through(self):
+        """
+        Test that our own add, toggle and delete update the cache without reloading.
+        """
+        manager = TaskManager(self.mock_storage, cache=True)
+        self.mock_storage.fetchall.side_effect = lambda sql, params=(), record=None: (
+            [{"data_version": 1}] if "data_version" in sql else
+            [Task(1, "A", "Low", 0), Task(2, "B", "Low", 0)]
+        )
+        manager.get_tasks()
+        self.mock_storage.execute.return_value.rowcount = 1
+        self.mock_storage.execute.return_value.lastrowid = 3
+        manager.add_task("C", "High")
+        manager.mark_task(1)
+        manager.delete_task(2)
+        self.assertEqual(manager.get_tasks(), [
+            Task(1, "A", "Low", 1),
+            Task(3, "C", "High", 0),
+        ])
+        loads = [c for c in self.mock_storage.fetchall.call_args_list if "FROM tasks" in c.args[0]]
+        self.assertEqual(len(loads), 1)
+
     def test_list_tasks_with_tasks(self):
         """
         Test that list_tasks displays tasks correctly.
         """
         mock_tasks = [
-            {"id": 1, "title": "First Task", "priority": "Low", "done": False},
-            {"id": 2, "title": "Second Task Done", "priority": "High", "done": True}
+            Task(1, "First Task", "Low", False),
+            Task(2, "Second Task Done", "High", True)
         ]
-        self.mock_storage.fetchall.return_value = mock_tasks # This will be called by get_tasks
+        self.mock_storage.fetchiter.return_value = iter(mock_tasks)
         self.task_manager.list_tasks()
         output = self.held_output.getvalue()
         self.assertIn("First Task", output)
         self.assertIn("Second Task Done", output)
         self.assertIn("Not Done", output)
         self.assertIn("Done", output)
-        self.mock_storage.fetchall.assert_called_once_with("SELECT id, title, priority, done FROM tasks")
+        self.mock_storage.fetchiter.assert_called_once_with(f"SELECT {TASK_COLUMNS} FROM tasks ORDER BY tasks.id", (), record=Task)
+        self.mock_storage.fetchall.assert_not_called()
+        self.assertIn("Second Task Done  \033[0m |", output)  # longest title plus two spaces
 
+    def test_list_tasks_page(self):
+        """
+        Test that a page of list_tasks is read with LIMIT/OFFSET and long titles are truncated.
+        """
+        long_title = "x" * 200
+        self.mock_storage.fetchiter.return_value = iter([Task(21, long_title, "Low", False)])
+        self.task_manager.list_tasks(limit=10, page=3)
+        self.mock_storage.fetchiter.assert_called_once_with(
+            f"SELECT {TASK_COLUMNS} FROM tasks ORDER BY tasks.id LIMIT ? OFFSET ?", (10, 20), record=Task
+        )
+        output = self.held_output.getvalue()
+        self.assertNotIn(long_title, output)
+        self.assertIn("x" * 59 + "...", output)
 
-    def test_list_tasks_no_tasks(self):
+    def test_list_tasks_page_without_limit(self):
         """
-        Test listing tasks when there are none.
+        Test that a page asked for without a limit uses the default page size instead of being ignored.
         """
-        self.mock_storage.fetchall.return_value = [] # This will be called by get_tasks
-        self.task_manager.list_tasks()
-        self.assertIn("No tasks found.", self.held_output.getvalue())
-        self.mock_storage.fetchall.assert_called_once_with("SELECT id, title, priority, done FROM tasks")
+        self.mock_storage.fetchiter.return_value = iter([])
+        self.task_manager.list_tasks(page=2)
+        self.mock_storage.fetchiter.assert_called_once_with(
+            f"SELECT {TASK_COLUMNS} FROM tasks ORDER BY tasks.id LIMIT ? OFFSET ?", (LIST_PAGE_SIZE, LIST_PAGE_SIZE),
+            record=Task
+        )
 
-    def test_mark_task_found_to_done(self):
+    def test_search_uses_fts_index(self):
         """
-        Test marking an undone task as done.
+        Test that search turns words into prefix terms and quotes into phrases.
         """
-        # Mock _find_task_by_id's behavior through fetchall
-        self.mock_storage.fetchall.side_effect = [
-            [{"id": 1, "title": "Test Task", "priority": "High", "done": False}], # For _find_task_by_id
-            [] # To prevent issues with subsequent fetchall calls if any
-        ]
-        self.task_manager.mark_task("1")
-        self.mock_storage.execute.assert_called_once_with(
-            "UPDATE tasks SET done = ? WHERE id = ?", (True, 1)
+        self.mock_storage.has_fts = True
+        self.mock_storage.fetchall.return_value = []
+        self.task_manager.search('gro "buy milk"', limit=10)
+        self.mock_storage.fetchall.assert_called_once_with(
+            f"SELECT {task_columns('t')} FROM tasks_fts "
+            "JOIN tasks t ON t.id = tasks_fts.rowid WHERE tasks_fts MATCH ? ORDER BY rank LIMIT ?",
+            ('"gro"* "buy milk"', 10), record=Task
         )
-        self.assertIn("[+] Task status updated.", self.held_output.getvalue())
 
-    def test_mark_task_found_to_undone(self):
+    def test_search_without_fts_falls_back_to_like(self):
+        """
+        Test that search scans with escaped LIKE patterns when FTS5 is unavailable.
+        """
+        self.mock_storage.has_fts = False
+        self.mock_storage.fetchall.return_value = []
+        self.task_manager.search("50%")
+        self.mock_storage.fetchall.assert_called_once_with(
+            f"SELECT {TASK_COLUMNS} FROM tasks WHERE title LIKE ? ESCAPE '\\' ORDER BY id LIMIT ?",
+            ("%50\\%%", 50), record=Task
+        )
+
+    def test_search_blank_query(self):
+        """
+        Test that a blank search returns nothing without touching the database.
+        """
+        self.assertEqual(self.task_manager.search('  ""  '), [])
+        self.mock_storage.fetchall.assert_not_called()
+
+    def test_stats_from_counters(self):
         """
-        Test marking a done task as undone.
+        Test that stats reads the summary table and derives totals and completion.
         """
-        # Mock _find_task_by_id's behavior through fetchall
-        self.mock_storage.fetchall.side_effect = [
-            [{"id": 1, "title": "Test Task", "priority": "High", "done": True}], # For _find_task_by_id
-            []
+        self.mock_storage.has_counters = True
+        self.mock_storage.fetchall.return_value = [
+            {"priority": 0, "done": 1, "count": 3},
+            {"priority": 0, "done": 0, "count": 1},
+            {"priority": 2, "done": 0, "count": 4},
         ]
+        stats = self.task_manager.stats()
+        self.mock_storage.fetchall.assert_called_once_with("SELECT priority, done, count FROM task_stats WHERE count > 0")
+        self.assertEqual(stats["total"], 8)
+        self.assertEqual(stats["done"], 3)
+        self.assertEqual(stats["pending"], 5)
+        self.assertEqual(stats["completion"], 3 / 8)
+        self.assertEqual(stats["by_priority"]["High"], {"done": 3, "pending": 1, "total": 4})
+        self.assertEqual(format_stats(stats), "8 tasks   |   3 done (38%)   |   High: 3/4   |   Low: 0/4")
+
+    def test_stats_without_counters_groups_in_sql(self):
+        """
+        Test that stats falls back to GROUP BY when there is no summary table.
+        """
+        self.mock_storage.has_counters = False
+        self.mock_storage.fetchall.return_value = []
+        self.assertEqual(self.task_manager.stats()["completion"], 0.0)
+        self.mock_storage.fetchall.assert_called_once_with(
+            "SELECT priority, done, COUNT(*) AS count FROM tasks GROUP BY priority, done"
+        )
+
+    def test_list_tasks_no_tasks(self):
+        """
+        Test listing tasks when there are none.
+        """
+        self.mock_storage.fetchiter.return_value = iter([])
+        self.task_manager.list_tasks()
+        self.assertIn("No tasks found.", self.held_output.getvalue())
+        self.mock_storage.fetchall.assert_not_called()
+
+    def test_mark_task_found(self):
+        """
+        Test toggling a task flips it in a single UPDATE statement.
+        """
+        self.mock_storage.execute.return_value.rowcount = 1
         self.task_manager.mark_task("1")
         self.mock_storage.execute.assert_called_once_with(
-            "UPDATE tasks SET done = ? WHERE id = ?", (False, 1)
+            f"UPDATE tasks SET done = NOT done, updated_at = {NOW_SQL} WHERE id = ?", (1,)
         )
+        self.mock_storage.fetchall.assert_not_called()
         self.assertIn("[+] Task status updated.", self.held_output.getvalue())
 
     def test_mark_task_not_found(self):
         """
         Test marking a task when the task ID doesn't exist.
         """
-        self.mock_storage.fetchall.return_value = [] # For _find_task_by_id
+        self.mock_storage.execute.return_value.rowcount = 0
         self.task_manager.mark_task("99")
-        self.mock_storage.execute.assert_not_called()
+        self.mock_storage.execute.assert_called_once_with(
+            f"UPDATE tasks SET done = NOT done, updated_at = {NOW_SQL} WHERE id = ?", (99,)
+        )
         self.assertIn("[!] Task ID not found.", self.held_output.getvalue())
     
     def test_mark_task_invalid_id(self):
@@ -121,33 +299,51 @@ class TestTaskManager(unittest.TestCase):
         Test marking a task with an invalid (non-numeric) ID.
         """
         self.task_manager.mark_task("abc")
-        self.mock_storage.fetchall.assert_not_called() # Corrected: fetchall should not be called for invalid ID
+        self.mock_storage.fetchall.assert_not_called()
         self.mock_storage.execute.assert_not_called()
         self.assertIn("[!] Task ID not found.", self.held_output.getvalue())
 
+    def test_mark_tasks_batch(self):
+        """
+        Test toggling several tasks at once uses one executemany call.
+        """
+        self.mock_storage.executemany.return_value.rowcount = 2
+        count = self.task_manager.mark_tasks(["1", 2, "x"])
+        self.assertEqual(count, 2)
+        self.mock_storage.executemany.assert_called_once_with(
+            f"UPDATE tasks SET done = NOT done, updated_at = {NOW_SQL} WHERE id = ?", [(1,), (2,)]
+        )
+        self.assertIn("[+] 2 task(s) status updated.", self.held_output.getvalue())
+
+    def test_set_done(self):
+        """
+        Test marking tasks done sets the flag rather than toggling it.
+        """
+        self.mock_storage.executemany.return_value.rowcount = 2
+        self.assertEqual(self.task_manager.set_done(["3", 4, "4"], done=False), 2)
+        self.mock_storage.executemany.assert_called_once_with(
+            f"UPDATE tasks SET done = ?, updated_at = {NOW_SQL} WHERE id = ?", [(0, 3), (0, 4)]
+        )
+        self.assertIn("[+] 2 task(s) marked not done.", self.held_output.getvalue())
 
     def test_delete_task_found(self):
         """
         Test deleting a task when the task is found.
         """
-        # Mock _find_task_by_id's behavior through fetchall
-        self.mock_storage.fetchall.side_effect = [
-            [{"id": 1, "title": "Test Task", "priority": "High", "done": False}], # For _find_task_by_id
-            []
-        ]
+        self.mock_storage.execute.return_value.rowcount = 1
         self.task_manager.delete_task("1")
         self.mock_storage.execute.assert_called_once_with(
             "DELETE FROM tasks WHERE id = ?", (1,)
         )
+        self.mock_storage.fetchall.assert_not_called()
         self.assertIn("[+] Task deleted successfully.", self.held_output.getvalue())
 
     def test_delete_task_not_found(self):
         """
         Test deleting a task when the task ID doesn't exist.
         """
-        self.mock_storage.fetchall.return_value = [] # For _find_task_by_id
+        self.mock_storage.execute.return_value.rowcount = 0
         self.task_manager.delete_task("99")
-        self.mock_storage.execute.assert_not_called()
         self.assertIn("[!] Task ID not found.", self.held_output.getvalue())
         
     def test_delete_task_invalid_id(self):
@@ -155,9 +351,48 @@ class TestTaskManager(unittest.TestCase):
         Test deleting a task with an invalid (non-numeric) ID.
         """
         self.task_manager.delete_task("abc")
-        self.mock_storage.fetchall.assert_not_called() # Corrected: fetchall should not be called for invalid ID
+        self.mock_storage.fetchall.assert_not_called()
         self.mock_storage.execute.assert_not_called()
         self.assertIn("[!] Task ID not found.", self.held_output.getvalue())
 
+    def test_delete_tasks_none_found(self):
+        """
+        Test batch delete reports not found when no rows were removed.
+        """
+        self.mock_storage.executemany.return_value.rowcount = 0
+        self.assertEqual(self.task_manager.delete_tasks([5, 6]), 0)
+        self.assertIn("[!] Task ID not found.", self.held_output.getvalue())
+
+
+class TestTask(unittest.TestCase):
+
+    def test_task_supports_dict_style_access(self):
+        """
+        Test that Task rows still work for callers written against dict rows.
+        """
+        task = Task(1, "Test Task", "High", 0)
+        self.assertEqual(task["title"], "Test Task")
+        self.assertEqual(task.title, "Test Task")
+        self.assertEqual(task[0], 1)
+        self.assertEqual(task.get("priority"), "High")
+        self.assertIsNone(task.get("missing"))
+        self.assertEqual(dict(task), {"id": 1, "title": "Test Task", "priority": "High", "done": 0})
+        with self.assertRaises(KeyError):
+            task["missing"]
+
+
+class TestParseTaskIds(unittest.TestCase):
+
+    def test_parse_task_ids(self):
+        """
+        Test single IDs, lists and ranges are expanded, junk is skipped.
+        """
+        self.assertEqual(parse_task_ids("3"), [3])
+        self.assertEqual(parse_task_ids("1, 4,7"), [1, 4, 7])
+        self.assertEqual(parse_task_ids("3-6,9"), [3, 4, 5, 6, 9])
+        self.assertEqual(parse_task_ids("6-4,abc,"), [4, 5, 6])
+        self.assertEqual(parse_task_ids("2,1-999999999"), [2])
+        self.assertEqual(parse_task_ids("3-5,4,3"), [3, 4, 5])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,203 @@
+import contextlib
+import io
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from worker import ChangeFeed, DatabaseWorker, RefreshScheduler
+
+class FakeWidget:
+    """Stands in for a Tk widget: after() callbacks are run by pump() on the test thread."""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, ms, func):
+        self.pending.append(func)
+        return func
+
+    def after_cancel(self, job):
+        self.pending.remove(job)
+
+    def pump(self, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            func = self.pending.pop(0)
+            func()
+            time.sleep(0.001)
+
+class TestDatabaseWorker(unittest.TestCase):
+
+    def setUp(self):
+        self.widget = FakeWidget()
+        self.task_manager = MagicMock()
+        self.busy = []
+        self.worker = DatabaseWorker(self.widget, self.task_manager, on_busy=self.busy.append)
+
+    def tearDown(self):
+        self.worker.shutdown()
+
+    def test_runs_off_thread_and_calls_back_on_caller_thread(self):
+        """
+        Test that work runs on the worker thread and the callback on the polling thread.
+        """
+        threads = {}
+
+        def work(task_manager, value):
+            threads["work"] = threading.current_thread()
+            return value * 2
+
+        results = []
+        self.worker.submit(work, 21, callback=lambda result: results.append((result, threading.current_thread())))
+        self.widget.pump()
+        self.assertEqual(results, [(42, threading.current_thread())])
+        self.assertIsNot(threads["work"], threading.current_thread())
+        self.assertEqual(self.busy[0], True)
+        self.assertEqual(self.busy[-1], False)
+
+    def test_superseded_refresh_is_dropped(self):
+        """
+        Test that only the newest submission for a key delivers its result.
+        """
+        gate = threading.Event()
+        results = []
+        self.worker.submit(lambda tm: gate.wait(), callback=results.append, key="block")
+        self.worker.submit(lambda tm: "old", callback=results.append, key="refresh")
+        self.worker.submit(lambda tm: "new", callback=results.append, key="refresh")
+        gate.set()
+        self.widget.pump()
+        self.assertEqual(results, [True, "new"])
+        self.assertEqual(self.busy[-1], False)
+
+    def test_task_manager_is_passed_through(self):
+        """
+        Test that submitted callables receive the TaskManager as first argument.
+        """
+        self.task_manager.get_tasks.return_value = [{"id": 1}]
+        results = []
+        self.worker.submit(lambda tm: tm.get_tasks(), callback=results.append)
+        self.widget.pump()
+        self.assertEqual(results, [[{"id": 1}]])
+
+class TestRefreshScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.widget = FakeWidget()
+        self.worker = DatabaseWorker(self.widget, MagicMock())
+        self.refreshed = []
+        self.scheduler = RefreshScheduler(self.widget, self.worker, lambda: self.refreshed.append(True))
+
+    def tearDown(self):
+        self.worker.shutdown()
+
+    def test_burst_of_writes_costs_one_refresh(self):
+        """
+        Test that many writes apply optimistically at once and share a single refresh.
+        """
+        applied = []
+        for i in range(20):
+            self.scheduler.write(lambda tm, i: i, i, optimistic=lambda i=i: applied.append(i))
+        self.assertEqual(applied, list(range(20)))
+        self.assertFalse(self.scheduler.accepts())
+        self.widget.pump()
+        self.assertEqual(self.refreshed, [True])
+        self.assertTrue(self.scheduler.accepts())
+
+    def test_failed_write_still_refreshes(self):
+        """
+        Test that a write that raises settles and requests the refresh that undoes it.
+        """
+        def fail(task_manager):
+            raise ValueError("disk full")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.scheduler.write(fail, optimistic=lambda: None)
+            self.widget.pump()
+        self.assertEqual(self.refreshed, [True])
+        self.assertEqual(self.scheduler.pending_writes, 0)
+
+    def test_optimistic_write_that_misses_reloads(self):
+        """
+        Test that an optimistic write that raises or changes nothing asks for a full reload, not a delta refresh.
+        """
+        reloads = []
+        self.scheduler.reload = lambda: reloads.append(True)
+
+        def fail(task_manager):
+            raise ValueError("database is locked")
+
+        self.scheduler.write(lambda tm: 1, optimistic=lambda: None)
+        self.widget.pump()
+        self.assertEqual((self.refreshed, reloads), ([True], []))
+        with contextlib.redirect_stdout(io.StringIO()):
+            for func in (fail, lambda tm: 0):
+                self.scheduler.write(func, optimistic=lambda: None)
+                self.widget.pump()
+        self.assertEqual((self.refreshed, reloads), ([True], [True, True]))
+        self.scheduler.write(lambda tm: None)
+        self.widget.pump()
+        self.assertEqual((self.refreshed, reloads), ([True, True], [True, True]))
+
+    def test_cancel_drops_pending_refresh(self):
+        """
+        Test that a cancelled refresh request never runs.
+        """
+        self.scheduler.request()
+        self.scheduler.request()
+        self.scheduler.cancel()
+        self.widget.pump()
+        self.assertEqual(self.refreshed, [])
+
+class TestChangeFeed(unittest.TestCase):
+
+    def setUp(self):
+        self.widget = FakeWidget()
+        self.task_manager = MagicMock()
+        self.task_manager.latest_change.return_value = 7
+        self.worker = DatabaseWorker(self.widget, self.task_manager)
+        self.scheduler = RefreshScheduler(self.widget, self.worker, lambda: self.feed.poll())
+        self.applied, self.reloads = [], []
+        self.feed = ChangeFeed(self.widget, self.worker, self.scheduler, self.applied.append,
+                               lambda: self.reloads.append(True))
+
+    def tearDown(self):
+        self.worker.shutdown()
+
+    def test_poll_applies_delta_and_advances(self):
+        """
+        Test that a poll hands over only the changed tasks and remembers the new seq.
+        """
+        self.task_manager.changes_since.side_effect = [(9, {3: None}), (9, {})]
+        self.feed.reset()
+        self.widget.pump()
+        self.feed.poll()
+        self.widget.pump()
+        self.feed.poll()
+        self.widget.pump()
+        self.assertEqual([c.args for c in self.task_manager.changes_since.call_args_list], [(7,), (9,)])
+        self.assertEqual((self.feed.seq, self.applied, self.reloads), (9, [{3: None}], []))
+
+    def test_reloads_without_a_delta(self):
+        """
+        Test that a poll falls back to a full reload when the feed can't give a delta.
+        """
+        self.task_manager.changes_since.return_value = (50, None)
+        self.feed.poll()
+        self.feed.seq = 7
+        self.feed.poll()
+        self.widget.pump()
+        self.assertEqual((self.applied, self.reloads), ([], [True, True]))
+
+    def test_drops_poll_while_writes_are_in_flight(self):
+        """
+        Test that a delta read before our own write lands is dropped without advancing the seq.
+        """
+        self.feed.seq = 7
+        self.task_manager.changes_since.return_value = (8, {1: None})
+        self.feed.poll()
+        self.scheduler.pending_writes += 1
+        self.widget.pump()
+        self.assertEqual((self.feed.seq, self.applied), (7, []))
+
+if __name__ == '__main__':
+    unittest.main()
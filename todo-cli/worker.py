@@ -0,0 +1,242 @@
+# worker.py
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Shortest gap between two refreshes requested by RefreshScheduler, about one frame
+REFRESH_INTERVAL_MS = 16
+# How often ChangeFeed looks for writes made by other windows and processes
+CHANGE_POLL_MS = 500
+# Pause in typing (ms) before a GUI's search box queries the database
+SEARCH_DELAY_MS = 150
+# Most matches a GUI's search box shows
+SEARCH_RESULTS = 500
+
+class DatabaseWorker:
+    """Runs TaskManager calls on one background thread so Tk callbacks never block.
+
+    Every call made through submit() executes on the worker thread, which gets
+    its own connection from the Storage pool. Results are handed back to the
+    Tk main loop through a queue that is drained with widget.after() while
+    work is in flight, so callbacks always run on the Tk thread.
+    """
+
+    def __init__(self, widget, task_manager, on_busy=None, poll_ms=25):
+        self.widget = widget
+        self.task_manager = task_manager
+        self.on_busy = on_busy
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="todo-db")
+        self._results = queue.Queue()
+        self._latest = {}
+        self._in_flight = 0
+        self._polling = False
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, callback=None, key=None, errback=None):
+        """Run func(task_manager, *args) on the worker thread.
+
+        callback(result) is called on the Tk thread once it finishes, or
+        errback(exception) if it raised. When key
+        is given, a newer submission with the same key supersedes this one: it
+        is cancelled if it hasn't started, and its result is dropped otherwise.
+        """
+        with self._lock:
+            superseded = self._latest.get(key) if key is not None else None
+            if superseded is not None and superseded.cancel():
+                self._in_flight -= 1
+            self._in_flight += 1
+            future = self._executor.submit(self._run, func, args)
+            if key is not None:
+                self._latest[key] = future
+        future.add_done_callback(
+            lambda f: self._results.put((f, callback, errback, key)) if not f.cancelled() else None
+        )
+        self._set_busy(True)
+        self._schedule_poll()
+        return future
+
+    def _run(self, func, args):
+        return func(self.task_manager, *args)
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        """Deliver finished results on the Tk thread, re-arming while work remains."""
+        self._polling = False
+        while True:
+            try:
+                future, callback, errback, key = self._results.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._in_flight -= 1
+                current = key is None or self._latest.get(key) is future
+                if key is not None and current:
+                    del self._latest[key]
+            if not current:
+                continue
+            error = future.exception()
+            if error is not None:
+                print(error)
+                if errback is not None:
+                    errback(error)
+            elif callback is not None:
+                callback(future.result())
+
+        if self._in_flight > 0:
+            self._schedule_poll()
+        else:
+            self._set_busy(False)
+
+    def _set_busy(self, busy):
+        if self.on_busy is not None:
+            self.on_busy(busy)
+
+    def shutdown(self):
+        """Stop accepting work and wait for the current call to finish"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+class RefreshScheduler:
+    """Coalesces the refreshes requested by bursts of GUI mutations into one.
+
+    write() applies an optimistic change to the view at once, then runs the
+    real write on the DatabaseWorker. When writes land they request a
+    refresh, and every request made before the next after() tick shares a
+    single refresh. While writes are still in flight, accepts() is False: a
+    refresh read before them would briefly undo the optimistic changes, so
+    the GUI drops it and waits for the refresh that follows the writes.
+
+    If refresh only fetches what changed, pass a full reload as reload: it
+    runs instead when a write with an optimistic change raised or changed
+    nothing (a falsy result). Such a write leaves nothing behind for a delta
+    to pick up, and only a reload takes its optimistic change back off screen.
+    """
+
+    def __init__(self, widget, worker, refresh, interval_ms=REFRESH_INTERVAL_MS, reload=None):
+        self.widget = widget
+        self.worker = worker
+        self.refresh = refresh
+        self.reload = reload if reload is not None else refresh
+        self.interval_ms = interval_ms
+        self.pending_writes = 0
+        self.refreshes = 0
+        self._job = None
+        self._reload = False
+
+    def request(self):
+        """Ask for a refresh; requests made before it runs share it"""
+        if self._job is None:
+            self._job = self.widget.after(self.interval_ms, self._run)
+
+    def _run(self):
+        self._job = None
+        if self.pending_writes:
+            return  # the last write to land asks again
+        self.refreshes += 1
+        reload, self._reload = self._reload, False
+        if reload:
+            self.reload()
+        else:
+            self.refresh()
+
+    def cancel(self):
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+
+    def write(self, func, *args, optimistic=None, callback=None):
+        """Apply optimistic() to the view now, then run func(task_manager, *args) in the background"""
+        if optimistic is not None:
+            optimistic()
+        self.pending_writes += 1
+
+        def landed(result=None, failed=False):
+            self.pending_writes -= 1
+            if optimistic is not None and (failed or not result):
+                self._reload = True
+            self.request()
+            if callback is not None:
+                callback(result)
+
+        # A failed write still settles, and the reload it requests restores the real state
+        self.worker.submit(func, *args, callback=landed, errback=lambda error: landed(failed=True))
+
+    def accepts(self):
+        """True when a refresh result can be shown, i.e. no write is still in flight"""
+        return self.pending_writes == 0
+
+
+class ChangeFeed:
+    """Keeps a GUI in step with the task_changes feed instead of reloading whole lists.
+
+    poll() runs TaskManager.changes_since on the DatabaseWorker for the
+    tasks written since the last seq seen and hands the delta, {task_id:
+    Task or None for deleted}, to apply(). start() polls every interval_ms,
+    so writes from the CLI or another window show up without a click, at
+    the cost of one indexed lookup while nothing changes. When no delta can
+    be given, reload() is called instead; it should call reset() before
+    submitting its full load. Results landing while one of our writes is in
+    flight are dropped without advancing the seq, as RefreshScheduler does,
+    and the poll that follows the write picks the changes up again. Passing
+    poll as the RefreshScheduler's refresh makes a GUI's own writes arrive
+    the same way, as deltas.
+    """
+
+    def __init__(self, widget, worker, scheduler, apply, reload, interval_ms=CHANGE_POLL_MS):
+        self.widget = widget
+        self.worker = worker
+        self.scheduler = scheduler
+        self.apply = apply
+        self.reload = reload
+        self.interval_ms = interval_ms
+        self.seq = None
+        self.polls = 0
+        self._job = None
+
+    def start(self):
+        """Poll every interval_ms until cancel()"""
+        if self._job is None:
+            self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        # Without a seq the feed is unavailable (or a reset is on its way); the GUI reloads on demand
+        if self.seq is not None and self.scheduler.accepts():
+            self.poll()
+        self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def cancel(self):
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+
+    def reset(self):
+        """Re-read the feed's latest seq; submit it just before a full reload so no write is missed"""
+        self.worker.submit(lambda task_manager: task_manager.latest_change(), callback=self._set_seq, key="changes")
+
+    def _set_seq(self, seq):
+        self.seq = seq
+
+    def poll(self):
+        """Fetch the changes since the last seq seen and apply them, or reload without a seq"""
+        if self.seq is None:
+            self.reload()
+            return
+        self.polls += 1
+        self.worker.submit(lambda task_manager, seq: task_manager.changes_since(seq), self.seq,
+                           callback=self._deliver, key="changes")
+
+    def _deliver(self, result):
+        if not self.scheduler.accepts():
+            return
+        seq, changes = result
+        if changes is None:
+            self.reload()
+            return
+        self.seq = seq
+        if changes:
+            self.apply(changes)